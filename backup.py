@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+from csv_io import ProsesDibatalkan
+from database import SCHEMA_VERSION, get_tahun_arsip, path_arsip, uri_baca
+
+# --- FORMAT BACKUP ---
+# Satu file .zip berisi snapshot keuangan.db, file arsip per tahun yang terdaftar, dan
+# manifest.json (versi format, versi skema, sha256 & ukuran setiap file). Kompresi
+# opsional (deflate); tanpa kompresi entry disimpan apa adanya (ZIP_STORED).
+FORMAT_BACKUP = 1
+MANIFEST = "manifest.json"
+# Snapshot DB utama disalin bertahap: PAGES_PER_STEP halaman per langkah backup API,
+# diselingi jeda agar thread lain (UI, writer) tetap mendapat giliran disk & GIL.
+PAGES_PER_STEP = 1024
+JEDA_STEP_S = 0.005
+CHUNK_BYTES = 1024 * 1024
+
+
+class BackupTidakValid(Exception):
+    # File bukan backup Autofint, rusak, atau checksum tidak cocok
+    pass
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blok in iter(lambda: f.read(CHUNK_BYTES), b""):
+            h.update(blok)
+    return h.hexdigest()
+
+
+def salin_db(src, dst_path, pages=-1, jeda=0, progress=None, cancel_event=None):
+    # sqlite3 backup API dari koneksi src ke file baru dst_path; progress(selesai, total) dalam halaman.
+    # Exception dari callback (mis. batal) menghentikan backup dan diteruskan ke pemanggil.
+    dst = sqlite3.connect(dst_path)
+
+    def langkah(status, sisa, total):
+        if progress:
+            progress(total - sisa, total)
+        if cancel_event is not None and cancel_event.is_set():
+            raise ProsesDibatalkan()
+        if jeda:
+            time.sleep(jeda)
+
+    try:
+        src.backup(dst, pages=pages, progress=langkah)
+    finally:
+        dst.close()
+
+
+# --- BACKUP ---
+def buat_backup(conn, db_path, path, kompres=True, kunci_arsip=None, pages=PAGES_PER_STEP, jeda=JEDA_STEP_S,
+                progress=None, cancel_event=None):
+    # conn = koneksi baca ke DB utama (bukan writer). Transaksi baca dibuka selama backup, sehingga
+    # yang disalin adalah satu snapshot konsisten walau app terus menulis; tanpa itu backup API
+    # mengulang dari awal setiap kali ada tulis. kunci_arsip (lock writer) dipegang hanya selama
+    # snapshot dibuka & file arsip disalin, supaya arsip cocok dengan arsip_tahun di snapshot.
+    # File ditulis ke .tmp lalu di-rename. Return manifest.
+    folder = os.path.dirname(os.path.abspath(path))
+    staging = tempfile.mkdtemp(prefix=".backup-", dir=folder)
+    nama_utama = os.path.basename(db_path)
+    tmp_path = path + ".tmp"
+    try:
+        conn.execute("BEGIN")
+        try:
+            if kunci_arsip is not None:
+                kunci_arsip.acquire()
+            try:
+                arsip = get_tahun_arsip(conn)  # query pertama = awal snapshot
+                for file in arsip.values():
+                    sumber = path_arsip(db_path, file)
+                    if not os.path.exists(sumber):
+                        continue
+                    src = sqlite3.connect(uri_baca(sumber), uri=True)
+                    try:
+                        salin_db(src, os.path.join(staging, file))
+                    finally:
+                        src.close()
+            finally:
+                if kunci_arsip is not None:
+                    kunci_arsip.release()
+            salin_db(conn, os.path.join(staging, nama_utama), pages, jeda, progress, cancel_event)
+            versi = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.execute("COMMIT")
+
+        files = {}
+        for nama in [nama_utama] + sorted(set(os.listdir(staging)) - {nama_utama}):
+            p = os.path.join(staging, nama)
+            files[nama] = {"sha256": _sha256_file(p), "ukuran": os.path.getsize(p)}
+        manifest = {
+            "format": FORMAT_BACKUP,
+            "dibuat": datetime.now().isoformat(timespec="seconds"),
+            "schema_version": versi,
+            "utama": nama_utama,
+            "files": files,
+        }
+
+        metode = zipfile.ZIP_DEFLATED if kompres else zipfile.ZIP_STORED
+        with zipfile.ZipFile(tmp_path, "w", compression=metode) as zf:
+            zf.writestr(MANIFEST, json.dumps(manifest, indent=1))
+            for nama in files:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ProsesDibatalkan()
+                zf.write(os.path.join(staging, nama), nama)
+        os.replace(tmp_path, path)
+        return manifest
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+# --- RESTORE ---
+def baca_manifest(zf):
+    try:
+        manifest = json.loads(zf.read(MANIFEST))
+    except (KeyError, ValueError) as ex:
+        raise BackupTidakValid(f"manifest tidak terbaca: {ex}")
+    if manifest.get("format") != FORMAT_BACKUP:
+        raise BackupTidakValid(f"format backup tidak dikenal: {manifest.get('format')!r}")
+    if manifest.get("schema_version", 0) > SCHEMA_VERSION:
+        raise BackupTidakValid("backup dibuat oleh versi aplikasi yang lebih baru")
+    files = manifest.get("files") or {}
+    if manifest.get("utama") not in files:
+        raise BackupTidakValid("backup tidak memuat database utama")
+    for nama in files:
+        # Nama entry hanya boleh nama file polos (tanpa folder / ..)
+        if os.path.basename(nama) != nama or nama in ("", ".", ".."):
+            raise BackupTidakValid(f"nama file tidak valid: {nama!r}")
+    return manifest
+
+
+def siapkan_restore(path, folder, progress=None, cancel_event=None):
+    # Validasi & ekstrak backup ke folder staging di `folder` (filesystem yang sama dengan DB,
+    # agar penukaran file cukup os.replace). DB yang sedang dipakai belum disentuh sama sekali.
+    # Return (folder staging, manifest); staging dihapus pemanggil.
+    try:
+        zf = zipfile.ZipFile(path)
+    except (zipfile.BadZipFile, OSError) as ex:
+        raise BackupTidakValid(f"bukan file backup: {ex}")
+    staging = tempfile.mkdtemp(prefix=".restore-", dir=folder)
+    try:
+        with zf:
+            manifest = baca_manifest(zf)
+            total = sum(info["ukuran"] for info in manifest["files"].values())
+            selesai = 0
+            for nama, info in manifest["files"].items():
+                h = hashlib.sha256()
+                with zf.open(nama) as src, open(os.path.join(staging, nama), "wb") as dst:
+                    for blok in iter(lambda: src.read(CHUNK_BYTES), b""):
+                        h.update(blok)
+                        dst.write(blok)
+                        selesai += len(blok)
+                        if progress:
+                            progress(selesai, total)
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise ProsesDibatalkan()
+                if h.hexdigest() != info["sha256"]:
+                    raise BackupTidakValid(f"checksum {nama} tidak cocok")
+        _cek_db_utama(os.path.join(staging, manifest["utama"]))
+        return staging, manifest
+    except KeyError as ex:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise BackupTidakValid(f"entry tidak ada di backup: {ex}")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _cek_db_utama(path):
+    # Cek ringan (tanpa integrity_check penuh yang lambat untuk file ratusan MB):
+    # file benar SQLite dan memuat tabel transaksi
+    try:
+        conn = sqlite3.connect(uri_baca(path), uri=True)
+        try:
+            ada = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='transaksi'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as ex:
+        raise BackupTidakValid(f"database di backup rusak: {ex}")
+    if not ada:
+        raise BackupTidakValid("database di backup tidak memuat tabel transaksi")
+
+
+if __name__ == "__main__":
+    # python backup.py keuangan.db backup autofint.zip [--tanpa-kompresi]
+    # python backup.py keuangan.db restore autofint.zip
+    import argparse
+    import sys
+    from database import Repository
+
+    parser = argparse.ArgumentParser(description="Backup & restore database Autofint")
+    parser.add_argument("db")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_backup = sub.add_parser("backup")
+    p_backup.add_argument("zip")
+    p_backup.add_argument("--tanpa-kompresi", action="store_true")
+    p_restore = sub.add_parser("restore")
+    p_restore.add_argument("zip")
+    args = parser.parse_args()
+
+    repo = Repository(args.db)
+    t0 = time.perf_counter()
+    try:
+        if args.cmd == "backup":
+            manifest = repo.backup(args.zip, kompres=not args.tanpa_kompresi)
+            for nama, info in manifest["files"].items():
+                print(f"{nama}: {info['ukuran']:,} byte  sha256 {info['sha256']}")
+            print(f"Backup {os.path.getsize(args.zip):,} byte dalam {time.perf_counter() - t0:.1f} s")
+        else:
+            manifest = repo.restore(args.zip)
+            print(f"Restore backup {manifest['dibuat']} ({len(manifest['files'])} file) dalam {time.perf_counter() - t0:.1f} s")
+    except BackupTidakValid as ex:
+        print(f"Backup tidak valid: {ex}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        repo.close()
@@ -0,0 +1,552 @@
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from database import DEFAULT_KATEGORI, SCHEMA_VERSION, Repository, migrate
+from cache import QueryCache
+
+# --- BENCHMARK HEADLESS ---
+# python bench.py jalankan --ukuran 10000 100000 1000000
+# python bench.py bandingkan bench-abc123.json bench-def456.json
+# python bench.py sesi --jumlah 40
+#
+# Database sintetis dibuat sekali per (ukuran, seed, versi skema) dan dipakai ulang.
+# Operasi data layer selalu diukur; operasi UI (closure di main.py) ikut diukur jika
+# flet terpasang, memakai StubPage tanpa GUI/jaringan. Hasil disimpan sebagai JSON.
+
+UKURAN_DEFAULT = [10_000, 100_000, 1_000_000]
+TAHUN_DATA = 4
+SEED = 42
+
+# kategori -> (bobot, min, max) dalam rupiah; bobot = perkiraan frekuensi transaksi
+PROFIL_KATEGORI = {
+    "Gaji": (3, 5_000_000, 15_000_000),
+    "Bonus": (1, 500_000, 5_000_000),
+    "Makan": (35, 15_000, 150_000),
+    "Transport": (20, 10_000, 100_000),
+    "Belanja": (12, 50_000, 1_500_000),
+    "Tagihan": (5, 100_000, 1_000_000),
+    "Hiburan": (8, 25_000, 500_000),
+    "Kesehatan": (3, 50_000, 1_000_000),
+    "Dana Darurat": (2, 200_000, 2_000_000),
+    "Investasi Saham": (2, 500_000, 5_000_000),
+}
+DESKRIPSI = {
+    "Gaji": ["gaji bulanan", "gaji"],
+    "Bonus": ["bonus proyek", "THR", "insentif"],
+    "Makan": ["nasi padang", "kopi susu", "makan siang kantor", "warteg", "bakso", "sate ayam", ""],
+    "Transport": ["ojek online", "bensin motor", "KRL", "parkir", "tol"],
+    "Belanja": ["belanja bulanan", "sabun & sampo", "baju", "alat dapur", ""],
+    "Tagihan": ["listrik PLN", "internet rumah", "pulsa", "air PDAM", "BPJS"],
+    "Hiburan": ["nonton bioskop", "langganan streaming", "karaoke", "buku"],
+    "Kesehatan": ["apotek", "dokter gigi", "vitamin"],
+    "Dana Darurat": ["setor dana darurat"],
+    "Investasi Saham": ["beli saham BBCA", "reksa dana", "beli saham TLKM"],
+}
+GENERATE_BATCH = 10_000
+
+
+# --- GENERATOR DATA SINTETIS ---
+def generate_db(path, n, tahun=TAHUN_DATA, seed=SEED, sampai=None):
+    # Transaksi tersebar rata di `tahun` tahun terakhir, disisipkan urut tanggal (id ~ kronologis)
+    # lewat trigger normal (ringkasan, rollup, FTS) seperti input dari aplikasi.
+    rng = random.Random(seed)
+    sampai = sampai or date.today()
+    awal = sampai - timedelta(days=365 * tahun)
+    total_hari = (sampai - awal).days + 1
+    tipe_kategori = {nama: (tipe, tab) for nama, tipe, tab in DEFAULT_KATEGORI}
+    nama_kategori = list(PROFIL_KATEGORI)
+    bobot = [PROFIL_KATEGORI[k][0] for k in nama_kategori]
+
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    migrate(conn)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    sql = "INSERT INTO transaksi (hari, tipe, kategori, deskripsi, jumlah, is_tabungan) VALUES (?,?,?,?,?,?)"
+    batch = []
+    for i in range(n):
+        d = awal + timedelta(days=i * total_hari // n)
+        kategori = rng.choices(nama_kategori, bobot)[0]
+        _, lo, hi = PROFIL_KATEGORI[kategori]
+        tipe, tab = tipe_kategori[kategori]
+        jumlah = rng.randint(lo // 500, hi // 500) * 500
+        batch.append((d.year * 10000 + d.month * 100 + d.day, tipe, kategori, rng.choice(DESKRIPSI[kategori]), jumlah, tab))
+        if len(batch) >= GENERATE_BATCH:
+            with conn:
+                conn.executemany(sql, batch)
+            batch = []
+    if batch:
+        with conn:
+            conn.executemany(sql, batch)
+    conn.execute("ANALYZE")
+    conn.close()
+    os.replace(tmp_path, path)
+
+
+def siapkan_db(data_dir, n, seed=SEED):
+    # Return folder berisi keuangan.db (format yang sama dengan FLET_APP_STORAGE_DATA)
+    folder = os.path.join(data_dir, f"n{n}_s{seed}_v{SCHEMA_VERSION}")
+    path = os.path.join(folder, "keuangan.db")
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        t0 = time.perf_counter()
+        print(f"Membuat {path} ({n:,} transaksi)...", file=sys.stderr)
+        generate_db(path, n, seed=seed)
+        print(f"  selesai {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return folder
+
+
+# --- PENGUKURAN ---
+def _persentil(data, p):
+    # Nearest-rank
+    urut = sorted(data)
+    return urut[max(0, math.ceil(p / 100 * len(urut)) - 1)]
+
+
+def ukur(fn, ulang, pemanasan=1):
+    # Latency (ms) dari `ulang` kali jalan + peak alokasi Python (tracemalloc) dari satu jalan terpisah.
+    # Memori internal SQLite (page cache, mmap) tidak terlihat oleh tracemalloc.
+    for _ in range(pemanasan):
+        fn()
+    waktu = []
+    for _ in range(ulang):
+        t0 = time.perf_counter()
+        fn()
+        waktu.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "n": ulang,
+        "mean_ms": round(statistics.fmean(waktu), 3),
+        "p50_ms": round(_persentil(waktu, 50), 3),
+        "p90_ms": round(_persentil(waktu, 90), 3),
+        "p99_ms": round(_persentil(waktu, 99), 3),
+        "max_ms": round(max(waktu), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _laporan(repo, tahun, bln):
+    def jalan():
+        clause, params = repo.periode_clause(tahun, bln)
+        repo.total_per_kategori(tahun, bln, "Pengeluaran")
+        repo.tren_bulanan(12)
+        repo.query_transaksi_halaman(clause, params, limit=51)
+    return jalan
+
+
+def operasi_data(repo, tmp_dir):
+    # Jalur yang dipakai view, dipanggil langsung ke Repository (tanpa flet).
+    # repo dibuat dengan cache query mati supaya yang terukur adalah jalur SQL.
+    thn = str(date.today().year)
+    bulan = f"{date.today().month:02d}"
+
+    def scroll_10_halaman():
+        setelah = None
+        for _ in range(10):
+            rows = repo.query_transaksi_halaman(setelah=setelah, limit=51)
+            if not rows:
+                break
+            setelah = (rows[-1][1], rows[-1][0])
+
+    export_path = os.path.join(tmp_dir, "export.csv")
+    return [
+        ("data.ringkasan", repo.get_ringkasan, 200),
+        ("data.list_halaman_pertama", lambda: repo.query_transaksi_halaman(limit=21), 100),
+        ("data.list_scroll_10_halaman", scroll_10_halaman, 30),
+        ("data.laporan_bulan_ini", _laporan(repo, thn, bulan), 50),
+        ("data.laporan_semua", _laporan(repo, "Semua", "Semua"), 50),
+        ("data.laporan_bulan_semua_tahun", _laporan(repo, "Semua", bulan), 50),
+        ("data.cari", lambda: repo.query_transaksi_halaman(search_keyword="nasi pad", limit=21), 50),
+        ("data.export_csv", lambda: repo.export_csv(export_path), 3),
+    ]
+
+
+def operasi_cache(repo):
+    # Navigasi ulang tanpa perubahan data: dilayani dari cache query (repo dengan cache aktif)
+    thn = str(date.today().year)
+    bulan = f"{date.today().month:02d}"
+    laporan_bulan = _laporan(repo, thn, bulan)
+    laporan_semua = _laporan(repo, "Semua", "Semua")
+
+    def ganti_tab():
+        repo.get_ringkasan()
+        repo.query_transaksi_halaman(limit=21)
+        laporan_bulan()
+        laporan_semua()
+
+    def ganti_tab_setelah_tulis():
+        # Setiap tulis menaikkan versi data: seluruh cache gugur, query dijalankan ulang
+        repo.cache.naikkan_versi()
+        ganti_tab()
+
+    return [
+        ("cache.ganti_tab", ganti_tab, 200),
+        ("cache.ganti_tab_setelah_tulis", ganti_tab_setelah_tulis, 30),
+    ]
+
+
+# --- STUB FLET PAGE ---
+class StubPubSubHub:
+    # Pengganti PubSubHub Flet: satu hub untuk semua StubPage. Pengiriman boleh dari thread
+    # mana pun (mis. thread writer DB); handler async dijadwalkan di loop hub.
+    def __init__(self, loop):
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._langganan = {}  # sesi -> [(topic, handler)]
+
+    def subscribe(self, sesi, topic, handler):
+        with self._lock:
+            self._langganan.setdefault(sesi, []).append((topic, handler))
+
+    def unsubscribe_all(self, sesi):
+        with self._lock:
+            self._langganan.pop(sesi, None)
+
+    def send_all_on_topic(self, topic, message):
+        with self._lock:
+            handlers = [h for daftar in self._langganan.values() for t, h in daftar if t == topic]
+        for handler in handlers:
+            if asyncio.iscoroutinefunction(handler):
+                asyncio.run_coroutine_threadsafe(handler(topic, message), self.loop)
+            else:
+                self.loop.call_soon_threadsafe(handler, topic, message)
+
+
+class StubPubSub:
+    # page.pubsub milik satu sesi
+    def __init__(self, hub, sesi):
+        self._hub = hub
+        self._sesi = sesi
+
+    def subscribe_topic(self, topic, handler):
+        self._hub.subscribe(self._sesi, topic, handler)
+
+    def unsubscribe_all(self):
+        self._hub.unsubscribe_all(self._sesi)
+
+    def send_all_on_topic(self, topic, message):
+        self._hub.send_all_on_topic(topic, message)
+
+
+class StubPage:
+    # Pengganti ft.Page untuk main(): menyimpan control/dialog/snackbar tanpa client
+    def __init__(self, hub):
+        self.pubsub = StubPubSub(hub, id(self))
+        self.on_close = None
+        self.overlay = []
+        self.controls = []
+        self.snack_bars = []
+        self.dialog = None
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def clean(self):
+        self.controls.clear()
+
+    def update(self, *controls):
+        pass
+
+    def open(self, control):
+        self.dialog = control
+
+    def close(self, control):
+        self.dialog = None
+
+    def show_snack_bar(self, snack_bar):
+        self.snack_bars.append(snack_bar)
+
+
+def _muat_app(storage_dir):
+    # Import main.py dengan Control.update di-stub. Return (modul main, fungsi pemulih),
+    # atau (None, alasan) jika flet tidak tersedia
+    try:
+        import flet as ft
+    except ImportError:
+        return None, "flet tidak terpasang"
+    # Database bench dipakai ulang antar run, jadi tidak boleh diarsipkan main()
+    os.environ["AUTOFINT_ARSIP"] = "0"
+    os.environ["FLET_APP_STORAGE_DATA"] = storage_dir
+    import main as app
+
+    # Control belum terpasang ke page sungguhan; update() cukup dilewati
+    update_asli = ft.Control.update
+
+    def update_stub(self):
+        pass
+    ft.Control.update = update_stub
+
+    def pulihkan():
+        ft.Control.update = update_asli
+    return app, pulihkan
+
+
+def operasi_ui(storage_dir, tmp_dir):
+    # Return (list operasi, fungsi cleanup), atau (None, alasan) jika flet tidak tersedia
+    app, pulihkan = _muat_app(storage_dir)
+    if app is None:
+        return None, pulihkan
+
+    # main() dan handler-nya async; setiap operasi dijalankan sampai selesai di loop ini
+    loop = asyncio.new_event_loop()
+    jalan = loop.run_until_complete
+    page = StubPage(StubPubSubHub(loop))
+    hooks = jalan(app.main(page))
+    if hooks is None:
+        loop.close()
+        pulihkan()
+        return None, "main() gagal (lihat page.controls)"
+    hooks["state"]["is_logged_in"] = True
+    jalan(hooks["navigate_to"](0))
+    repo = hooks["repo"]
+    # Seperti operasi_data: cache query LayananData dimatikan (dan isi dari startup dibuang)
+    # supaya ui.* mengukur jalur refresh/list/laporan, bukan cache hit. Env AUTOFINT_CACHE_ENTRI
+    # tidak bisa dipakai karena modul cache sudah ter-import di sini.
+    repo.cache.max_entri = 0
+    repo.cache.naikkan_versi()
+
+    def build_list():
+        rows = repo.query_transaksi_halaman(limit=21)
+        hooks["build_list_transaksi"](hooks["lv_dashboard"], rows, page_size=20)
+
+    def scroll_laporan():
+        async def kerja():
+            await hooks["refresh_data_laporan"]()
+            for _ in range(10):
+                await hooks["load_more"](hooks["lv_laporan"])
+        jalan(kerja())
+
+    def laporan(tahun):
+        def op():
+            hooks["filter_tahun"].value = tahun
+            jalan(hooks["refresh_data_laporan"]())
+        return op
+
+    export_path = os.path.join(tmp_dir, "export_ui.csv")
+    ops = [
+        ("ui.refresh_data_global", lambda: jalan(hooks["refresh_data_global"]()), 50),
+        ("ui.build_list_transaksi", build_list, 50),
+        ("ui.scroll_10_halaman", scroll_laporan, 20),
+        ("ui.refresh_data_laporan", laporan(str(date.today().year)), 30),
+        ("ui.refresh_data_laporan_semua", laporan("Semua"), 30),
+        ("ui.export_csv", lambda: jalan(hooks["jalankan_export"](export_path, "", (), repo.sumber_periode("Semua"))), 3),
+    ]
+
+    def cleanup():
+        hooks["layanan"].tutup()
+        loop.close()
+        pulihkan()
+
+    return ops, cleanup
+
+
+def _commit_git():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def jalankan(args):
+    hasil = {
+        "meta": {
+            "commit": _commit_git(),
+            "waktu": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "schema_version": SCHEMA_VERSION,
+        },
+        "ukuran": {},
+    }
+    os.makedirs(args.data_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.ukuran:
+            storage_dir = siapkan_db(args.data_dir, n, args.seed)
+            per_op = {}
+            ops = []
+            repo = Repository(os.path.join(storage_dir, "keuangan.db"), query_cache=QueryCache(max_entri=0))
+            repo_cache = Repository(os.path.join(storage_dir, "keuangan.db"))
+            ops += operasi_data(repo, tmp_dir)
+            ops += operasi_cache(repo_cache)
+            cleanup = None
+            if not args.tanpa_ui:
+                ops_ui, info = operasi_ui(storage_dir, tmp_dir)
+                if ops_ui is None:
+                    print(f"Operasi UI dilewati: {info}", file=sys.stderr)
+                else:
+                    ops += ops_ui
+                    cleanup = info
+            try:
+                for nama, fn, ulang in ops:
+                    if args.filter and args.filter not in nama:
+                        continue
+                    per_op[nama] = ukur(fn, max(1, int(ulang * args.faktor)))
+                    r = per_op[nama]
+                    print(f"{n:>9,}  {nama:<32} p50 {r['p50_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  peak {r['peak_kib']:>9.1f} KiB")
+            finally:
+                c = repo_cache.cache.statistik()
+                print(f"{n:>9,}  cache query: {c['hit']} hit, {c['miss']} miss, {c['entri']} entry / {c['baris']} baris")
+                repo.close()
+                repo_cache.close()
+                if cleanup:
+                    cleanup()
+            hasil["ukuran"][str(n)] = per_op
+
+    output = args.output or f"bench-{hasil['meta']['commit'] or 'lokal'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(hasil, f, indent=2)
+    print(f"Hasil disimpan di {output}")
+    return 0
+
+
+# --- LOAD TEST MULTI-SESI ---
+# Mensimulasikan banyak sesi main() di satu proses & satu event loop, seperti web app dengan
+# banyak tab browser: semua sesi berbagi satu LayananData (layanan.py) dan satu hub pub/sub.
+# Setiap titik jumlah sesi diukur: memori Python yang ditahan sesi terakhir yang dibuka
+# (tracemalloc), latency refresh Beranda per sesi, dan waktu sampai satu tulis ter-push &
+# dimuat ulang di semua sesi. Database disalin ke folder sementara karena ikut ditulisi.
+def uji_sesi(args):
+    sumber_dir = siapkan_db(args.data_dir, args.ukuran, args.seed)
+    with tempfile.TemporaryDirectory() as storage_dir:
+        shutil.copy(os.path.join(sumber_dir, "keuangan.db"), storage_dir)
+        app, pulihkan = _muat_app(storage_dir)
+        if app is None:
+            print(f"Load test butuh flet: {pulihkan}", file=sys.stderr)
+            return 1
+        loop = asyncio.new_event_loop()
+        hub = StubPubSubHub(loop)
+        titik = sorted({1, args.jumlah} | set(range(args.langkah, args.jumlah + 1, args.langkah)))
+        pages, sesi = [], []
+
+        async def buka_sesi():
+            page = StubPage(hub)
+            hooks = await app.main(page)
+            if hooks is None:
+                raise RuntimeError("main() gagal (lihat page.controls)")
+            hooks["state"]["is_logged_in"] = True
+            await hooks["navigate_to"](0)
+            pages.append(page)
+            sesi.append(hooks)
+
+        async def tunggu_semua_task():
+            sekarang = asyncio.current_task()
+            while any(t is not sekarang and not t.done() for t in asyncio.all_tasks()):
+                await asyncio.sleep(0.001)
+
+        async def ukur_titik():
+            refresh = []
+            for hooks in sesi:
+                t0 = time.perf_counter()
+                await hooks["refresh_data_global"]()
+                refresh.append((time.perf_counter() - t0) * 1000)
+            # Push: publish terjadi di thread writer sebelum insert selesai, jadi semua task
+            # handler sudah terjadwal saat await ini kembali
+            repo = sesi[0]["repo"]
+            t0 = time.perf_counter()
+            await loop.run_in_executor(sesi[0]["db_executor"], repo.insert_transaksi,
+                                       date.today().isoformat(), "Pengeluaran", "Makan", "load test", 10_000, 0)
+            await tunggu_semua_task()
+            push_ms = (time.perf_counter() - t0) * 1000
+            konsisten = len({hooks["state"]["total_cash"] for hooks in sesi}) == 1
+            return refresh, push_ms, konsisten
+
+        print(f"{'sesi':>5}  {'mem sesi':>10}  {'refresh p50':>11}  {'refresh p99':>11}  {'push semua':>10}  konsisten")
+        try:
+            for target in titik:
+                while len(sesi) < target:
+                    tracemalloc.start()
+                    try:
+                        loop.run_until_complete(buka_sesi())
+                        loop.run_until_complete(tunggu_semua_task())
+                        mem_kib = tracemalloc.get_traced_memory()[0] / 1024
+                    finally:
+                        tracemalloc.stop()
+                refresh, push_ms, konsisten = loop.run_until_complete(ukur_titik())
+                print(f"{target:>5}  {mem_kib:>7.0f} KiB  {_persentil(refresh, 50):>8.2f} ms  "
+                      f"{_persentil(refresh, 99):>8.2f} ms  {push_ms:>7.1f} ms  {'ya' if konsisten else 'TIDAK'}")
+            layanan = sesi[0]["layanan"]
+            c = layanan.repo.cache.statistik()
+            print(f"{layanan.jumlah_sesi} sesi berbagi 1 layanan; cache query {c['hit']} hit, {c['miss']} miss")
+        finally:
+            for page in pages:
+                page.on_close(None)
+            if sesi:
+                sesi[0]["layanan"].tutup()
+            loop.close()
+            pulihkan()
+    return 0
+
+
+def bandingkan(args):
+    # Bandingkan p50 & peak memori dua file hasil (mis. dua commit berbeda)
+    with open(args.lama, encoding="utf-8") as f:
+        lama = json.load(f)
+    with open(args.baru, encoding="utf-8") as f:
+        baru = json.load(f)
+    print(f"{lama['meta'].get('commit')} -> {baru['meta'].get('commit')}")
+    for n, ops in baru["ukuran"].items():
+        for nama, r in ops.items():
+            r_lama = lama["ukuran"].get(n, {}).get(nama)
+            if not r_lama:
+                print(f"{int(n):>9,}  {nama:<32} (baru)")
+                continue
+            rasio = r["p50_ms"] / r_lama["p50_ms"] if r_lama["p50_ms"] else float("inf")
+            print(f"{int(n):>9,}  {nama:<32} p50 {r_lama['p50_ms']:>9.2f} -> {r['p50_ms']:>9.2f} ms ({rasio:5.2f}x)"
+                  f"  peak {r_lama['peak_kib']:>9.1f} -> {r['peak_kib']:>9.1f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark headless Autofint")
+    sub = parser.add_subparsers(dest="cmd")
+    p_jalan = sub.add_parser("jalankan", help="generate data sintetis lalu ukur operasi (default)")
+    p_jalan.add_argument("--ukuran", type=int, nargs="+", default=UKURAN_DEFAULT, help="jumlah transaksi per database")
+    p_jalan.add_argument("--seed", type=int, default=SEED)
+    p_jalan.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "autofint_bench"))
+    p_jalan.add_argument("--output", help="file JSON hasil (default bench-<commit>.json)")
+    p_jalan.add_argument("--filter", help="hanya operasi yang namanya mengandung teks ini")
+    p_jalan.add_argument("--faktor", type=float, default=1.0, help="pengali jumlah pengulangan")
+    p_jalan.add_argument("--tanpa-ui", action="store_true", help="lewati operasi UI meski flet terpasang")
+    p_banding = sub.add_parser("bandingkan", help="bandingkan dua file hasil")
+    p_banding.add_argument("lama")
+    p_banding.add_argument("baru")
+    p_sesi = sub.add_parser("sesi", help="load test banyak sesi bersamaan (butuh flet)")
+    p_sesi.add_argument("--jumlah", type=int, default=40, help="jumlah sesi maksimum")
+    p_sesi.add_argument("--langkah", type=int, default=10, help="ukur setiap kelipatan jumlah sesi ini")
+    p_sesi.add_argument("--ukuran", type=int, default=UKURAN_DEFAULT[0], help="jumlah transaksi di database")
+    p_sesi.add_argument("--seed", type=int, default=SEED)
+    p_sesi.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "autofint_bench"))
+    args = parser.parse_args()
+
+    if args.cmd == "bandingkan":
+        sys.exit(bandingkan(args))
+    if args.cmd == "sesi":
+        sys.exit(uji_sesi(args))
+    if args.cmd is None:
+        args = p_jalan.parse_args([])
+    sys.exit(jalankan(args))
@@ -0,0 +1,76 @@
+import os
+import threading
+from collections import OrderedDict
+
+# --- CACHE HASIL QUERY ---
+# LRU untuk hasil query baca (ringkasan, grafik, halaman daftar, pencarian). Setiap hasil
+# ditandai versi data saat query dimulai; versi naik setiap kali ada tulis yang di-commit
+# (Repository berlangganan EventBus). Hasil query yang berjalan saat versi naik tidak
+# disimpan, sehingga cache tidak pernah menyajikan data basi.
+# Batas memori: jumlah entry dan total baris tersimpan (0 entry = cache mati).
+CACHE_ENTRI = int(os.environ.get("AUTOFINT_CACHE_ENTRI", "128"))
+CACHE_BARIS = int(os.environ.get("AUTOFINT_CACHE_BARIS", "20000"))
+
+
+def _bobot(nilai):
+    # Perkiraan ukuran: jumlah baris untuk hasil berupa list, selain itu 1
+    return len(nilai) if isinstance(nilai, list) else 1
+
+
+class QueryCache:
+    def __init__(self, max_entri=CACHE_ENTRI, max_baris=CACHE_BARIS):
+        self.max_entri = max_entri
+        self.max_baris = max_baris
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # kunci -> (nilai, bobot)
+        self._baris = 0
+        self.versi = 0
+        self.hit = 0
+        self.miss = 0
+        self.dibuang = 0
+
+    def naikkan_versi(self, ev=None):
+        # Dipanggil setelah commit; semua entry versi lama langsung dilepas
+        with self._lock:
+            self.versi += 1
+            self._data.clear()
+            self._baris = 0
+
+    def ambil(self, kunci, hitung):
+        # Hasil dari cache jika ada, jika tidak hitung() dijalankan (di luar lock) lalu disimpan.
+        # Hasil dipakai bersama: pemanggil tidak boleh mengubah list/dict yang dikembalikan.
+        with self._lock:
+            versi = self.versi
+            entry = self._data.get(kunci)
+            if entry is not None:
+                self._data.move_to_end(kunci)
+                self.hit += 1
+                return entry[0]
+            self.miss += 1
+        nilai = hitung()
+        bobot = _bobot(nilai)
+        with self._lock:
+            if versi != self.versi or self.max_entri <= 0 or bobot > self.max_baris:
+                return nilai
+            lama = self._data.pop(kunci, None)
+            if lama is not None:
+                self._baris -= lama[1]
+            self._data[kunci] = (nilai, bobot)
+            self._baris += bobot
+            while len(self._data) > self.max_entri or self._baris > self.max_baris:
+                _, (_, b) = self._data.popitem(last=False)
+                self._baris -= b
+                self.dibuang += 1
+        return nilai
+
+    def statistik(self):
+        with self._lock:
+            total = self.hit + self.miss
+            return {
+                "hit": self.hit, "miss": self.miss, "rasio": self.hit / total if total else 0.0,
+                "entri": len(self._data), "baris": self._baris, "dibuang": self.dibuang, "versi": self.versi,
+            }
+
+    def reset_statistik(self):
+        with self._lock:
+            self.hit = self.miss = self.dibuang = 0
@@ -0,0 +1,268 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, closing, contextmanager
+from datetime import date
+
+from database import (SCHEMA_VERSION, SUMBER_AKTIF, get_ringkasan, get_schema_version, get_tahun_arsip, kelompok_sumber,
+                      path_arsip, periode_clause, seri_saldo_bulanan, sumber_periode, total_per_kategori, tren_bulanan,
+                      uri_baca)
+from model import format_rupiah
+
+# --- MODE HEADLESS ---
+# Laporan tanpa GUI: python main.py <perintah> ... (atau python cli.py <perintah> ...).
+# Flet tidak pernah di-import; database dibuka read-only (mode=ro), jadi aman dijalankan
+# saat app sedang terbuka. Angka sama dengan yang tampil di app: header Beranda dari
+# ringkasan_saldo + arsip_tahun, rincian kategori & total bulanan dari rollup.
+PERINTAH = ("ringkasan", "kategori", "export", "batch")
+TIPE = ("Pengeluaran", "Pemasukan")
+
+
+class DatabaseTidakSiap(Exception):
+    # File tidak ada atau skemanya belum/tidak sama dengan versi app ini (mode baca tidak bisa migrasi)
+    pass
+
+
+def db_default():
+    # Lokasi yang sama dengan main(): folder data app jika dijalankan oleh Flet
+    storage_path = os.environ.get("FLET_APP_STORAGE_DATA")
+    return os.path.join(storage_path, "keuangan.db") if storage_path else "keuangan.db"
+
+
+@contextmanager
+def buka_baca(db_path):
+    if not os.path.exists(db_path):
+        raise DatabaseTidakSiap(f"{db_path} tidak ditemukan")
+    with closing(sqlite3.connect(uri_baca(db_path), uri=True)) as conn:
+        versi = get_schema_version(conn)
+        if versi != SCHEMA_VERSION:
+            raise DatabaseTidakSiap(f"{db_path}: skema versi {versi}, app ini versi {SCHEMA_VERSION} "
+                                    "(buka sekali dengan app untuk migrasi)")
+        yield conn
+
+
+@contextmanager
+def bagian_sumber(db_path, conn, sumber=SUMBER_AKTIF):
+    # Versi read-only Repository.reader_sumber: [(koneksi, kelompok sumber)], kelompok
+    # pertama memakai conn, arsip di-ATTACH read-only
+    file_arsip = get_tahun_arsip(conn)
+    with ExitStack() as stack:
+        bagian = []
+        for i, grup in enumerate(kelompok_sumber(sumber)):
+            k = conn if i == 0 else stack.enter_context(closing(sqlite3.connect(uri_baca(db_path), uri=True)))
+            for skema in grup:
+                if skema != "main":
+                    path = path_arsip(db_path, file_arsip[int(skema.split("_")[1])])
+                    k.execute(f"ATTACH DATABASE ? AS {skema}", (uri_baca(path),))
+            bagian.append((k, grup))
+        yield bagian
+
+
+# --- DATA LAPORAN ---
+def data_ringkasan(conn):
+    m, k, inv = get_ringkasan(conn)
+    return {"saldo": m - (k + inv), "pemasukan": m, "pengeluaran": k, "tabungan": inv}
+
+
+def data_kategori(conn, tahun="Semua", bulan="Semua", tipe="Pengeluaran"):
+    rows = sorted(total_per_kategori(conn, tahun, bulan, tipe), key=lambda r: (-r[1], r[0]))
+    total = sum(r[1] for r in rows)
+    return {
+        "tahun": tahun, "bulan": bulan, "tipe": tipe, "total": total,
+        "kategori": [{"kategori": nama, "total": nilai, "persen": round(nilai / total * 100, 1)} for nama, nilai in rows],
+    }
+
+
+def laporan_bulanan(db_path, tahun, bulan):
+    # Total bulan (pemasukan/pengeluaran/tabungan seperti chart tren), saldo akhir bulan
+    # dan rincian pengeluaran per kategori
+    bulan_ini = date(int(tahun), int(bulan), 1)
+    with buka_baca(db_path) as conn:
+        _, _, m, k, inv = tren_bulanan(conn, 1, bulan_ini)[0]
+        saldo_akhir = seri_saldo_bulanan(conn, 1, bulan_ini)[0][2]
+        kategori = data_kategori(conn, str(tahun), f"{int(bulan):02d}")
+    return {
+        "db": os.path.abspath(db_path),
+        "periode": f"{int(tahun):04d}-{int(bulan):02d}",
+        "pemasukan": m, "pengeluaran": k, "tabungan": inv, "selisih": m - (k + inv),
+        "saldo_akhir": saldo_akhir,
+        "kategori": kategori["kategori"],
+    }
+
+
+# --- FORMAT TEKS ---
+def teks_ringkasan(data):
+    return "\n".join([
+        f"Saldo Kas    {format_rupiah(data['saldo'])}",
+        f"Pemasukan    {format_rupiah(data['pemasukan'])}",
+        f"Pengeluaran  {format_rupiah(data['pengeluaran'])}",
+        f"Tabungan     {format_rupiah(data['tabungan'])}",
+    ])
+
+
+def _teks_kategori(rows):
+    lebar = max((len(r["kategori"]) for r in rows), default=0)
+    return [f"  {r['kategori']:<{lebar}}  {format_rupiah(r['total']):>16}  {r['persen']:5.1f}%" for r in rows]
+
+
+def teks_kategori(data):
+    if not data["kategori"]:
+        return "Tidak ada data pada periode ini."
+    return "\n".join([f"{data['tipe']} per kategori (tahun {data['tahun']}, bulan {data['bulan']})"]
+                     + _teks_kategori(data["kategori"])
+                     + [f"Total {data['tipe']} (Filter): {format_rupiah(data['total'])}"])
+
+
+def teks_laporan_bulanan(data):
+    baris = [
+        f"Laporan {data['periode']}  ({data['db']})",
+        f"Pemasukan    {format_rupiah(data['pemasukan'])}",
+        f"Pengeluaran  {format_rupiah(data['pengeluaran'])}",
+        f"Tabungan     {format_rupiah(data['tabungan'])}",
+        f"Selisih      {format_rupiah(data['selisih'])}",
+        f"Saldo akhir  {format_rupiah(data['saldo_akhir'])}",
+        "Pengeluaran per kategori:",
+    ]
+    return "\n".join(baris + (_teks_kategori(data["kategori"]) or ["  (tidak ada)"]))
+
+
+def _keluarkan(teks, data, args):
+    # Cetak ke stdout atau tulis ke --output; --json untuk dipakai skrip lain
+    isi = json.dumps(data, ensure_ascii=False, indent=1) if args.json else teks
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(isi + "\n")
+    else:
+        print(isi)
+
+
+# --- BATCH (PROCESS POOL) ---
+def _tulis_laporan_bulanan(db_path, nama_dasar, tahun, bulan, folder, sebagai_json):
+    # Dijalankan di proses worker; return (db, path hasil, pesan error)
+    try:
+        data = laporan_bulanan(db_path, tahun, bulan)
+        path = os.path.join(folder, f"{nama_dasar}_{data['periode']}.{'json' if sebagai_json else 'txt'}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write((json.dumps(data, ensure_ascii=False, indent=1) if sebagai_json else teks_laporan_bulanan(data)) + "\n")
+        return db_path, path, None
+    except (DatabaseTidakSiap, sqlite3.Error, OSError) as ex:
+        return db_path, None, str(ex)
+
+
+def nama_laporan(db_paths):
+    # Nama dasar file laporan per input, unik dalam satu batch: nama file DB, ditambah nama
+    # folder bila ada DB senama (mis. a/keuangan.db & b/keuangan.db), ditambah nomor urut
+    # bila masih bentrok (file yang sama disebut dua kali)
+    stem = [os.path.splitext(os.path.basename(p))[0] for p in db_paths]
+    folder = [os.path.basename(os.path.dirname(os.path.abspath(p))) for p in db_paths]
+    nama = [s if stem.count(s) == 1 else f"{f}_{s}" for s, f in zip(stem, folder)]
+    return [n if nama.count(n) == 1 else f"{n}_{i + 1}" for i, n in enumerate(nama)]
+
+
+def batch_laporan_bulanan(db_paths, tahun, bulan, folder, sebagai_json=False, workers=None):
+    # Satu laporan per file database, dikerjakan paralel di beberapa proses (query SQLite &
+    # format teks terikat GIL, thread tidak membantu). File dibagi per potongan supaya ongkos
+    # kirim-terima antar proses tidak melebihi laporannya sendiri (~1 ms per file dari rollup).
+    # Return list (db, path, error) urut input.
+    os.makedirs(folder, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(db_paths))
+    n = len(db_paths)
+    nama = nama_laporan(db_paths)
+    if workers <= 1:
+        return [_tulis_laporan_bulanan(p, d, tahun, bulan, folder, sebagai_json) for p, d in zip(db_paths, nama)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_tulis_laporan_bulanan, db_paths, nama, [tahun] * n, [bulan] * n, [folder] * n, [sebagai_json] * n,
+                           chunksize=max(1, n // (workers * 4))))
+
+
+# --- PERINTAH ---
+def _bulan(nilai):
+    return "Semua" if nilai.lower() == "semua" else f"{int(nilai):02d}"
+
+
+def _tahun(nilai):
+    return "Semua" if nilai.lower() == "semua" else str(int(nilai))
+
+
+def _cmd_ringkasan(args):
+    with buka_baca(args.db) as conn:
+        data = data_ringkasan(conn)
+    _keluarkan(teks_ringkasan(data), data, args)
+
+
+def _cmd_kategori(args):
+    with buka_baca(args.db) as conn:
+        data = data_kategori(conn, args.tahun, args.bulan, args.tipe)
+    _keluarkan(teks_kategori(data), data, args)
+
+
+def _cmd_export(args):
+    # Filter periode sama dengan tombol export di Laporan, termasuk transaksi di file arsip
+    from csv_io import export_transaksi_csv
+    with buka_baca(args.db) as conn:
+        clause, params = periode_clause(conn, args.tahun, args.bulan)
+        with bagian_sumber(args.db, conn, sumber_periode(get_tahun_arsip(conn), args.tahun)) as bagian:
+            n = export_transaksi_csv(conn, args.file, clause, params, bagian=bagian)
+    print(f"{n} transaksi diekspor ke {args.file}")
+
+
+def _cmd_batch(args):
+    t0 = time.perf_counter()
+    hasil = batch_laporan_bulanan(args.dbs, args.tahun, args.bulan, args.output, args.json, args.workers)
+    gagal = 0
+    for db_path, path, error in hasil:
+        if error:
+            gagal += 1
+            print(f"GAGAL {db_path}: {error}", file=sys.stderr)
+        else:
+            print(f"{db_path} -> {path}")
+    print(f"{len(hasil) - gagal}/{len(hasil)} laporan dalam {time.perf_counter() - t0:.2f} s")
+    return 1 if gagal else 0
+
+
+def jalankan(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py", description="Laporan Autofint tanpa GUI (database dibuka read-only)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def tambah_db_output(p):
+        p.add_argument("--db", default=db_default(), help="path keuangan.db")
+        p.add_argument("--json", action="store_true", help="keluaran JSON")
+        p.add_argument("-o", "--output", help="tulis ke file, bukan stdout")
+
+    def tambah_periode(p, bulan="Semua"):
+        p.add_argument("--tahun", type=_tahun, default=str(date.today().year), help="tahun atau 'semua' (default tahun ini)")
+        p.add_argument("--bulan", type=_bulan, default=bulan, help="1-12 atau 'semua'")
+
+    tambah_db_output(sub.add_parser("ringkasan", help="angka header Beranda (saldo, pemasukan, pengeluaran, tabungan)"))
+    p_kategori = sub.add_parser("kategori", help="rincian per kategori seperti chart Laporan")
+    tambah_db_output(p_kategori)
+    tambah_periode(p_kategori)
+    p_kategori.add_argument("--tipe", choices=TIPE, default="Pengeluaran")
+    p_export = sub.add_parser("export", help="export CSV dengan filter periode Laporan")
+    p_export.add_argument("file")
+    p_export.add_argument("--db", default=db_default(), help="path keuangan.db")
+    tambah_periode(p_export)
+    p_batch = sub.add_parser("batch", help="laporan bulanan untuk banyak file database sekaligus")
+    p_batch.add_argument("dbs", nargs="+", help="file keuangan.db")
+    p_batch.add_argument("--tahun", type=int, default=date.today().year)
+    p_batch.add_argument("--bulan", type=int, choices=range(1, 13), default=date.today().month)
+    p_batch.add_argument("-o", "--output", default="laporan", help="folder hasil (default ./laporan)")
+    p_batch.add_argument("--json", action="store_true", help="file .json, bukan .txt")
+    p_batch.add_argument("--workers", type=int, default=None, help="jumlah proses (default jumlah CPU)")
+    args = parser.parse_args(argv)
+
+    perintah = {"ringkasan": _cmd_ringkasan, "kategori": _cmd_kategori, "export": _cmd_export, "batch": _cmd_batch}
+    try:
+        return perintah[args.cmd](args) or 0
+    except DatabaseTidakSiap as ex:
+        print(ex, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(jalankan())
@@ -0,0 +1,234 @@
+import csv
+import heapq
+import os
+from datetime import datetime
+from itertools import islice
+
+from database import SUMBER_AKTIF, kunci_urut
+from model import SQL_HARI_KE_ISO, iso_ke_hari, ke_rupiah_bulat
+
+CSV_HEADER = ["ID", "Tanggal", "Tipe", "Kategori", "Deskripsi", "Jumlah", "Is Tabungan"]
+# Kolom hari & jumlah INTEGER dikembalikan ke format CSV lama (tanggal ISO, jumlah REAL)
+CSV_KOLOM = f"id, {SQL_HARI_KE_ISO.format(t='')}, tipe, kategori, deskripsi, CAST(jumlah AS REAL), is_tabungan"
+EXPORT_BATCH_SIZE = 2000
+
+
+class ProsesDibatalkan(Exception):
+    # Export/import dihentikan lewat cancel_event
+    pass
+
+
+# --- EXPORT CSV (STREAMING) ---
+# Baris dibaca dari cursor per batch (fetchmany) dan langsung ditulis ke file,
+# jadi pemakaian memori konstan berapapun jumlah transaksinya.
+def export_transaksi_csv(conn, path, where_clause="", params=(), batch_size=EXPORT_BATCH_SIZE, progress=None, cancel_event=None, bagian=None):
+    # where_clause tanpa WHERE (mis. dari periode_clause); progress(selesai, total) dipanggil tiap batch.
+    # bagian = [(koneksi, sumber)] dari Repository.reader_sumber bila arsip ikut diekspor;
+    # default hanya data aktif di conn. Tiap file dibaca dengan cursor sendiri (urut index)
+    # lalu digabung urut dengan heapq.merge.
+    # File ditulis ke .tmp lalu di-rename, sehingga export yang batal/gagal tidak meninggalkan file setengah jadi.
+    bagian = bagian or [(conn, SUMBER_AKTIF)]
+    where_sql = f" WHERE {where_clause}" if where_clause else ""
+    # Dengan filter periode ikuti urutan idx_transaksi_hari; tanpa filter urutan rowid (sama seperti dulu)
+    order_sql = " ORDER BY hari, id" if where_clause else " ORDER BY id"
+    kunci = kunci_urut if where_clause else (lambda row: row[0])
+
+    tabel = [(k, f"{skema}.transaksi") for k, sumber in bagian for skema in sumber]
+    total = sum(k.execute(f"SELECT COUNT(*) FROM {t}{where_sql}", params).fetchone()[0] for k, t in tabel)
+    tmp_path = path + ".tmp"
+    selesai = 0
+    cursors = [k.cursor() for k, _ in tabel]
+    try:
+        for cur, (_, t) in zip(cursors, tabel):
+            cur.execute(f"SELECT {CSV_KOLOM} FROM {t}{where_sql}{order_sql}", params)
+        rows = cursors[0] if len(cursors) == 1 else heapq.merge(*cursors, key=kunci)
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            if progress:
+                progress(0, total)
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ProsesDibatalkan()
+                batch = cur.fetchmany(batch_size) if len(cursors) == 1 else list(islice(rows, batch_size))
+                if not batch:
+                    break
+                writer.writerows(batch)
+                selesai += len(batch)
+                if progress:
+                    progress(selesai, total)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        for cur in cursors:
+            cur.close()
+    return selesai
+
+
+# --- IMPORT CSV (BULK) ---
+# Format default = format hasil export. MAPPING_DEFAULT: kolom tabel -> nama kolom CSV,
+# bisa diganti untuk CSV bank (mis. {"tanggal": "Date", "jumlah": "Amount", ...}).
+MAPPING_DEFAULT = {
+    "tanggal": "Tanggal", "tipe": "Tipe", "kategori": "Kategori",
+    "deskripsi": "Deskripsi", "jumlah": "Jumlah", "is_tabungan": "Is Tabungan",
+}
+IMPORT_BATCH_SIZE = 5000
+MAX_ERROR_DICATAT = 50
+TIPE_VALID = ("Pemasukan", "Pengeluaran")
+
+_SQL_INSERT = "INSERT INTO transaksi (hari, tipe, kategori, deskripsi, jumlah, is_tabungan) VALUES (?,?,?,?,?,?)"
+# Dedup memakai idx_transaksi_dedup; duplikat di dalam file yang sama ikut tersaring
+# karena baris batch sebelumnya sudah terlihat di transaksi yang sama.
+_SQL_INSERT_DEDUP = """
+    INSERT INTO transaksi (hari, tipe, kategori, deskripsi, jumlah, is_tabungan)
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6
+    WHERE NOT EXISTS (SELECT 1 FROM main.transaksi WHERE hari=?1 AND jumlah=?5 AND deskripsi IS ?4)"""
+
+
+def _sql_insert_dedup(arsip=()):
+    # arsip = skema arsip yang sudah di-ATTACH ke conn, ikut dicek dengan index dedup-nya
+    return _SQL_INSERT_DEDUP + "".join(
+        f"\n    AND NOT EXISTS (SELECT 1 FROM {skema}.transaksi WHERE hari=?1 AND jumlah=?5 AND deskripsi IS ?4)" for skema in arsip)
+
+
+def _parse_baris(row, kolom, kategori_map, format_tanggal):
+    def ambil(field):
+        idx = kolom.get(field)
+        return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+    tanggal = iso_ke_hari(datetime.strptime(ambil("tanggal"), format_tanggal).strftime("%Y-%m-%d"))
+    tipe = ambil("tipe")
+    if tipe not in TIPE_VALID:
+        raise ValueError(f"tipe tidak dikenal: {tipe!r}")
+    kategori = ambil("kategori")
+    if not kategori:
+        raise ValueError("kategori kosong")
+    jumlah = ke_rupiah_bulat(ambil("jumlah"))
+    if jumlah < 0:
+        raise ValueError("jumlah negatif")
+    deskripsi = ambil("deskripsi")
+
+    # is_tabungan mengikuti master kategori; kolom CSV hanya dipakai untuk kategori baru
+    if kategori in kategori_map:
+        is_tabungan = kategori_map[kategori]
+    else:
+        is_tabungan = 1 if ambil("is_tabungan") in ("1", "true", "True") else 0
+    return (tanggal, tipe, kategori, deskripsi, jumlah, is_tabungan)
+
+
+def import_transaksi_csv(conn, path, mapping=None, dedup=False, format_tanggal="%Y-%m-%d",
+                         batch_size=IMPORT_BATCH_SIZE, progress=None, cancel_event=None, arsip=()):
+    # Baca CSV secara streaming, validasi, lalu executemany per batch dalam SATU transaksi
+    # (batal/gagal = rollback semua). progress(dibaca) dipanggil tiap batch.
+    mapping = dict(mapping or MAPPING_DEFAULT)
+    hasil = {"dibaca": 0, "diimpor": 0, "duplikat": 0, "invalid": 0, "errors": []}
+
+    # Map kategori dimuat sekali, bukan SELECT per baris
+    kategori_map = {nama: tab or 0 for nama, tab in conn.execute("SELECT nama, is_tabungan FROM master_kategori")}
+    kategori_baru = {}
+    sql = _sql_insert_dedup(arsip) if dedup else _SQL_INSERT
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return hasil
+        posisi = {nama.strip(): i for i, nama in enumerate(header)}
+        kolom = {field: posisi.get(nama) for field, nama in mapping.items()}
+        hilang = [mapping[f] for f in ("tanggal", "tipe", "kategori", "jumlah") if kolom.get(f) is None]
+        if hilang:
+            raise ValueError(f"Kolom CSV tidak ditemukan: {', '.join(hilang)}")
+
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            batch = []
+            for nomor_baris, row in enumerate(reader, start=2):
+                if not row:
+                    continue
+                hasil["dibaca"] += 1
+                try:
+                    data = _parse_baris(row, kolom, kategori_map, format_tanggal)
+                except ValueError as ex:
+                    hasil["invalid"] += 1
+                    if len(hasil["errors"]) < MAX_ERROR_DICATAT:
+                        hasil["errors"].append((nomor_baris, str(ex)))
+                    continue
+                if data[2] not in kategori_map:
+                    kategori_baru.setdefault(data[2], (data[1], data[5]))
+                batch.append(data)
+
+                if len(batch) >= batch_size:
+                    _insert_batch(cur, sql, batch, hasil)
+                    batch = []
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ProsesDibatalkan()
+                    if progress:
+                        progress(hasil["dibaca"])
+            if batch:
+                _insert_batch(cur, sql, batch, hasil)
+
+            # Kategori yang belum ada didaftarkan agar bisa dipilih saat edit
+            cur.executemany("INSERT OR IGNORE INTO master_kategori VALUES (?,?,?)",
+                            [(nama, tipe, tab) for nama, (tipe, tab) in kategori_baru.items()])
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+
+    if progress:
+        progress(hasil["dibaca"])
+    return hasil
+
+
+def _insert_batch(cur, sql, batch, hasil):
+    cur.executemany(sql, batch)
+    hasil["diimpor"] += cur.rowcount
+    hasil["duplikat"] += len(batch) - cur.rowcount
+
+
+if __name__ == "__main__":
+    # python csv_io.py keuangan.db import mutasi.csv --dedup --map tanggal=Date jumlah=Amount
+    # python csv_io.py keuangan.db export laporan.csv --tahun 2024 --bulan 03
+    import argparse
+    import sqlite3
+    import sys
+    from database import Repository, migrate
+
+    parser = argparse.ArgumentParser(description="Import/export CSV transaksi Autofint")
+    parser.add_argument("db")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_import = sub.add_parser("import")
+    p_import.add_argument("csv")
+    p_import.add_argument("--dedup", action="store_true", help="lewati baris dengan (tanggal, jumlah, deskripsi) yang sudah ada")
+    p_import.add_argument("--map", nargs="*", default=[], metavar="KOLOM=HEADER", help="override mapping kolom")
+    p_import.add_argument("--format-tanggal", default="%Y-%m-%d")
+    p_export = sub.add_parser("export")
+    p_export.add_argument("csv")
+    p_export.add_argument("--tahun", default="Semua")
+    p_export.add_argument("--bulan", default="Semua")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    if args.cmd == "import":
+        mapping = dict(MAPPING_DEFAULT)
+        mapping.update(dict(m.split("=", 1) for m in args.map))
+        hasil = import_transaksi_csv(conn, args.csv, mapping, dedup=args.dedup, format_tanggal=args.format_tanggal,
+                                     progress=lambda n: print(f"\r{n:,} baris dibaca", end="", file=sys.stderr))
+        print(file=sys.stderr)
+        print(f"Dibaca {hasil['dibaca']}, diimpor {hasil['diimpor']}, duplikat {hasil['duplikat']}, invalid {hasil['invalid']}")
+        for nomor_baris, pesan in hasil["errors"]:
+            print(f"  baris {nomor_baris}: {pesan}")
+    else:
+        # Lewat Repository supaya tahun yang sudah diarsipkan ikut diekspor
+        conn.close()
+        repo = Repository(args.db)
+        clause, params = repo.periode_clause(args.tahun, args.bulan)
+        print(f"{repo.export_csv(args.csv, clause, params, sumber=repo.sumber_periode(args.tahun))} baris diekspor")
+        repo.close()
@@ -0,0 +1,1404 @@
+import hashlib
+import heapq
+import os
+import pathlib
+import queue
+import shutil
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+from datetime import date
+
+from model import KategoriInfo, SQL_HARI_KE_ISO, buat_transaksi, get_icon_for_category, hari_ke_iso, iso_ke_hari
+from events import EventBus, PerubahanData, INSERTED, UPDATED, DELETED, BULK
+from cache import QueryCache
+from profiler import ProfilingConnection
+
+# --- KATEGORI DEFAULT ---
+DEFAULT_KATEGORI = [
+    ("Gaji", "Pemasukan", 0), ("Bonus", "Pemasukan", 0),
+    ("Makan", "Pengeluaran", 0), ("Transport", "Pengeluaran", 0),
+    ("Belanja", "Pengeluaran", 0), ("Tagihan", "Pengeluaran", 0),
+    ("Hiburan", "Pengeluaran", 0), ("Kesehatan", "Pengeluaran", 0),
+    ("Dana Darurat", "Pengeluaran", 1), ("Investasi Saham", "Pengeluaran", 1)
+]
+
+
+# --- MIGRASI SKEMA ---
+# Setiap langkah dijalankan sekali, versi disimpan di PRAGMA user_version.
+# Urutan list = nomor versi, jangan pernah ubah/hapus langkah yang sudah rilis.
+def _migrasi_tabel_awal(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS transaksi
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  tanggal TEXT,
+                  tipe TEXT,
+                  kategori TEXT,
+                  deskripsi TEXT,
+                  jumlah REAL,
+                  is_tabungan INTEGER DEFAULT 0)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS master_kategori
+                 (nama TEXT PRIMARY KEY, tipe TEXT, is_tabungan INTEGER)''')
+
+    c.execute("SELECT COUNT(*) FROM master_kategori")
+    if c.fetchone()[0] == 0:
+        c.executemany("INSERT INTO master_kategori VALUES (?,?,?)", DEFAULT_KATEGORI)
+
+
+def _migrasi_index_transaksi(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_tanggal ON transaksi(tanggal)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_tipe_tabungan ON transaksi(tipe, is_tabungan)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_kategori ON transaksi(kategori)")
+
+
+# Saldo header Beranda dibaca dari satu baris ringkasan (O(1)), dijaga trigger
+# setiap INSERT/UPDATE/DELETE transaksi. Klasifikasi sama persis dengan query lama:
+# pemasukan = tipe Pemasukan, pengeluaran = Pengeluaran non-tabungan, tabungan = Pengeluaran is_tabungan=1
+_SQL_DELTA_RINGKASAN = """
+    UPDATE ringkasan_saldo SET
+        pemasukan = pemasukan {op} CASE WHEN {r}.tipe='Pemasukan' THEN COALESCE({r}.jumlah, 0) ELSE 0 END,
+        pengeluaran = pengeluaran {op} CASE WHEN {r}.tipe='Pengeluaran' AND {r}.is_tabungan=0 THEN COALESCE({r}.jumlah, 0) ELSE 0 END,
+        tabungan = tabungan {op} CASE WHEN {r}.tipe='Pengeluaran' AND {r}.is_tabungan=1 THEN COALESCE({r}.jumlah, 0) ELSE 0 END
+    WHERE id=1;"""
+
+
+def _buat_tabel_ringkasan(c, tipe_kolom):
+    c.execute(f'''CREATE TABLE IF NOT EXISTS ringkasan_saldo
+                 (id INTEGER PRIMARY KEY CHECK (id = 1),
+                  pemasukan {tipe_kolom} NOT NULL DEFAULT 0,
+                  pengeluaran {tipe_kolom} NOT NULL DEFAULT 0,
+                  tabungan {tipe_kolom} NOT NULL DEFAULT 0)''')
+    c.execute("INSERT OR IGNORE INTO ringkasan_saldo (id) VALUES (1)")
+    _hitung_ulang_ringkasan(c)
+
+
+def _buat_trigger_ringkasan(c):
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_ringkasan_insert AFTER INSERT ON transaksi BEGIN"
+              + _SQL_DELTA_RINGKASAN.format(op="+", r="NEW") + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_ringkasan_delete AFTER DELETE ON transaksi BEGIN"
+              + _SQL_DELTA_RINGKASAN.format(op="-", r="OLD") + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_ringkasan_update AFTER UPDATE OF tipe, jumlah, is_tabungan ON transaksi BEGIN"
+              + _SQL_DELTA_RINGKASAN.format(op="-", r="OLD")
+              + _SQL_DELTA_RINGKASAN.format(op="+", r="NEW") + " END")
+
+
+def _migrasi_ringkasan_saldo(c):
+    _buat_tabel_ringkasan(c, "REAL")
+    _buat_trigger_ringkasan(c)
+
+
+def fts5_didukung(c):
+    # Tidak semua build SQLite (mis. sebagian Android) menyertakan FTS5
+    try:
+        c.execute("CREATE VIRTUAL TABLE temp._cek_fts5 USING fts5(x)")
+        c.execute("DROP TABLE temp._cek_fts5")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _buat_trigger_fts(c):
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transaksi BEGIN
+                     INSERT INTO transaksi_fts(rowid, deskripsi, kategori) VALUES (NEW.id, NEW.deskripsi, NEW.kategori);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON transaksi BEGIN
+                     INSERT INTO transaksi_fts(transaksi_fts, rowid, deskripsi, kategori) VALUES ('delete', OLD.id, OLD.deskripsi, OLD.kategori);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF deskripsi, kategori ON transaksi BEGIN
+                     INSERT INTO transaksi_fts(transaksi_fts, rowid, deskripsi, kategori) VALUES ('delete', OLD.id, OLD.deskripsi, OLD.kategori);
+                     INSERT INTO transaksi_fts(rowid, deskripsi, kategori) VALUES (NEW.id, NEW.deskripsi, NEW.kategori);
+                 END''')
+
+
+def _migrasi_fts_transaksi(c):
+    # Index full-text (external content) atas deskripsi & kategori untuk kotak Cari.
+    # Tanpa FTS5 migrasi dilewati dan pencarian kembali ke LIKE.
+    if not fts5_didukung(c):
+        return
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS transaksi_fts USING fts5(
+                     deskripsi, kategori,
+                     content='transaksi', content_rowid='id',
+                     tokenize='unicode61 remove_diacritics 2')''')
+    _buat_trigger_fts(c)
+    # Backfill dari isi tabel transaksi yang sudah ada
+    c.execute("INSERT INTO transaksi_fts(transaksi_fts) VALUES ('rebuild')")
+
+
+def _migrasi_index_dedup(c):
+    # Dipakai import CSV untuk cek duplikat (tanggal, jumlah, deskripsi) tanpa full scan
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_dedup ON transaksi(tanggal, jumlah, deskripsi)")
+
+
+# Rollup per (tahun, bulan, tipe, kategori, is_tabungan) untuk chart Laporan & tren bulanan,
+# dijaga trigger seperti ringkasan_saldo. Baris dengan tanggal NULL tidak ikut di-rollup.
+# SQL dibangkitkan per format kolom tanggal: v6 masih TEXT ISO, sejak v7 hari INTEGER (YYYYMMDD).
+SqlRollup = namedtuple("SqlRollup", ["kolom", "tambah", "kurang", "penuh"])
+
+
+def _sql_rollup(kolom, tahun, bulan):
+    key = {
+        "tahun": tahun,
+        "bulan": bulan,
+        "tipe": "COALESCE({r}.tipe, '')",
+        "kategori": "COALESCE({r}.kategori, '')",
+        "is_tabungan": "COALESCE({r}.is_tabungan, 0)",
+    }
+    where = " AND ".join(f"{k} = {v}" for k, v in key.items())
+    tambah = """
+    INSERT INTO rollup_bulanan (tahun, bulan, tipe, kategori, is_tabungan, total, jumlah_trx)
+    SELECT """ + ", ".join(key.values()) + """, COALESCE({r}.jumlah, 0), 1
+    WHERE {r}.""" + kolom + """ IS NOT NULL
+    ON CONFLICT (tahun, bulan, tipe, kategori, is_tabungan)
+    DO UPDATE SET total = total + excluded.total, jumlah_trx = jumlah_trx + 1;"""
+    kurang = """
+    UPDATE rollup_bulanan SET total = total - COALESCE({r}.jumlah, 0), jumlah_trx = jumlah_trx - 1
+    WHERE """ + where + """;
+    DELETE FROM rollup_bulanan WHERE jumlah_trx <= 0 AND """ + where + ";"
+    penuh = """
+    SELECT """ + ", ".join(v.format(r="transaksi") for v in key.values()) + """ AS k,
+           SUM(COALESCE(jumlah, 0)), COUNT(*)
+    FROM {tabel} WHERE """ + kolom + """ IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5"""
+    return SqlRollup(kolom, tambah, kurang, penuh)
+
+
+_ROLLUP_TEKS = _sql_rollup("tanggal", "CAST(substr({r}.tanggal, 1, 4) AS INTEGER)", "CAST(substr({r}.tanggal, 6, 2) AS INTEGER)")
+_ROLLUP_HARI = _sql_rollup("hari", "{r}.hari / 10000", "{r}.hari / 100 % 100")
+
+
+def _buat_trigger_rollup(c, sql):
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON transaksi BEGIN"
+              + sql.tambah.format(r="NEW") + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON transaksi BEGIN"
+              + sql.kurang.format(r="OLD") + " END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_rollup_update AFTER UPDATE OF {sql.kolom}, tipe, kategori, jumlah, is_tabungan ON transaksi BEGIN"
+              + sql.kurang.format(r="OLD")
+              + sql.tambah.format(r="NEW") + " END")
+
+
+def _buat_tabel_rollup(c, tipe_total, nama="rollup_bulanan"):
+    c.execute(f'''CREATE TABLE IF NOT EXISTS {nama}
+                 (tahun INTEGER NOT NULL,
+                  bulan INTEGER NOT NULL,
+                  tipe TEXT NOT NULL,
+                  kategori TEXT NOT NULL,
+                  is_tabungan INTEGER NOT NULL,
+                  total {tipe_total} NOT NULL DEFAULT 0,
+                  jumlah_trx INTEGER NOT NULL DEFAULT 0,
+                  PRIMARY KEY (tahun, bulan, tipe, kategori, is_tabungan)) WITHOUT ROWID''')
+
+
+def _migrasi_rollup_bulanan(c):
+    _buat_tabel_rollup(c, "REAL")
+    _hitung_ulang_rollup(c, _ROLLUP_TEKS)
+    _buat_trigger_rollup(c, _ROLLUP_TEKS)
+
+
+# Format ringkas: jumlah dalam rupiah bulat (INTEGER) dan tanggal sebagai hari INTEGER
+# YYYYMMDD. SUM jadi eksak, perbandingan range tanpa parsing string, dan file lebih kecil.
+# Tabel dibangun ulang dalam satu INSERT ... SELECT; id dan sqlite_sequence dipertahankan
+# sehingga rowid FTS tetap valid. Tanggal yang tidak berformat ISO menjadi NULL.
+# jumlah disalin apa adanya: afinitas INTEGER menyimpan nilai bulat sebagai integer, sedangkan
+# nominal pecahan lama (mis. 12500.5) tetap REAL supaya total, tampilan & CSV tidak berubah.
+_SQL_ISO_KE_HARI = """
+    CASE WHEN tanggal GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+         THEN CAST(substr(tanggal, 1, 4) || substr(tanggal, 6, 2) || substr(tanggal, 9, 2) AS INTEGER)
+    END"""
+
+
+def _migrasi_format_ringkas(c):
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name='transaksi'")
+    seq = c.fetchone()
+    c.execute('''CREATE TABLE transaksi_baru
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  hari INTEGER,
+                  tipe TEXT,
+                  kategori TEXT,
+                  deskripsi TEXT,
+                  jumlah INTEGER,
+                  is_tabungan INTEGER DEFAULT 0)''')
+    c.execute(f'''INSERT INTO transaksi_baru (id, hari, tipe, kategori, deskripsi, jumlah, is_tabungan)
+                  SELECT id, {_SQL_ISO_KE_HARI}, tipe, kategori, deskripsi, jumlah, is_tabungan
+                  FROM transaksi ORDER BY id''')
+    # DROP ikut menghapus index & trigger lama (ringkasan, fts, rollup)
+    c.execute("DROP TABLE transaksi")
+    c.execute("ALTER TABLE transaksi_baru RENAME TO transaksi")
+    if seq:
+        c.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name='transaksi'", (seq[0],))
+
+    # idx_transaksi_hari = (hari, rowid): urutan keyset ORDER BY hari, id tanpa sort tambahan.
+    # idx_transaksi_dedup juga diawali hari, tapi id-nya baru urut per (hari, jumlah, deskripsi).
+    c.execute("CREATE INDEX idx_transaksi_hari ON transaksi(hari)")
+    c.execute("CREATE INDEX idx_transaksi_tipe_tabungan ON transaksi(tipe, is_tabungan)")
+    c.execute("CREATE INDEX idx_transaksi_kategori ON transaksi(kategori)")
+    c.execute("CREATE INDEX idx_transaksi_dedup ON transaksi(hari, jumlah, deskripsi)")
+
+    c.execute("DROP TABLE ringkasan_saldo")
+    _buat_tabel_ringkasan(c, "INTEGER")
+    _buat_trigger_ringkasan(c)
+
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='transaksi_fts'")
+    if c.fetchone():
+        _buat_trigger_fts(c)
+
+    c.execute("DROP TABLE rollup_bulanan")
+    _buat_tabel_rollup(c, "INTEGER")
+    _hitung_ulang_rollup(c)
+    _buat_trigger_rollup(c, _ROLLUP_HARI)
+
+
+# Tahun lama bisa dipindah ke file arsip per tahun (lihat ARSIP PER TAHUN). Totalnya tetap
+# disimpan di DB utama: arsip_tahun untuk saldo, rollup_arsip untuk chart & tren, dan view
+# rollup_semua menggabungkan rollup data aktif dengan rollup arsip.
+def _migrasi_arsip_tahun(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS arsip_tahun
+                 (tahun INTEGER PRIMARY KEY,
+                  file TEXT NOT NULL,
+                  jumlah_trx INTEGER NOT NULL DEFAULT 0,
+                  pemasukan INTEGER NOT NULL DEFAULT 0,
+                  pengeluaran INTEGER NOT NULL DEFAULT 0,
+                  tabungan INTEGER NOT NULL DEFAULT 0)''')
+    _buat_tabel_rollup(c, "INTEGER", "rollup_arsip")
+    c.execute("CREATE VIEW IF NOT EXISTS rollup_semua AS SELECT * FROM rollup_bulanan UNION ALL SELECT * FROM rollup_arsip")
+
+
+# Checkpoint saldo kas akhir bulan (lihat SALDO BERJALAN). Trigger hanya menggeser checkpoint
+# bulan transaksi dan sesudahnya; bulan baru mewarisi checkpoint terakhir sebelumnya.
+_SQL_NET = "CASE {r}.tipe WHEN 'Pemasukan' THEN COALESCE({r}.jumlah, 0) WHEN 'Pengeluaran' THEN -COALESCE({r}.jumlah, 0) ELSE 0 END"
+_SQL_DELTA_SALDO = """
+    INSERT OR IGNORE INTO saldo_bulanan (bulan, saldo)
+    SELECT {r}.hari / 100, COALESCE((SELECT saldo FROM saldo_bulanan WHERE bulan < {r}.hari / 100 ORDER BY bulan DESC LIMIT 1), 0)
+    WHERE {r}.hari IS NOT NULL;
+    UPDATE saldo_bulanan SET saldo = saldo {op} (""" + _SQL_NET + """) WHERE bulan >= {r}.hari / 100;"""
+
+
+def _buat_trigger_saldo(c):
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_saldo_insert AFTER INSERT ON transaksi BEGIN"
+              + _SQL_DELTA_SALDO.format(op="+", r="NEW") + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_saldo_delete AFTER DELETE ON transaksi BEGIN"
+              + _SQL_DELTA_SALDO.format(op="-", r="OLD") + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_saldo_update AFTER UPDATE OF hari, tipe, jumlah ON transaksi BEGIN"
+              + _SQL_DELTA_SALDO.format(op="-", r="OLD")
+              + _SQL_DELTA_SALDO.format(op="+", r="NEW") + " END")
+
+
+def _migrasi_saldo_bulanan(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS saldo_bulanan
+                 (bulan INTEGER PRIMARY KEY,
+                  saldo INTEGER NOT NULL) WITHOUT ROWID''')
+    _hitung_ulang_saldo_bulanan(c)
+    _buat_trigger_saldo(c)
+
+
+# --- CHANGE LOG (SINKRONISASI) ---
+# Setiap INSERT/UPDATE/DELETE transaksi & master_kategori dicatat trigger di changelog, satu
+# baris per kunci: perubahan baru menggantikan baris lama dengan seq baru (AUTOINCREMENT, jadi
+# seq selalu naik). Kunci transaksi = UUID 16 byte di sync_uuid (id lokal berbeda antar
+# perangkat, UUID tidak; id tetap saat baris pindah ke/dari arsip), kunci kategori = nama.
+# Versi (waktu ms, perangkat asal) dipakai sync.py untuk menyelesaikan konflik.
+# sync_meta.jeda = 1 mematikan pencatatan (pemindahan ke arsip bukan penghapusan).
+TABEL_SYNC_TRANSAKSI = 1
+TABEL_SYNC_KATEGORI = 2
+_SQL_CATAT = """
+    INSERT OR REPLACE INTO changelog (tabel, kunci, hapus, waktu, asal)
+    SELECT {tabel}, {kunci}, {hapus}, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER), m.perangkat
+    FROM sync_meta m{dari} WHERE m.id = 1 AND m.jeda = 0 AND {syarat};"""
+
+
+def _sql_catat_transaksi(id_trx, hapus):
+    return _SQL_CATAT.format(tabel=TABEL_SYNC_TRANSAKSI, kunci="u.uuid", hapus=hapus, dari=", sync_uuid u", syarat=f"u.id = {id_trx}")
+
+
+def _sql_catat_kategori(r, hapus, syarat="1"):
+    return _SQL_CATAT.format(tabel=TABEL_SYNC_KATEGORI, kunci=f"{r}.nama", hapus=hapus, dari="", syarat=f"{r}.nama IS NOT NULL AND {syarat}")
+
+
+def uuid_lama(*baris):
+    # UUID baris yang sudah ada sebelum changelog: deterministik dari id + isi, sehingga dua
+    # salinan file yang sama mendapat UUID yang sama tanpa perlu sinkron penuh
+    return hashlib.sha1(repr(baris).encode()).digest()[:16]
+
+
+def _buat_trigger_changelog(c):
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_sync_insert AFTER INSERT ON transaksi BEGIN"
+              " INSERT OR IGNORE INTO sync_uuid (id, uuid) VALUES (NEW.id, randomblob(16));"
+              + _sql_catat_transaksi("NEW.id", 0) + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_sync_update AFTER UPDATE ON transaksi BEGIN"
+              + _sql_catat_transaksi("NEW.id", 0) + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_sync_delete AFTER DELETE ON transaksi BEGIN"
+              + _sql_catat_transaksi("OLD.id", 1)
+              + " DELETE FROM sync_uuid WHERE id = OLD.id AND (SELECT jeda FROM sync_meta WHERE id = 1) = 0; END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_sync_kategori_insert AFTER INSERT ON master_kategori BEGIN"
+              + _sql_catat_kategori("NEW", 0) + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_sync_kategori_update AFTER UPDATE ON master_kategori BEGIN"
+              + _sql_catat_kategori("OLD", 1, "OLD.nama IS NOT NEW.nama")
+              + _sql_catat_kategori("NEW", 0) + " END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_sync_kategori_delete AFTER DELETE ON master_kategori BEGIN"
+              + _sql_catat_kategori("OLD", 1) + " END")
+
+
+def _migrasi_changelog(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_meta
+                 (id INTEGER PRIMARY KEY CHECK (id = 1),
+                  perangkat BLOB NOT NULL,
+                  jeda INTEGER NOT NULL DEFAULT 0,
+                  arsip_lengkap INTEGER NOT NULL DEFAULT 0,
+                  paket_terakhir TEXT)''')
+    c.execute("INSERT OR IGNORE INTO sync_meta (id, perangkat) VALUES (1, randomblob(16))")
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_uuid
+                 (id INTEGER PRIMARY KEY,
+                  uuid BLOB NOT NULL UNIQUE)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS changelog
+                 (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                  tabel INTEGER NOT NULL,
+                  kunci NOT NULL,
+                  hapus INTEGER NOT NULL,
+                  waktu INTEGER NOT NULL,
+                  asal BLOB NOT NULL,
+                  UNIQUE (tabel, kunci))''')
+    # diterima = seq peer terakhir yang sudah diterapkan di sini, dikonfirmasi = seq lokal
+    # terakhir yang sudah diterapkan peer (NULL = belum pernah, kirim semua)
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_peer
+                 (perangkat BLOB PRIMARY KEY,
+                  diterima INTEGER,
+                  dikonfirmasi INTEGER,
+                  terakhir TEXT)''')
+    # Baris lama tidak masuk changelog (versi 0); cukup diberi UUID. Baris arsip dilengkapi
+    # Repository saat dibuka (ATTACH tidak bisa di dalam transaksi migrasi).
+    c.connection.create_function("uuid_lama", 7, uuid_lama, deterministic=True)
+    c.execute(f"INSERT OR IGNORE INTO sync_uuid (id, uuid) SELECT id, uuid_lama({KOLOM_TABEL}) FROM transaksi")
+    _buat_trigger_changelog(c)
+
+
+def ganti_perangkat(c):
+    # Identitas sync baru untuk salinan file / hasil restore; peer lama diperlakukan seperti
+    # peer baru (sinkron berikutnya mengirim semua)
+    c.execute("UPDATE sync_meta SET perangkat = randomblob(16), paket_terakhir = NULL WHERE id = 1")
+    c.execute("DELETE FROM sync_peer")
+
+
+MIGRASI = [
+    _migrasi_tabel_awal,
+    _migrasi_index_transaksi,
+    _migrasi_ringkasan_saldo,
+    _migrasi_fts_transaksi,
+    _migrasi_index_dedup,
+    _migrasi_rollup_bulanan,
+    _migrasi_format_ringkas,
+    _migrasi_arsip_tahun,
+    _migrasi_saldo_bulanan,
+    _migrasi_changelog,
+]
+
+SCHEMA_VERSION = len(MIGRASI)
+# Langkah yang membangun ulang tabel besar; setelahnya file dipadatkan dengan VACUUM
+MIGRASI_PERLU_VACUUM = {_migrasi_format_ringkas}
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    versi = get_schema_version(conn)
+    vacuum = False
+    for nomor in range(versi, SCHEMA_VERSION):
+        c = conn.cursor()
+        # BEGIN eksplisit supaya DDL + update versi atomik (sqlite3 tidak auto-BEGIN untuk DDL)
+        c.execute("BEGIN")
+        try:
+            MIGRASI[nomor](c)
+            c.execute(f"PRAGMA user_version = {nomor + 1}")
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+        vacuum = vacuum or (versi > 0 and MIGRASI[nomor] in MIGRASI_PERLU_VACUUM)
+    if vacuum:
+        conn.execute("VACUUM")
+    return get_schema_version(conn)
+
+
+# --- RINGKASAN SALDO ---
+# ringkasan_saldo hanya mencakup tabel transaksi (data aktif); total arsip ada di arsip_tahun
+_SQL_TOTAL_PENUH = """
+    SELECT
+        COALESCE(SUM(CASE WHEN tipe='Pemasukan' THEN jumlah END), 0),
+        COALESCE(SUM(CASE WHEN tipe='Pengeluaran' AND is_tabungan=0 THEN jumlah END), 0),
+        COALESCE(SUM(CASE WHEN tipe='Pengeluaran' AND is_tabungan=1 THEN jumlah END), 0)
+    FROM {tabel}"""
+
+
+def _hitung_ulang_ringkasan(c):
+    c.execute(_SQL_TOTAL_PENUH.format(tabel="transaksi"))
+    m, k, inv = c.fetchone()
+    c.execute("UPDATE ringkasan_saldo SET pemasukan=?, pengeluaran=?, tabungan=? WHERE id=1", (m, k, inv))
+    return m, k, inv
+
+
+def _ringkasan_aktif(conn):
+    row = conn.execute("SELECT pemasukan, pengeluaran, tabungan FROM ringkasan_saldo WHERE id=1").fetchone()
+    return row if row else (0, 0, 0)
+
+
+def get_ringkasan(conn):
+    # Return (pemasukan, pengeluaran, tabungan) seluruh riwayat: data aktif + semua arsip
+    row = conn.execute('''
+        SELECT r.pemasukan + a.pemasukan, r.pengeluaran + a.pengeluaran, r.tabungan + a.tabungan
+        FROM ringkasan_saldo r,
+             (SELECT COALESCE(SUM(pemasukan), 0) AS pemasukan, COALESCE(SUM(pengeluaran), 0) AS pengeluaran,
+                     COALESCE(SUM(tabungan), 0) AS tabungan FROM arsip_tahun) a
+        WHERE r.id=1''').fetchone()
+    return row if row else (0, 0, 0)
+
+
+def verifikasi_ringkasan(conn, perbaiki=False):
+    # Hitung ulang total data aktif dari nol dan bandingkan dengan tabel ringkasan.
+    # Return dict {kolom: (tersimpan, seharusnya)} untuk kolom yang drift.
+    tersimpan = _ringkasan_aktif(conn)
+    seharusnya = conn.execute(_SQL_TOTAL_PENUH.format(tabel="transaksi")).fetchone()
+    drift = {
+        nama: (a, b)
+        for nama, a, b in zip(("pemasukan", "pengeluaran", "tabungan"), tersimpan, seharusnya)
+        if a != b
+    }
+    if perbaiki and drift:
+        with conn:
+            _hitung_ulang_ringkasan(conn.cursor())
+    return drift
+
+
+# --- ROLLUP BULANAN ---
+def _hitung_ulang_rollup(c, sql=_ROLLUP_HARI):
+    c.execute("DELETE FROM rollup_bulanan")
+    c.execute("INSERT INTO rollup_bulanan (tahun, bulan, tipe, kategori, is_tabungan, total, jumlah_trx)" + sql.penuh.format(tabel="transaksi"))
+
+
+def verifikasi_rollup(conn, perbaiki=False):
+    # Bandingkan rollup dengan hasil GROUP BY dari nol; return list key yang berbeda
+    tersimpan = {r[:5]: r[5:] for r in conn.execute("SELECT * FROM rollup_bulanan")}
+    seharusnya = {r[:5]: r[5:] for r in conn.execute(_ROLLUP_HARI.penuh.format(tabel="transaksi"))}
+    beda = sorted(k for k in tersimpan.keys() | seharusnya.keys() if tersimpan.get(k) != seharusnya.get(k))
+    if perbaiki and beda:
+        with conn:
+            _hitung_ulang_rollup(conn.cursor())
+    return beda
+
+
+def total_per_kategori(conn, tahun="Semua", bulan="Semua", tipe="Pengeluaran"):
+    # tahun/bulan sama seperti periode_clause ("Semua" / "2024" / "03"), dibaca dari rollup
+    clauses, params = ["tipe=?"], [tipe]
+    if tahun != "Semua":
+        clauses.append("tahun=?")
+        params.append(int(tahun))
+    if bulan != "Semua":
+        clauses.append("bulan=?")
+        params.append(int(bulan))
+    sql = f"SELECT kategori, SUM(total) FROM rollup_semua WHERE {' AND '.join(clauses)} GROUP BY kategori HAVING SUM(jumlah_trx) > 0"
+    return conn.execute(sql, params).fetchall()
+
+
+def _geser_bulan(tahun, bulan, n):
+    idx = tahun * 12 + (bulan - 1) + n
+    return idx // 12, idx % 12 + 1
+
+
+def tren_bulanan(conn, n_bulan=12, sampai=None):
+    # Return [(tahun, bulan, pemasukan, pengeluaran, tabungan)] untuk n_bulan terakhir
+    # s/d bulan `sampai` (default bulan ini), bulan tanpa data diisi 0.
+    sampai = sampai or date.today()
+    awal = _geser_bulan(sampai.year, sampai.month, -(n_bulan - 1))
+    rows = conn.execute('''
+        SELECT tahun, bulan,
+               SUM(CASE WHEN tipe='Pemasukan' THEN total ELSE 0 END),
+               SUM(CASE WHEN tipe='Pengeluaran' AND is_tabungan=0 THEN total ELSE 0 END),
+               SUM(CASE WHEN tipe='Pengeluaran' AND is_tabungan=1 THEN total ELSE 0 END)
+        FROM rollup_semua
+        WHERE tahun BETWEEN ? AND ? AND tahun * 100 + bulan BETWEEN ? AND ?
+        GROUP BY tahun, bulan''',
+        (awal[0], sampai.year, awal[0] * 100 + awal[1], sampai.year * 100 + sampai.month)).fetchall()
+    data = {(r[0], r[1]): r[2:] for r in rows}
+    hasil = []
+    for i in range(n_bulan):
+        t, b = _geser_bulan(awal[0], awal[1], i)
+        hasil.append((t, b) + tuple(data.get((t, b), (0, 0, 0))))
+    return hasil
+
+
+# --- FILTER PERIODE ---
+# Filter bulan/tahun diubah menjadi range hari setengah terbuka [awal, akhir)
+# supaya bisa memakai idx_transaksi_hari.
+def _awal_bulan_berikut(tahun, bulan):
+    if bulan == 12:
+        return date(tahun + 1, 1, 1)
+    return date(tahun, bulan + 1, 1)
+
+
+def _ke_hari(d):
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def range_periode(tahun, bulan=None):
+    # Return (awal, akhir) sebagai hari INTEGER YYYYMMDD
+    if bulan is None:
+        return _ke_hari(date(tahun, 1, 1)), _ke_hari(date(tahun + 1, 1, 1))
+    return _ke_hari(date(tahun, bulan, 1)), _ke_hari(_awal_bulan_berikut(tahun, bulan))
+
+
+def get_rentang_tahun(conn):
+    # Subquery terpisah agar MIN/MAX masing-masing dijawab langsung dari index; tahun arsip ikut dihitung
+    row = conn.execute('''SELECT (SELECT MIN(hari) FROM transaksi), (SELECT MAX(hari) FROM transaksi),
+                                   (SELECT MIN(tahun) FROM arsip_tahun), (SELECT MAX(tahun) FROM arsip_tahun)''').fetchone()
+    tahun = [t for t in (row[0] and row[0] // 10000, row[1] and row[1] // 10000, row[2], row[3]) if t]
+    if not tahun:
+        return None
+    return min(tahun), max(tahun)
+
+
+def periode_clause(conn, tahun="Semua", bulan="Semua"):
+    # tahun: "Semua" / "2024", bulan: "Semua" / "01".."12"
+    # Return (clause tanpa WHERE, params). Clause kosong berarti tanpa filter.
+    if tahun == "Semua" and bulan == "Semua":
+        return "", ()
+
+    if tahun != "Semua":
+        ranges = [range_periode(int(tahun), None if bulan == "Semua" else int(bulan))]
+    else:
+        # Bulan tertentu di semua tahun: satu range per tahun yang ada datanya
+        rentang = get_rentang_tahun(conn)
+        if rentang is None:
+            return "0", ()
+        ranges = [range_periode(t, int(bulan)) for t in range(rentang[0], rentang[1] + 1)]
+
+    clause = " OR ".join(["(hari >= ? AND hari < ?)"] * len(ranges))
+    params = tuple(v for r in ranges for v in r)
+    return f"({clause})", params
+
+
+# --- PENCARIAN ---
+def fts_aktif(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='transaksi_fts'").fetchone() is not None
+
+
+def fts_query(keyword):
+    # "mak sia" -> '"mak"* "sia"*' : semua kata harus cocok, masing-masing sebagai prefix.
+    # Tanda kutip dibuang agar input user tidak bisa merusak sintaks MATCH.
+    tokens = [t.replace('"', "") for t in keyword.split()]
+    return " ".join(f'"{t}"*' for t in tokens if t)
+
+
+def search_clause(conn, keyword):
+    # Return (clause, params) untuk filter kata kunci; FTS5 bila ada, fallback LIKE
+    match = fts_query(keyword) if fts_aktif(conn) else ""
+    if match:
+        return "id IN (SELECT rowid FROM transaksi_fts WHERE transaksi_fts MATCH ?)", (match,)
+    return "(deskripsi LIKE ? OR kategori LIKE ?)", (f"%{keyword}%", f"%{keyword}%")
+
+
+def cari_transaksi(conn, keyword, limit=20):
+    # Hasil pencarian diurutkan berdasarkan relevansi (bm25), bukan tanggal
+    match = fts_query(keyword) if fts_aktif(conn) else ""
+    if not match:
+        return query_transaksi_halaman(conn, search_keyword=keyword, limit=limit)
+    sql = f'''SELECT {kolom_transaksi("t.")}
+              FROM transaksi_fts f JOIN transaksi t ON t.id = f.rowid
+              WHERE transaksi_fts MATCH ? ORDER BY bm25(transaksi_fts), t.hari DESC, t.id DESC LIMIT ?'''
+    return conn.execute(sql, (match, limit)).fetchall()
+
+
+# --- DAFTAR TRANSAKSI (KEYSET PAGINATION) ---
+# Kolom hari dikembalikan sebagai tanggal ISO, urutan kolom sama dengan model.Transaksi
+def kolom_transaksi(t=""):
+    return f"{t}id, {SQL_HARI_KE_ISO.format(t=t)} AS tanggal, {t}tipe, {t}kategori, {t}deskripsi, {t}jumlah, {t}is_tabungan"
+
+
+KOLOM_TRANSAKSI = kolom_transaksi()
+KOLOM_TABEL = "id, hari, tipe, kategori, deskripsi, jumlah, is_tabungan"
+
+# Sumber = tuple nama skema yang dibaca: "main" (data aktif) ditambah skema arsip yang
+# sudah di-ATTACH (lihat ARSIP PER TAHUN). Dashboard & pencarian hanya memakai SUMBER_AKTIF.
+SUMBER_AKTIF = ("main",)
+
+
+# Halaman berikutnya dicari dari (hari, id) baris terakhir, bukan OFFSET,
+# sehingga biaya tiap halaman konstan berapapun jauhnya user scroll.
+def query_transaksi_halaman(conn, where_clause="", params=(), search_keyword="", setelah=None, limit=50, sumber=SUMBER_AKTIF):
+    # where_clause tanpa WHERE; setelah = (tanggal, id) baris terakhir halaman sebelumnya
+    clauses = [where_clause] if where_clause else []
+    sql_params = list(params)
+    if search_keyword:
+        clause, search_params = search_clause(conn, search_keyword)
+        clauses.append(clause)
+        sql_params += search_params
+    if setelah is not None:
+        clauses.append("(hari, id) < (?, ?)")
+        sql_params += [iso_ke_hari(setelah[0]), setelah[1]]
+    where_sql = " WHERE " + " AND ".join(clauses) if clauses else ""
+    if tuple(sumber) == SUMBER_AKTIF:
+        sql = f"SELECT {KOLOM_TRANSAKSI} FROM transaksi{where_sql} ORDER BY hari DESC, id DESC LIMIT ?"
+    else:
+        # Filter diulang di tiap file supaya masing-masing memakai index-nya sendiri dan
+        # hasilnya di-merge urut; subquery UNION ALL biasa membuat SQLite mengurutkan
+        # seluruh gabungan di temp b-tree untuk setiap halaman.
+        gabungan = " UNION ALL ".join(f"SELECT {KOLOM_TABEL} FROM {s}.transaksi{where_sql}" for s in sumber)
+        sql = f"SELECT {KOLOM_TRANSAKSI} FROM ({gabungan} ORDER BY hari DESC, id DESC LIMIT ?) ORDER BY hari DESC, id DESC"
+        sql_params = sql_params * len(sumber)
+    sql_params.append(limit)
+    return conn.execute(sql, sql_params).fetchall()
+
+
+def kunci_urut(row):
+    # Urutan (tanggal, id) sama dengan ORDER BY hari, id; tanggal NULL paling kecil
+    return (row[1] or "", row[0])
+
+
+# --- SALDO BERJALAN ---
+# saldo_bulanan(bulan YYYYMM, saldo) = saldo kas kumulatif (pemasukan - pengeluaran - tabungan)
+# di akhir setiap bulan yang punya transaksi, sejak awal riwayat (aktif + arsip). Saldo pada
+# tanggal mana pun = checkpoint bulan sebelumnya + SUM transaksi bulan itu s/d tanggal tsb
+# (range kecil di idx_transaksi_hari). Transaksi tanpa tanggal tidak masuk deret saldo.
+_SQL_NET_ROLLUP = "SUM(CASE tipe WHEN 'Pemasukan' THEN total WHEN 'Pengeluaran' THEN -total ELSE 0 END)"
+
+
+def _hitung_ulang_saldo_bulanan(c, dari=0):
+    # Checkpoint bulan >= dari dihitung ulang dari rollup_semua (window SUM), berlanjut dari
+    # checkpoint terakhir sebelum dari. Dipakai migrasi & setiap kali total arsip berubah.
+    awal = saldo_checkpoint(c, dari)
+    c.execute("DELETE FROM saldo_bulanan WHERE bulan >= ?", (dari,))
+    c.execute(f'''
+        INSERT INTO saldo_bulanan (bulan, saldo)
+        SELECT bulan, ? + SUM(net) OVER (ORDER BY bulan)
+        FROM (SELECT tahun * 100 + bulan AS bulan, {_SQL_NET_ROLLUP} AS net
+              FROM rollup_semua WHERE tahun >= ? AND tahun * 100 + bulan >= ?
+              GROUP BY 1)''', (awal, dari // 100, dari))
+
+
+def saldo_checkpoint(conn, bulan):
+    # Saldo di akhir bulan terakhir sebelum `bulan` (YYYYMM); 0 sebelum transaksi pertama
+    row = conn.execute("SELECT saldo FROM saldo_bulanan WHERE bulan < ? ORDER BY bulan DESC LIMIT 1", (bulan,)).fetchone()
+    return row[0] if row else 0
+
+
+def saldo_dalam_bulan(conn, hari, sumber=SUMBER_AKTIF):
+    # Net transaksi dari awal bulan `hari` s/d `hari` (inklusif) di skema sumber
+    net = _SQL_NET.format(r="transaksi")
+    return sum(conn.execute(f"SELECT COALESCE(SUM({net}), 0) FROM {s}.transaksi WHERE hari > ? AND hari <= ?",
+                            (hari // 100 * 100, hari)).fetchone()[0] for s in sumber)
+
+
+def seri_saldo_bulanan(conn, n_bulan=12, sampai=None):
+    # Return [(tahun, bulan, saldo akhir bulan)] untuk n_bulan terakhir s/d bulan `sampai`;
+    # bulan tanpa transaksi mewarisi saldo bulan sebelumnya
+    sampai = sampai or date.today()
+    awal = _geser_bulan(sampai.year, sampai.month, -(n_bulan - 1))
+    kunci_awal = awal[0] * 100 + awal[1]
+    saldo = saldo_checkpoint(conn, kunci_awal)
+    data = dict(conn.execute("SELECT bulan, saldo FROM saldo_bulanan WHERE bulan BETWEEN ? AND ?",
+                             (kunci_awal, sampai.year * 100 + sampai.month)).fetchall())
+    hasil = []
+    for i in range(n_bulan):
+        t, b = _geser_bulan(awal[0], awal[1], i)
+        saldo = data.get(t * 100 + b, saldo)
+        hasil.append((t, b, saldo))
+    return hasil
+
+
+def seri_saldo_harian(conn, tahun, bulan, sumber=SUMBER_AKTIF):
+    # Return [(tanggal, saldo akhir hari)] untuk setiap hari bertransaksi di bulan itu, diawali
+    # (0, saldo akhir bulan sebelumnya). Running sum harian dengan window function.
+    kunci = tahun * 100 + bulan
+    awal = saldo_checkpoint(conn, kunci)
+    net = _SQL_NET.format(r="transaksi")
+    gabungan = " UNION ALL ".join(f"SELECT hari, {net} AS net FROM {s}.transaksi WHERE hari > ? AND hari < ?" for s in sumber)
+    rows = conn.execute(f'''
+        SELECT hari % 100, ? + SUM(SUM(net)) OVER (ORDER BY hari)
+        FROM ({gabungan}) GROUP BY hari ORDER BY hari''',
+        (awal,) + (kunci * 100, kunci * 100 + 32) * len(sumber)).fetchall()
+    return [(0, awal)] + rows
+
+
+def verifikasi_saldo(conn, perbaiki=False):
+    # Bandingkan checkpoint dengan running sum rollup_semua dari nol; return list bulan yang berbeda.
+    # Checkpoint bulan yang transaksinya sudah terhapus semua tetap sah (sama dengan bulan sebelumnya).
+    seharusnya = conn.execute(f'''
+        SELECT bulan, SUM(net) OVER (ORDER BY bulan)
+        FROM (SELECT tahun * 100 + bulan AS bulan, {_SQL_NET_ROLLUP} AS net FROM rollup_semua GROUP BY 1)''').fetchall()
+    tersimpan = dict(conn.execute("SELECT bulan, saldo FROM saldo_bulanan").fetchall())
+    beda, i, saldo = [], 0, 0
+    for bulan in sorted(tersimpan.keys() | {b for b, _ in seharusnya}):
+        while i < len(seharusnya) and seharusnya[i][0] <= bulan:
+            saldo = seharusnya[i][1]
+            i += 1
+        if tersimpan.get(bulan) != saldo:
+            beda.append(bulan)
+    if perbaiki and beda:
+        with conn:
+            _hitung_ulang_saldo_bulanan(conn.cursor())
+    return beda
+
+
+# --- ARSIP PER TAHUN ---
+# Tahun di luar jendela TAHUN_AKTIF dipindah dari tabel transaksi ke file arsip per tahun
+# (keuangan_arsip_2021.db di folder yang sama) yang hanya di-ATTACH saat query butuh
+# tahun tersebut (Laporan "Semua" / filter tahun lama, export). Saldo, chart & tren tetap
+# lengkap tanpa membuka arsip karena totalnya ada di arsip_tahun & rollup_arsip.
+TAHUN_AKTIF = 3
+# Default SQLite hanya mengizinkan 10 database ter-ATTACH per koneksi
+MAX_ATTACH = 8
+
+
+def skema_arsip(tahun):
+    return f"arsip_{int(tahun)}"
+
+
+def nama_file_arsip(db_path, tahun):
+    root, ext = os.path.splitext(os.path.basename(db_path))
+    return f"{root}_arsip_{int(tahun)}{ext or '.db'}"
+
+
+def get_tahun_arsip(conn):
+    # {tahun: nama file} (relatif terhadap folder DB utama)
+    return dict(conn.execute("SELECT tahun, file FROM arsip_tahun ORDER BY tahun DESC").fetchall())
+
+
+def sumber_periode(tahun_arsip, tahun="Semua"):
+    # Data aktif selalu ikut: transaksi bertanggal lama bisa masuk lagi lewat import/edit
+    if tahun == "Semua":
+        return SUMBER_AKTIF + tuple(skema_arsip(t) for t in sorted(tahun_arsip, reverse=True))
+    if int(tahun) in tahun_arsip:
+        return SUMBER_AKTIF + (skema_arsip(tahun),)
+    return SUMBER_AKTIF
+
+
+def kelompok_sumber(sumber):
+    # Dipecah per MAX_ATTACH skema; tiap kelompok dibaca dengan satu koneksi
+    sumber = tuple(sumber)
+    return [sumber[i:i + MAX_ATTACH] for i in range(0, len(sumber), MAX_ATTACH)]
+
+
+def _buat_tabel_arsip(c, skema):
+    c.execute(f'''CREATE TABLE IF NOT EXISTS {skema}.transaksi
+                 (id INTEGER PRIMARY KEY,
+                  hari INTEGER,
+                  tipe TEXT,
+                  kategori TEXT,
+                  deskripsi TEXT,
+                  jumlah INTEGER,
+                  is_tabungan INTEGER DEFAULT 0)''')
+    c.execute(f"CREATE INDEX IF NOT EXISTS {skema}.idx_transaksi_hari ON transaksi(hari)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS {skema}.idx_transaksi_dedup ON transaksi(hari, jumlah, deskripsi)")
+
+
+def _segarkan_total_arsip(c, tahun, file):
+    # Total & rollup satu tahun arsip dihitung ulang dari isi file arsipnya
+    tabel = f"{skema_arsip(tahun)}.transaksi"
+    c.execute("DELETE FROM rollup_arsip WHERE tahun=?", (tahun,))
+    c.execute("INSERT INTO rollup_arsip (tahun, bulan, tipe, kategori, is_tabungan, total, jumlah_trx)"
+              + _ROLLUP_HARI.penuh.format(tabel=tabel))
+    m, k, inv = c.execute(_SQL_TOTAL_PENUH.format(tabel=tabel)).fetchone()
+    n = c.execute(f"SELECT COUNT(*) FROM {tabel}").fetchone()[0]
+    c.execute("INSERT OR REPLACE INTO arsip_tahun (tahun, file, jumlah_trx, pemasukan, pengeluaran, tabungan) VALUES (?,?,?,?,?,?)",
+              (tahun, file, n, m, k, inv))
+    # Checkpoint mengikuti rollup_semua saat ini; INSERT/DELETE data aktif sesudahnya
+    # (pemindahan ke/dari arsip) dikoreksi trigger saldo seperti biasa
+    _hitung_ulang_saldo_bulanan(c, tahun * 100 + 1)
+
+
+def path_arsip(db_path, file):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), file)
+
+
+def uri_baca(path):
+    # URI read-only untuk sqlite3.connect(..., uri=True) dan ATTACH arsip
+    return pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+
+
+@contextmanager
+def attach_arsip(conn, db_path, tahun, file=None):
+    # Untuk koneksi tulis (autocommit, di luar transaksi); file arsip dibuat jika belum ada
+    file = file or nama_file_arsip(db_path, tahun)
+    skema = skema_arsip(tahun)
+    conn.execute(f"ATTACH DATABASE ? AS {skema}", (path_arsip(db_path, file),))
+    try:
+        yield file
+    finally:
+        conn.execute(f"DETACH DATABASE {skema}")
+
+
+def arsipkan_tahun(conn, db_path, tahun, file=None):
+    # Dua langkah supaya crash di tengah tidak pernah menghilangkan data:
+    # 1. salin baris tahun itu ke file arsip dan commit (idempotent, id yang sama ditimpa);
+    # 2. satu transaksi di DB utama: daftarkan total arsip lalu hapus baris yang sudah tersalin.
+    # Crash di antara keduanya hanya menyisakan salinan yang ditimpa lagi saat diulang.
+    # file = file arsip yang sudah terdaftar di arsip_tahun (None untuk tahun baru).
+    awal, akhir = range_periode(tahun)
+    skema = skema_arsip(tahun)
+    terdaftar = file is not None
+    with attach_arsip(conn, db_path, tahun, file) as file:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            _buat_tabel_arsip(c, skema)
+            if not terdaftar:
+                # Isi file yang belum terdaftar (sisa percobaan yang gagal) tidak dipercaya
+                c.execute(f"DELETE FROM {skema}.transaksi")
+            c.execute(f"INSERT OR REPLACE INTO {skema}.transaksi ({KOLOM_TABEL}) SELECT {KOLOM_TABEL} FROM main.transaksi WHERE hari >= ? AND hari < ?",
+                      (awal, akhir))
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            _segarkan_total_arsip(c, tahun, file)
+            # Trigger ringkasan, rollup & FTS mengurangi baris ini dari data aktif; changelog
+            # dijeda karena baris hanya pindah (UUID di sync_uuid tetap)
+            c.execute("UPDATE sync_meta SET jeda = 1 WHERE id = 1")
+            c.execute(f"DELETE FROM main.transaksi WHERE hari >= ? AND hari < ? AND id IN (SELECT id FROM {skema}.transaksi)",
+                      (awal, akhir))
+            dipindah = c.rowcount
+            c.execute("UPDATE sync_meta SET jeda = 0 WHERE id = 1")
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+    return dipindah
+
+
+def arsipkan_tahun_lama(conn, db_path, tahun_aktif=TAHUN_AKTIF, sampai=None):
+    # Arsipkan semua tahun sebelum jendela tahun_aktif; return {tahun: jumlah baris dipindah}
+    batas = range_periode((sampai or date.today()).year - tahun_aktif + 1)[0]
+    tahun_arsip = get_tahun_arsip(conn)
+    hasil = {}
+    while True:
+        hari = conn.execute("SELECT MIN(hari) FROM transaksi WHERE hari < ?", (batas,)).fetchone()[0]
+        if hari is None:
+            return hasil
+        tahun = hari // 10000
+        hasil[tahun] = arsipkan_tahun(conn, db_path, tahun, tahun_arsip.get(tahun))
+
+
+def cari_di_arsip(conn, db_path, id_trx):
+    # Return (tahun, file) arsip yang memuat id_trx, atau None
+    for tahun, file in get_tahun_arsip(conn).items():
+        if not os.path.exists(path_arsip(db_path, file)):
+            continue
+        with attach_arsip(conn, db_path, tahun, file):
+            if conn.execute(f"SELECT 1 FROM {skema_arsip(tahun)}.transaksi WHERE id=?", (id_trx,)).fetchone():
+                return tahun, file
+    return None
+
+
+# --- REPOSITORY (DATA ACCESS LAYER) ---
+# Satu-satunya pintu SQL untuk UI. Pembaca (laporan, pencarian, export) meminjam koneksi
+# dari pool kecil sehingga cursor tidak pernah dipakai bersama antar thread; semua tulis
+# lewat satu koneksi writer yang diserialisasi dengan lock. Mode WAL membuat pembaca
+# tidak terblokir oleh penulis.
+DEFAULT_CACHE_KIB = 8192
+DEFAULT_MMAP_BYTES = 64 * 1024 * 1024
+DEFAULT_POOL_SIZE = 4
+BUSY_TIMEOUT_S = 5.0
+# Restore menunggu pembaca yang sedang berjalan selesai paling lama selama ini
+RESTORE_TUNGGU_S = 30.0
+
+
+class Repository:
+    def __init__(self, path, cache_kib=DEFAULT_CACHE_KIB, mmap_bytes=DEFAULT_MMAP_BYTES, pool_size=DEFAULT_POOL_SIZE, profiler=None,
+                 query_cache=None):
+        self.path = path
+        # profiler.Profiler: jika diisi, setiap statement SQL dicatat (lihat profiler.py)
+        self.profiler = profiler
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._write_lock = threading.RLock()
+        # Pintu pembaca: restore menutup semua koneksi, pembaca baru menunggu sampai dibuka lagi
+        self._pintu = threading.Condition()
+        self._pembaca_aktif = 0
+        self._tertutup = False
+        # Setiap tulis yang berhasil di-commit dipublish ke sini (lihat events.py)
+        self.events = EventBus()
+        # Cache hasil query baca (lihat cache.py). Subscriber pertama, jadi versi sudah naik
+        # sebelum subscriber lain (UI) memuat ulang data setelah sebuah tulis.
+        self.cache = query_cache if query_cache is not None else QueryCache()
+        self.events.subscribe(self.cache.naikkan_versi)
+        # master_kategori kecil & jarang berubah: dimuat sekali, di-reset via invalidate_kategori()
+        self._kategori_cache = None
+        # {tahun: file} dari arsip_tahun, di-reset setiap kali arsip berubah
+        self._arsip_cache = None
+        self._buka_writer()
+
+    def _buka_writer(self):
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.create_function("uuid_lama", 7, uuid_lama, deterministic=True)
+        with self._write_lock:
+            migrate(self._writer)
+            self._lengkapi_uuid_arsip()
+
+    def _lengkapi_uuid_arsip(self):
+        # Sekali setelah migrasi changelog: baris yang sudah diarsipkan sebelumnya diberi UUID
+        if self._writer.execute("SELECT arsip_lengkap FROM sync_meta WHERE id = 1").fetchone()[0]:
+            return
+        for tahun, file in get_tahun_arsip(self._writer).items():
+            if os.path.exists(path_arsip(self.path, file)):
+                with attach_arsip(self._writer, self.path, tahun, file):
+                    self._writer.execute(f"INSERT OR IGNORE INTO main.sync_uuid (id, uuid) SELECT id, uuid_lama({KOLOM_TABEL}) "
+                                         f"FROM {skema_arsip(tahun)}.transaksi")
+        self._writer.execute("UPDATE sync_meta SET arsip_lengkap = 1 WHERE id = 1")
+
+    def _connect(self):
+        # isolation_level=None: transaksi dikontrol eksplisit (BEGIN IMMEDIATE di write())
+        factory = ProfilingConnection if self.profiler else sqlite3.Connection
+        # uri=True: file arsip di-ATTACH read-only lewat URI "file:...?mode=ro"
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_S, check_same_thread=False, isolation_level=None, factory=factory, uri=True)
+        if self.profiler:
+            conn.profiler = self.profiler
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        with self._pintu:
+            while self._tertutup:
+                self._pintu.wait()
+            self._pembaca_aktif += 1
+        try:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                try:
+                    self._pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+        finally:
+            with self._pintu:
+                self._pembaca_aktif -= 1
+                self._pintu.notify_all()
+
+    @contextmanager
+    def reader_sumber(self, sumber=SUMBER_AKTIF):
+        # Yield [(koneksi, kelompok sumber)]: satu koneksi pool per kelompok (lihat kelompok_sumber)
+        # dengan arsip yang dibutuhkan sudah ter-ATTACH
+        with ExitStack() as stack:
+            bagian = []
+            for grup in kelompok_sumber(sumber):
+                conn = stack.enter_context(self.reader())
+                self._attach_reader(conn, grup)
+                bagian.append((conn, grup))
+            yield bagian
+
+    def _attach_reader(self, conn, grup):
+        # ATTACH dibiarkan terpasang di koneksi pool untuk query berikutnya;
+        # yang tidak dipakai baru dilepas jika slot ATTACH tidak cukup
+        perlu = set(grup) - {"main"}
+        if not perlu:
+            return
+        terpasang = {r[1] for r in conn.execute("PRAGMA database_list")} - {"main", "temp"}
+        if perlu <= terpasang:
+            return
+        if len(terpasang | perlu) > MAX_ATTACH:
+            for skema in terpasang - perlu:
+                conn.execute(f"DETACH DATABASE {skema}")
+        file_arsip = self.get_tahun_arsip()
+        for skema in perlu - terpasang:
+            path = path_arsip(self.path, file_arsip[int(skema.split("_")[1])])
+            conn.execute(f"ATTACH DATABASE ? AS {skema}", (uri_baca(path),))
+
+    @contextmanager
+    def writer(self):
+        # Koneksi writer tanpa transaksi otomatis (mis. untuk import yang mengatur BEGIN sendiri)
+        with self._write_lock:
+            yield self._writer
+
+    @contextmanager
+    def write(self):
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        self._tutup_pool()
+
+    def _tutup_pool(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # --- Baca ---
+    def _baca(self, kunci, fungsi, *args):
+        # fungsi(conn, *args) lewat koneksi pool, hasilnya di-cache dengan kunci (jenis, argumen...)
+        def hitung():
+            with self.reader() as conn:
+                return fungsi(conn, *args)
+        return self.cache.ambil(kunci, hitung)
+
+    def get_ringkasan(self):
+        return self._baca(("ringkasan",), get_ringkasan)
+
+    def periode_clause(self, tahun="Semua", bulan="Semua"):
+        with self.reader() as conn:
+            return periode_clause(conn, tahun, bulan)
+
+    def query_transaksi_halaman(self, where_clause="", params=(), search_keyword="", setelah=None, limit=50, sumber=SUMBER_AKTIF):
+        # Return list model.Transaksi (field tampilan sudah dihitung)
+        def hitung():
+            with self.reader_sumber(sumber) as bagian:
+                hasil = [query_transaksi_halaman(conn, where_clause, params, search_keyword, setelah, limit, grup)
+                         for conn, grup in bagian]
+            rows = hasil[0] if len(hasil) == 1 else list(heapq.merge(*hasil, key=kunci_urut, reverse=True))[:limit]
+            return [buat_transaksi(r) for r in rows]
+        kunci = ("halaman", where_clause, tuple(params), search_keyword, setelah, limit, tuple(sumber))
+        return self.cache.ambil(kunci, hitung)
+
+    def get_rentang_tahun(self):
+        return self._baca(("rentang_tahun",), get_rentang_tahun)
+
+    def get_tahun_arsip(self):
+        cache = self._arsip_cache
+        if cache is None:
+            with self.reader() as conn:
+                cache = get_tahun_arsip(conn)
+            self._arsip_cache = cache
+        return cache
+
+    def sumber_periode(self, tahun="Semua"):
+        # Skema yang perlu dibaca untuk filter tahun Laporan/export
+        return sumber_periode(self.get_tahun_arsip(), tahun)
+
+    def cari_transaksi(self, keyword, limit=20):
+        def hitung():
+            with self.reader() as conn:
+                rows = cari_transaksi(conn, keyword, limit)
+            return [buat_transaksi(r) for r in rows]
+        return self.cache.ambil(("cari", keyword, limit), hitung)
+
+    def total_per_kategori(self, tahun="Semua", bulan="Semua", tipe="Pengeluaran"):
+        return self._baca(("kategori", tahun, bulan, tipe), total_per_kategori, tahun, bulan, tipe)
+
+    def tren_bulanan(self, n_bulan=12, sampai=None):
+        # Default "bulan ini" ditetapkan di sini supaya entry cache ikut berganti saat bulan berganti
+        sampai = sampai or date.today().replace(day=1)
+        return self._baca(("tren", n_bulan, sampai), tren_bulanan, n_bulan, sampai)
+
+    def saldo_pada(self, tanggal):
+        # Saldo kas di akhir hari `tanggal` (ISO): satu lookup checkpoint + transaksi bulan itu
+        hari = iso_ke_hari(tanggal)
+
+        def hitung():
+            with self.reader_sumber(self.sumber_periode(str(hari // 10000))) as bagian:
+                return saldo_checkpoint(bagian[0][0], hari // 100) + sum(
+                    saldo_dalam_bulan(conn, hari, grup) for conn, grup in bagian)
+        return self.cache.ambil(("saldo_pada", hari), hitung)
+
+    def saldo_bulanan(self, n_bulan=12, sampai=None):
+        sampai = sampai or date.today().replace(day=1)
+        return self._baca(("saldo_bulanan", n_bulan, sampai), seri_saldo_bulanan, n_bulan, sampai)
+
+    def saldo_harian(self, tahun, bulan):
+        tahun, bulan = int(tahun), int(bulan)
+
+        def hitung():
+            # Satu tahun = data aktif + paling banyak satu arsip, selalu satu kelompok koneksi
+            with self.reader_sumber(self.sumber_periode(str(tahun))) as bagian:
+                conn, grup = bagian[0]
+                return seri_saldo_harian(conn, tahun, bulan, grup)
+        return self.cache.ambil(("saldo_harian", tahun, bulan), hitung)
+
+    def get_kategori_map(self):
+        # {nama: KategoriInfo}, urutan sesuai urutan input kategori
+        cache = self._kategori_cache
+        if cache is None:
+            with self.reader() as conn:
+                rows = conn.execute("SELECT nama, tipe, is_tabungan FROM master_kategori ORDER BY rowid").fetchall()
+            cache = {nama: KategoriInfo(nama, tipe, tab or 0, get_icon_for_category(nama)) for nama, tipe, tab in rows}
+            self._kategori_cache = cache
+        return cache
+
+    def invalidate_kategori(self):
+        self._kategori_cache = None
+
+    def get_nama_kategori(self, tipe):
+        return [k.nama for k in self.get_kategori_map().values() if k.tipe == tipe]
+
+    def get_is_tabungan(self, kategori):
+        info = self.get_kategori_map().get(kategori)
+        return info.is_tabungan if info else 0
+
+    # csv_io (modul csv) di-import saat pertama dipakai, bukan saat startup
+    def export_csv(self, path, where_clause="", params=(), progress=None, cancel_event=None, sumber=SUMBER_AKTIF):
+        from csv_io import export_transaksi_csv
+        with self.reader_sumber(sumber) as bagian:
+            return export_transaksi_csv(bagian[0][0], path, where_clause, params, progress=progress, cancel_event=cancel_event, bagian=bagian)
+
+    # --- Tulis ---
+    # tanggal: string ISO "YYYY-MM-DD", jumlah: rupiah bulat
+    def insert_transaksi(self, tanggal, tipe, kategori, deskripsi, jumlah, is_tabungan):
+        with self.write() as conn:
+            cur = conn.execute("INSERT INTO transaksi (hari, tipe, kategori, deskripsi, jumlah, is_tabungan) VALUES (?,?,?,?,?,?)",
+                               (iso_ke_hari(tanggal), tipe, kategori, deskripsi, jumlah, is_tabungan))
+            id_trx = cur.lastrowid
+        self.events.publish(PerubahanData(INSERTED, id_trx, tanggal, kategori))
+        return id_trx
+
+    def update_transaksi(self, id_trx, tanggal, tipe, kategori, deskripsi, jumlah, is_tabungan):
+        with self.write() as conn:
+            lama = conn.execute("SELECT hari, kategori FROM transaksi WHERE id=?", (id_trx,)).fetchone()
+            conn.execute("UPDATE transaksi SET tipe=?, kategori=?, deskripsi=?, jumlah=?, is_tabungan=?, hari=? WHERE id=?",
+                         (tipe, kategori, deskripsi, jumlah, is_tabungan, iso_ke_hari(tanggal), id_trx))
+        if not lama:
+            # Baris arsip yang diedit kembali ke data aktif (diarsipkan lagi pada putaran berikutnya)
+            lama = self._keluarkan_dari_arsip(id_trx, (id_trx, iso_ke_hari(tanggal), tipe, kategori, deskripsi, jumlah, is_tabungan))
+        if lama:
+            self.events.publish(PerubahanData(UPDATED, id_trx, tanggal, kategori, hari_ke_iso(lama[0]), lama[1]))
+
+    def delete_transaksi(self, id_trx):
+        with self.write() as conn:
+            lama = conn.execute("SELECT hari, kategori FROM transaksi WHERE id=?", (id_trx,)).fetchone()
+            conn.execute("DELETE FROM transaksi WHERE id=?", (id_trx,))
+        if not lama:
+            lama = self._keluarkan_dari_arsip(id_trx)
+        if lama:
+            self.events.publish(PerubahanData(DELETED, id_trx, hari_ke_iso(lama[0]), lama[1]))
+
+    def _keluarkan_dari_arsip(self, id_trx, baris_baru=None):
+        # Hapus baris dari file arsipnya (total arsip dihitung ulang) dan, jika baris_baru
+        # diisi, simpan versi barunya di data aktif; semuanya dalam satu transaksi.
+        # Return (hari, kategori) lama, atau None jika id tidak ada di arsip mana pun.
+        with self._write_lock:
+            lokasi = cari_di_arsip(self._writer, self.path, id_trx)
+            if lokasi is None:
+                return None
+            tahun, file = lokasi
+            tabel = f"{skema_arsip(tahun)}.transaksi"
+            with attach_arsip(self._writer, self.path, tahun, file):
+                with self.write() as conn:
+                    lama = conn.execute(f"SELECT hari, kategori FROM {tabel} WHERE id=?", (id_trx,)).fetchone()
+                    conn.execute(f"DELETE FROM {tabel} WHERE id=?", (id_trx,))
+                    _segarkan_total_arsip(conn, tahun, file)
+                    if baris_baru:
+                        conn.execute(f"INSERT INTO main.transaksi ({KOLOM_TABEL}) VALUES (?,?,?,?,?,?,?)", baris_baru)
+                    else:
+                        # Tabel arsip tanpa trigger: penghapusan dicatat langsung ke changelog
+                        conn.execute(_sql_catat_transaksi("?", 1), (id_trx,))
+                        conn.execute("DELETE FROM sync_uuid WHERE id=?", (id_trx,))
+            return lama
+
+    def arsipkan_tahun_lama(self, tahun_aktif=TAHUN_AKTIF):
+        # Return {tahun: jumlah baris dipindah}; kosong jika tidak ada yang perlu diarsipkan
+        with self._write_lock:
+            hasil = arsipkan_tahun_lama(self._writer, self.path, tahun_aktif)
+            self._arsip_cache = None
+            if hasil:
+                # Halaman yang kosong baru dikembalikan ke OS setelah VACUUM
+                self._writer.execute("VACUUM")
+                self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if hasil:
+            self.events.publish(PerubahanData(BULK))
+        return hasil
+
+    # --- Backup & restore (lihat backup.py) ---
+    def backup(self, path, kompres=True, progress=None, cancel_event=None):
+        # Online: app tetap bisa membaca & menulis selama snapshot disalin bertahap
+        from backup import buat_backup
+        with self.reader() as conn:
+            return buat_backup(conn, self.path, path, kompres=kompres, kunci_arsip=self._write_lock,
+                               progress=progress, cancel_event=cancel_event)
+
+    def restore(self, path, progress=None, cancel_event=None):
+        # Validasi & ekstrak dulu (DB lama tetap dipakai), lalu semua koneksi ditutup, file
+        # ditukar dengan os.replace (atomik per file; DB utama terakhir) dan koneksi dibuka lagi.
+        from backup import siapkan_restore
+        staging, manifest = siapkan_restore(path, os.path.dirname(os.path.abspath(self.path)),
+                                            progress=progress, cancel_event=cancel_event)
+        try:
+            # Pintu ditutup sebelum lock writer diambil: backup yang sedang jalan memegang
+            # pembaca sambil menunggu lock writer, urutan sebaliknya bisa saling tunggu.
+            with self._pintu:
+                self._tertutup = True
+                if not self._pintu.wait_for(lambda: self._pembaca_aktif == 0, timeout=RESTORE_TUNGGU_S):
+                    self._tertutup = False
+                    self._pintu.notify_all()
+                    raise TimeoutError("database masih dipakai, restore dibatalkan")
+            with self._write_lock:
+                diganti = False
+                try:
+                    self._writer.close()
+                    self._tutup_pool()
+                    for nama in manifest["files"]:
+                        if nama != manifest["utama"]:
+                            os.replace(os.path.join(staging, nama), path_arsip(self.path, nama))
+                    # WAL/SHM milik DB lama tidak boleh terbaca oleh DB hasil restore
+                    for ekstra in ("-wal", "-shm"):
+                        if os.path.exists(self.path + ekstra):
+                            os.remove(self.path + ekstra)
+                    os.replace(os.path.join(staging, manifest["utama"]), self.path)
+                    diganti = True
+                finally:
+                    try:
+                        # Skema backup lama di-upgrade oleh migrate() saat writer dibuka lagi.
+                        # Hasil restore mendapat identitas sync baru (lihat ganti_perangkat).
+                        self._buka_writer()
+                        if diganti:
+                            with self.write() as conn:
+                                ganti_perangkat(conn)
+                    finally:
+                        # Pintu selalu dibuka lagi, juga bila writer gagal dibuka; kalau tidak,
+                        # setiap reader() berikutnya menunggu selamanya
+                        self._kategori_cache = None
+                        self._arsip_cache = None
+                        with self._pintu:
+                            self._tertutup = False
+                            self._pintu.notify_all()
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.events.publish(PerubahanData(BULK))
+        return manifest
+
+    # --- Sinkronisasi (lihat sync.py) ---
+    def sync_file(self, path):
+        # Terima paket perangkat lain di `path` (jika ada) lalu tulis paket balasan
+        from sync import tukar
+        return tukar(self, path)
+
+    def import_csv(self, path, mapping=None, dedup=False, progress=None, cancel_event=None):
+        from csv_io import import_transaksi_csv
+        with self.writer() as conn, ExitStack() as stack:
+            # Dedup ikut memeriksa arsip (MAX_ATTACH tahun terbaru) agar CSV hasil export lama
+            # tidak menggandakan transaksi yang sudah diarsipkan
+            arsip = []
+            if dedup:
+                for tahun, file in list(get_tahun_arsip(conn).items())[:MAX_ATTACH]:
+                    if os.path.exists(path_arsip(self.path, file)):
+                        stack.enter_context(attach_arsip(conn, self.path, tahun, file))
+                        arsip.append(skema_arsip(tahun))
+            try:
+                hasil = import_transaksi_csv(conn, path, mapping, dedup=dedup, progress=progress, cancel_event=cancel_event, arsip=arsip)
+            finally:
+                # Import bisa menambah kategori baru ke master_kategori
+                self.invalidate_kategori()
+        if hasil["diimpor"]:
+            self.events.publish(PerubahanData(BULK))
+        return hasil
+
+
+# --- CEK QUERY PLAN ---
+def explain_query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def cek_query_plan(conn):
+    # Query representatif layar Laporan & Beranda; semuanya harus memakai index
+    thn = date.today().year
+    bulan, bulan_params = periode_clause(conn, str(thn), "01")
+    tahun, tahun_params = periode_clause(conn, str(thn), "Semua")
+    queries = [
+        ("laporan_list_bulan", f"SELECT * FROM transaksi WHERE {bulan} ORDER BY hari DESC, id DESC", bulan_params),
+        ("laporan_list_tahun", f"SELECT * FROM transaksi WHERE {tahun} ORDER BY hari DESC, id DESC", tahun_params),
+        ("list_halaman_berikut", "SELECT * FROM transaksi WHERE (hari, id) < (?, ?) ORDER BY hari DESC, id DESC LIMIT 50", (thn * 10000 + 115, 100)),
+        ("laporan_chart_bulan", f"SELECT kategori, SUM(jumlah) FROM transaksi WHERE {bulan} AND tipe='Pengeluaran' GROUP BY kategori", bulan_params),
+        ("total_pengeluaran", "SELECT SUM(jumlah) FROM transaksi WHERE tipe='Pengeluaran' AND is_tabungan=0", ()),
+        ("cari_fts", f"SELECT * FROM transaksi WHERE {search_clause(conn, 'makan')[0]} ORDER BY hari DESC, id DESC LIMIT 20", search_clause(conn, "makan")[1]),
+        ("filter_kategori", "SELECT * FROM transaksi WHERE kategori=?", ("Makan",)),
+        ("saldo_checkpoint", "SELECT saldo FROM saldo_bulanan WHERE bulan < ? ORDER BY bulan DESC LIMIT 1", (thn * 100 + 1,)),
+        ("saldo_dalam_bulan", f"SELECT SUM({_SQL_NET.format(r='transaksi')}) FROM transaksi WHERE hari > ? AND hari <= ?", (thn * 10000 + 100, thn * 10000 + 115)),
+    ]
+    hasil = []
+    for nama, sql, params in queries:
+        plan = explain_query_plan(conn, sql, params)
+        pakai_index = any(k in p for p in plan for k in ("USING INDEX", "USING COVERING INDEX", "PRIMARY KEY", "VIRTUAL TABLE INDEX"))
+        full_scan = any(p.split(" ")[:2] == ["SCAN", "transaksi"] and "INDEX" not in p for p in plan)
+        hasil.append((nama, pakai_index and not full_scan, plan))
+    return hasil
+
+
+def _cmd_explain(conn, args):
+    semua_ok = True
+    for nama, ok, plan in cek_query_plan(conn):
+        semua_ok = semua_ok and ok
+        print(f"[{'OK' if ok else 'SCAN'}] {nama}")
+        for p in plan:
+            print(f"      {p}")
+    return 0 if semua_ok else 1
+
+
+def _cmd_cari(conn, args):
+    print(f"Mode: {'FTS5' if fts_aktif(conn) else 'LIKE (FTS5 tidak tersedia)'}")
+    for row in cari_transaksi(conn, args.keyword, args.limit):
+        print(f"{row[0]:>6}  {row[1]}  {row[2]:<11}  {row[3]:<16}  {row[5]:>14,.0f}  {row[4] or '-'}")
+    return 0
+
+
+def _cmd_ringkasan(conn, args):
+    drift = verifikasi_ringkasan(conn, perbaiki=args.rebuild)
+    beda_rollup = verifikasi_rollup(conn, perbaiki=args.rebuild)
+    # Sesudah rollup, karena checkpoint saldo dihitung dari rollup
+    beda_saldo = verifikasi_saldo(conn, perbaiki=args.rebuild)
+    m, k, inv = get_ringkasan(conn)
+    print(f"Pemasukan: {m}  Pengeluaran: {k}  Tabungan: {inv}  Saldo: {m - (k + inv)}")
+    if not drift and not beda_rollup and not beda_saldo:
+        print("Ringkasan, rollup & checkpoint saldo sesuai dengan tabel transaksi.")
+        return 0
+    for nama, (a, b) in drift.items():
+        print(f"DRIFT {nama}: tersimpan={a} seharusnya={b} selisih={a - b}")
+    if beda_rollup:
+        print(f"DRIFT rollup_bulanan: {len(beda_rollup)} key berbeda, mis. {beda_rollup[:3]}")
+    if beda_saldo:
+        print(f"DRIFT saldo_bulanan: {len(beda_saldo)} bulan berbeda, mis. {beda_saldo[:3]}")
+    print("Ringkasan sudah dibangun ulang." if args.rebuild else "Jalankan dengan --rebuild untuk memperbaiki.")
+    return 0 if args.rebuild else 1
+
+
+def _cmd_arsip(conn, args):
+    # Lewat Repository (koneksi sendiri) supaya VACUUM ikut dijalankan
+    conn.close()
+    repo = Repository(args.db)
+    try:
+        for tahun, n in repo.arsipkan_tahun_lama(args.tahun_aktif).items():
+            print(f"{tahun}: {n} transaksi dipindah ke {nama_file_arsip(args.db, tahun)}")
+        for tahun, file in repo.get_tahun_arsip().items():
+            print(f"Arsip {tahun}: {file}")
+    finally:
+        repo.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Utilitas database Autofint")
+    parser.add_argument("db", nargs="?", default=":memory:", help="path keuangan.db")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("explain", help="migrasi lalu tampilkan query plan (default)")
+    p_ringkasan = sub.add_parser("ringkasan", help="verifikasi total saldo terhadap tabel transaksi")
+    p_ringkasan.add_argument("--rebuild", action="store_true", help="hitung ulang ringkasan jika ada drift")
+    p_cari = sub.add_parser("cari", help="cari transaksi, diurutkan berdasarkan relevansi")
+    p_cari.add_argument("keyword")
+    p_cari.add_argument("--limit", type=int, default=20)
+    p_arsip = sub.add_parser("arsip", help="pindahkan tahun lama ke file arsip per tahun")
+    p_arsip.add_argument("--tahun-aktif", type=int, default=TAHUN_AKTIF, help="jumlah tahun terakhir yang tetap di DB utama")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    print(f"Schema version: {migrate(conn)}")
+    perintah = {"explain": _cmd_explain, "ringkasan": _cmd_ringkasan, "cari": _cmd_cari, "arsip": _cmd_arsip}
+    sys.exit(perintah.get(args.cmd or "explain")(conn, args))
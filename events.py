@@ -0,0 +1,52 @@
+import threading
+from collections import namedtuple
+
+# --- EVENT PERUBAHAN DATA ---
+# jenis: "inserted" / "updated" / "deleted" untuk satu transaksi, "bulk" untuk import
+# (tanggal & kategori None = bisa menyentuh periode/kategori mana saja).
+# Untuk "updated", tanggal_lama/kategori_lama berisi nilai sebelum diubah.
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+BULK = "bulk"
+
+PerubahanData = namedtuple(
+    "PerubahanData",
+    ["jenis", "id", "tanggal", "kategori", "tanggal_lama", "kategori_lama"],
+    defaults=(None, None, None, None, None),
+)
+
+
+def tanggal_terkena(ev):
+    # Semua tanggal yang dipengaruhi event; None berarti tidak diketahui (anggap semua)
+    if ev.jenis == BULK or ev.tanggal is None:
+        return None
+    if ev.tanggal_lama and ev.tanggal_lama != ev.tanggal:
+        return (ev.tanggal, ev.tanggal_lama)
+    return (ev.tanggal,)
+
+
+class EventBus:
+    # Publish dipanggil sinkron di thread penulis, setelah transaksi DB di-commit.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, ev):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(ev)
+            except Exception as ex:
+                print(ex)
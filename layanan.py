@@ -0,0 +1,81 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import Repository
+from profiler import PROFILE_AKTIF, Profiler
+
+# --- LAYANAN DATA BERSAMA ---
+# Saat app dijalankan sebagai web app, setiap sesi browser memanggil main(page) sendiri.
+# Semua sesi di satu proses memakai satu LayananData per file database: Repository (pool
+# koneksi, writer, cache query), executor DB dan profiler dibuat sekali; migrasi, seed dan
+# arsip otomatis juga hanya jalan sekali. Setiap tulis yang di-commit diteruskan ke semua
+# sesi lewat pub/sub Flet (TOPIK_DATA), payload-nya events.PerubahanData.
+TOPIK_DATA = "autofint/perubahan_data"
+# Thread khusus untuk semua panggilan SQLite (sama dengan ukuran pool reader Repository)
+DB_WORKERS = 4
+
+_layanan = {}
+_layanan_lock = threading.Lock()
+
+
+class LayananData:
+    def __init__(self, db_path, profiler=None):
+        self.db_path = db_path
+        self.profiler = profiler
+        self.repo = Repository(db_path, profiler=profiler)
+        self.executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="autofint-db")
+        self._lock = threading.Lock()
+        # PubSubHub Flet dipakai bersama semua sesi satu app; cukup disimpan dari sesi pertama
+        self._pubsub = None
+        self._sesi = 0
+        self._arsip_diklaim = False
+        self.repo.events.subscribe(self._teruskan)
+
+    def _teruskan(self, ev):
+        # Dipanggil di thread penulis setelah commit; hub menjadwalkan handler di loop tiap sesi
+        pubsub = self._pubsub
+        if pubsub is not None:
+            pubsub.send_all_on_topic(TOPIK_DATA, ev)
+
+    def pasang_sesi(self, pubsub):
+        with self._lock:
+            if self._pubsub is None:
+                self._pubsub = pubsub
+            self._sesi += 1
+
+    def lepas_sesi(self):
+        with self._lock:
+            self._sesi -= 1
+
+    @property
+    def jumlah_sesi(self):
+        return self._sesi
+
+    def klaim_arsip(self):
+        # True hanya untuk sesi pertama yang bertanya: arsip otomatis cukup sekali per proses
+        with self._lock:
+            if self._arsip_diklaim:
+                return False
+            self._arsip_diklaim = True
+            return True
+
+    def tutup(self):
+        # Untuk bench/skrip; web app membiarkan layanan hidup selama proses
+        with _layanan_lock:
+            if _layanan.get(os.path.abspath(self.db_path)) is self:
+                del _layanan[os.path.abspath(self.db_path)]
+        self.executor.shutdown(wait=True)
+        self.repo.close()
+
+
+def get_layanan(db_path):
+    # Blocking (membuka database & migrasi) untuk pemanggil pertama; sesi lain yang datang
+    # bersamaan menunggu lalu memakai instance yang sama
+    kunci = os.path.abspath(db_path)
+    with _layanan_lock:
+        layanan = _layanan.get(kunci)
+        if layanan is None:
+            layanan = LayananData(db_path, Profiler() if PROFILE_AKTIF else None)
+            _layanan[kunci] = layanan
+        return layanan
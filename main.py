@@ -1,11 +1,36 @@
-import flet as ft
-import sqlite3
-import csv
+import time
+# Titik nol pengukuran time-to-first-frame / time-to-interactive
+T_MULAI = time.perf_counter()
+
 from datetime import datetime, date
+import asyncio
+import contextvars
+import functools
 import os
-import traceback
+import threading
+
+# Modul data (sqlite3, csv, ...) baru di-import di dalam main() setelah layar PIN tampil,
+# lihat bagian INISIALISASI SETELAH FRAME PERTAMA.
+# Flet juga baru di-import saat GUI dijalankan, sehingga modul ini bisa di-import (dan
+# mode headless "python main.py <perintah>", lihat cli.py) tanpa memuat Flet.
+ft = None
+
+
+def _muat_flet():
+    global ft
+    if ft is None:
+        import flet
+        ft = flet
+    return ft
 
-def main(page: ft.Page):
+
+# Jeda (ms) setelah ketikan terakhir sebelum pencarian dijalankan
+SEARCH_DEBOUNCE_MS = int(os.environ.get("AUTOFINT_SEARCH_DEBOUNCE_MS", "300"))
+# Tahun lama dipindah ke file arsip di background setelah startup (0 = nonaktif)
+ARSIP_OTOMATIS = os.environ.get("AUTOFINT_ARSIP", "1") not in ("", "0")
+
+async def main(page: "ft.Page"):
+    _muat_flet()
     # --- ERROR HANDLING UTAMA ---
     try:
         # --- KONFIGURASI HALAMAN ---
@@ -26,49 +51,243 @@ def main(page: ft.Page):
         else:
             NavDest = ft.NavigationDestination # Fallback
 
-        # --- DATABASE SETUP ---
+        # --- LOKASI DATA ---
         storage_path = os.environ.get("FLET_APP_STORAGE_DATA")
         if storage_path:
             db_path = os.path.join(storage_path, "keuangan.db")
         else:
             db_path = "keuangan.db"
 
-        conn = sqlite3.connect(db_path, check_same_thread=False)
-        c = conn.cursor()
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS transaksi
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      tanggal TEXT, 
-                      tipe TEXT, 
-                      kategori TEXT, 
-                      deskripsi TEXT, 
-                      jumlah REAL,
-                      is_tabungan INTEGER DEFAULT 0)''')
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS master_kategori
-                     (nama TEXT PRIMARY KEY, tipe TEXT, is_tabungan INTEGER)''')
-        
-        # Init Kategori Default
-        c.execute("SELECT COUNT(*) FROM master_kategori")
-        if c.fetchone()[0] == 0:
-            defaults = [
-                ("Gaji", "Pemasukan", 0), ("Bonus", "Pemasukan", 0),
-                ("Makan", "Pengeluaran", 0), ("Transport", "Pengeluaran", 0),
-                ("Belanja", "Pengeluaran", 0), ("Tagihan", "Pengeluaran", 0),
-                ("Hiburan", "Pengeluaran", 0), ("Kesehatan", "Pengeluaran", 0),
-                ("Dana Darurat", "Pengeluaran", 1), ("Investasi Saham", "Pengeluaran", 1)
-            ]
-            c.executemany("INSERT INTO master_kategori VALUES (?,?,?)", defaults)
-            conn.commit()
-
         # --- STATE MANAGEMENT ---
         state = {
             "edit_id": None,
             "edit_date": None,
             "total_cash": 0,
             "is_logged_in": False, 
-            "user_pin": "1234"
+            "user_pin": "1234",
+            "view_aktif": None,
+            "startup_ms": {}
         }
+        # Di-set setelah DB & semua view siap; handler PIN menunggu ini
+        app_siap = asyncio.Event()
+
+        # Profiler baru tersedia setelah layanan siap, jadi titik startup dikumpulkan di state
+        # dan dikirim ke profiler (panel debug, jenis "startup") setelah app interaktif
+        def catat_startup(nama):
+            state["startup_ms"][nama] = round((time.perf_counter() - T_MULAI) * 1000, 1)
+
+        # Dipakai layar PIN, jadi didefinisikan sebelum frame pertama
+        def get_watermark():
+            return ft.Container(
+                content=ft.Text("Powered by Gita Technology", size=10, italic=True, color="grey"),
+                alignment=ft.alignment.center,
+                padding=ft.padding.only(top=10, bottom=10)
+            )
+
+        # --- NAVIGATION BAR ---
+        nav_bar = ft.NavigationBar(
+            destinations=[
+                NavDest(icon="dashboard", label="Beranda"),
+                NavDest(icon="add_circle", label="Input"),
+                NavDest(icon="insert_chart", label="Laporan"),
+            ],
+            visible=False
+        )
+
+        # --- FRAME PERTAMA: LAYAR PIN ---
+        # Hanya control layar PIN yang dibuat sebelum page.add(); DB, migrasi & view lain
+        # menyusul setelah frame ini terkirim.
+        body = ft.Container(expand=True)
+        
+        # View dibangun sekali lalu dipakai ulang; pindah tab hanya mengganti body.content
+        views = {}
+
+        def get_view(nama, builder):
+            if nama not in views:
+                views[nama] = builder()
+            return views[nama]
+
+        def view_login():
+            input_pin = ft.TextField(
+                password=True, can_reveal_password=True, text_align="center", 
+                width=200, max_length=6, keyboard_type=ft.KeyboardType.NUMBER,
+                input_filter=ft.InputFilter(regex_string=r"[0-9]"),
+                hint_text="PIN (Default: 1234)"
+            )
+            
+            btn_buka = ft.ElevatedButton("BUKA KUNCI", bgcolor=color_primary, color="white", width=200)
+
+            async def check_pin(e):
+                if input_pin.value and input_pin.value.strip() == state["user_pin"]:
+                    if not app_siap.is_set():
+                        # PIN diketik sebelum inisialisasi selesai (mis. migrasi DB besar)
+                        btn_buka.text, btn_buka.disabled = "MEMUAT...", True
+                        btn_buka.update()
+                        try:
+                            await asyncio.wait_for(app_siap.wait(), timeout=60)
+                        except asyncio.TimeoutError:
+                            btn_buka.text, btn_buka.disabled = "BUKA KUNCI", False
+                            btn_buka.update()
+                            return
+                        btn_buka.text, btn_buka.disabled = "BUKA KUNCI", False
+                    state["is_logged_in"] = True
+                    input_pin.value = ""
+                    await navigate_to(0)
+                else:
+                    input_pin.error_text = "PIN Salah!"
+                    input_pin.update()
+
+            btn_buka.on_click = check_pin
+            input_pin.on_submit = check_pin
+
+            return ft.Container(
+                expand=True,
+                bgcolor="white",
+                alignment=ft.alignment.center,
+                padding=30,
+                content=ft.Column([
+                    ft.Icon("lock_outline", size=60, color=color_primary),
+                    ft.Text("Secured Finance", size=24, weight="bold", color=color_primary),
+                    ft.Container(height=30),
+                    input_pin,
+                    btn_buka,
+                    ft.Container(height=50),
+                    get_watermark()
+                ], horizontal_alignment="center", alignment="center")
+            )
+
+        state["view_aktif"] = "login"
+        body.content = get_view("login", view_login)
+        page.add(body, nav_bar)
+        catat_startup("frame_pertama")
+
+        # --- INISIALISASI SETELAH FRAME PERTAMA ---
+        from database import SUMBER_AKTIF, TAHUN_AKTIF
+        from events import BULK, tanggal_terkena
+        from layanan import TOPIK_DATA, get_layanan
+        from model import format_rupiah, ke_rupiah_bulat
+        from profiler import HANDLER, SQL, UPDATE, STARTUP, hitung_control
+
+        # --- LAYANAN DATA BERSAMA ---
+        # Semua sesi di proses ini (web app: satu sesi per tab browser) berbagi satu LayananData
+        # (lihat layanan.py). Sesi pertama membuka Repository: pool koneksi baca + satu writer,
+        # WAL & PRAGMA tuning, pembuatan tabel, seed kategori & upgrade skema. Sesi berikutnya
+        # langsung memakai koneksi, cache query & executor yang sudah siap.
+        layanan = await asyncio.get_running_loop().run_in_executor(None, get_layanan, db_path)
+        repo = layanan.repo
+        # Profiling opt-in (AUTOFINT_PROFILE=1): handler, SQL & update dicatat ke ring buffer,
+        # dilihat lewat panel debug (tekan lama logo)
+        profiler = layanan.profiler
+
+        # --- EXECUTOR DATABASE ---
+        # Handler berjalan async di event loop Flet; setiap panggilan SQLite (blocking) dilempar
+        # ke thread pool milik layanan lewat `await db(fn, ...)` sehingga loop tetap bebas.
+        db_executor = layanan.executor
+
+        async def db(fn, *args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
+
+        catat_startup("db_siap")
+
+        # --- EVENT PUSH, INVALIDASI & COUNTER ---
+        # Setiap PerubahanData (dari sesi mana pun) sampai lewat pub/sub. View ditandai dirty;
+        # view yang sedang tampil langsung dimuat ulang, view tersembunyi di-refresh saat
+        # dibuka lagi. Update dikirim ke control yang berubah saja.
+        view_dirty = {"dashboard": True, "laporan": True}
+        # Aksi user yang sedang berjalan disimpan per task/thread (ContextVar), jadi handler
+        # async yang berjalan bersamaan tidak saling mencampur hitungan. Task yang dibuat
+        # di dalam sebuah aksi ikut terhitung ke aksi tersebut.
+        aksi_var = contextvars.ContextVar("aksi", default=None)
+
+        def _mulai_aksi(nama):
+            if aksi_var.get() is not None:
+                return None  # aksi bersarang, dihitung ke aksi terluar
+            return aksi_var.set({"nama": nama, "recompute": 0, "update": 0, "t0": time.perf_counter()})
+
+        def _selesai_aksi(token, batal=False):
+            if token is None:
+                return
+            aksi = aksi_var.get()
+            aksi_var.reset(token)
+            # Counter per aksi hanya dicatat saat profiling aktif (lihat panel debug)
+            if profiler:
+                profiler.catat(HANDLER, aksi["nama"], (time.perf_counter() - aksi["t0"]) * 1000,
+                               recompute=aksi["recompute"], update=aksi["update"], batal=batal)
+
+        def catat_aksi(nama):
+            # Hitung berapa recompute & update yang dipicu satu aksi user (termasuk aksi bersarang)
+            def deco(fn):
+                if asyncio.iscoroutinefunction(fn):
+                    async def wrapper_async(*args, **kwargs):
+                        token = _mulai_aksi(nama)
+                        try:
+                            hasil = await fn(*args, **kwargs)
+                        except asyncio.CancelledError:
+                            _selesai_aksi(token, batal=True)
+                            raise
+                        except BaseException:
+                            _selesai_aksi(token)
+                            raise
+                        _selesai_aksi(token)
+                        return hasil
+                    return wrapper_async
+
+                def wrapper(*args, **kwargs):
+                    token = _mulai_aksi(nama)
+                    try:
+                        return fn(*args, **kwargs)
+                    finally:
+                        _selesai_aksi(token)
+                return wrapper
+            return deco
+
+        def hitung_recompute():
+            aksi = aksi_var.get()
+            if aksi is not None:
+                aksi["recompute"] += 1
+
+        def kirim_update(view, *controls):
+            # view=None: control global (body/nav_bar); selain itu hanya dikirim jika view tampil
+            if view is not None and state["view_aktif"] != view:
+                return
+            aksi = aksi_var.get()
+            for ctl in controls:
+                t0 = time.perf_counter()
+                ctl.update()
+                if aksi is not None:
+                    aksi["update"] += 1
+                if profiler:
+                    profiler.catat(UPDATE, f"{view or 'global'}:{type(ctl).__name__}", (time.perf_counter() - t0) * 1000,
+                                   controls=hitung_control(ctl), aksi=aksi["nama"] if aksi else None)
+
+        # --- TUGAS REFRESH PER VIEW ---
+        # Satu task refresh aktif per view. Refresh baru membatalkan refresh lama view yang sama,
+        # dan pindah tab membatalkan refresh view yang tidak tampil lagi, sehingga hasil yang
+        # datang terlambat tidak pernah menimpa tampilan yang lebih baru.
+        tugas_view = {}
+
+        def batalkan_tugas_basi(view_baru=None):
+            for nama, task in list(tugas_view.items()):
+                if not task.done() and (nama == view_baru or nama != state["view_aktif"]):
+                    task.cancel()
+
+        async def jalankan_refresh(view, kerja):
+            batalkan_tugas_basi(view)
+            task = asyncio.ensure_future(kerja())
+            tugas_view[view] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise  # pemanggil sendiri yang dibatalkan
+            finally:
+                if tugas_view.get(view) is task:
+                    del tugas_view[view]
+
+        def tampil_loading(indikator, view, tampil):
+            indikator.visible = tampil
+            kirim_update(view, indikator)
 
         map_bulan = {
             "Januari": "01", "Februari": "02", "Maret": "03", "April": "04",
@@ -76,69 +295,240 @@ def main(page: ft.Page):
             "September": "09", "Oktober": "10", "November": "11", "Desember": "12"
         }
         thn_skrg = datetime.now().year
-        list_tahun = ["Semua"] + [str(thn_skrg - i) for i in range(3)]
 
-        # --- HELPER FUNCTIONS ---
-        def format_rupiah(value):
-            if value is None: return "Rp 0"
+        def get_list_tahun(rentang):
+            # TAHUN_AKTIF tahun terakhir + tahun lama yang punya data (termasuk yang sudah diarsipkan)
+            tahun_awal = min(thn_skrg - TAHUN_AKTIF + 1, rentang[0] if rentang else thn_skrg)
+            return ["Semua"] + [str(t) for t in range(thn_skrg, tahun_awal - 1, -1)]
+
+        list_tahun = get_list_tahun(await db(repo.get_rentang_tahun))
+
+        # --- PANEL DEBUG PROFILING ---
+        # Tersembunyi: hanya bisa dibuka dengan tekan lama logo, dan hanya jika profiling aktif
+        debug_list = ft.ListView(spacing=4, height=400, width=520)
+        debug_jenis = ft.Dropdown(
+            options=[ft.dropdown.Option("semua")] + [ft.dropdown.Option(j) for j in (HANDLER, SQL, UPDATE, STARTUP)],
+            value="semua", width=130, content_padding=10, text_size=12
+        )
+        debug_info = ft.Text("", size=11, italic=True)
+
+        def isi_panel_debug():
+            jenis = None if debug_jenis.value == "semua" else debug_jenis.value
+            debug_list.controls = []
+            for e in profiler.terlambat(30, jenis):
+                detail = [f"{e['rows']} baris" if "rows" in e else "",
+                          f"query {e['query_ms']:.1f} ms" if "query_ms" in e else "",
+                          f"{e['controls']} control" if e["jenis"] == UPDATE else "",
+                          f"{e['recompute']} recompute, {e['update']} update" if "recompute" in e else "",
+                          "dibatalkan" if e.get("batal") else "",
+                          f"dipindah {e['dipindah']}" if e.get("dipindah") else "",
+                          f"gagal: {e['gagal']}" if "gagal" in e else ""]
+                baris = [ft.Text(f"{e['ms']:8.1f} ms  [{e['jenis']}] {e['nama']}", size=11, font_family="monospace", weight="bold"),
+                         ft.Text(" ".join(d for d in detail if d) + f"  {datetime.fromtimestamp(e['waktu']):%H:%M:%S}", size=10, color="grey")]
+                if e.get("plan"):
+                    baris.append(ft.Text(" | ".join(e["plan"]), size=10, color="teal", font_family="monospace"))
+                debug_list.controls.append(ft.Column(baris, spacing=0))
+            c = repo.cache.statistik()
+            debug_info.value = (f"{len(profiler.entries())} entry di buffer | cache: {c['hit']} hit, {c['miss']} miss "
+                                f"({c['rasio']:.0%}), {c['entri']} entry / {c['baris']} baris, versi data {c['versi']}")
+
+        def on_debug_jenis(e):
+            isi_panel_debug()
+            dlg_debug.update()
+
+        def dump_profil(e):
+            path = os.path.join(storage_path or ".", f"autofint_profile_{datetime.now():%Y%m%d_%H%M%S}.json")
             try:
-                val = float(value)
-                return f"Rp {int(val):,}".replace(",", ".")
-            except: return "Rp 0"
-
-        def get_icon_for_category(kategori):
-            if not kategori: return "category"
-            kat = kategori.lower()
-            if "makan" in kat: return "fastfood"
-            if "transport" in kat: return "directions_car"
-            if "gaji" in kat: return "attach_money"
-            if "invest" in kat or "tabungan" in kat or "darurat" in kat: return "savings"
-            if "tagihan" in kat or "listrik" in kat: return "receipt_long"
-            if "belanja" in kat: return "shopping_bag"
-            if "kesehatan" in kat: return "medical_services"
-            return "category"
+                jumlah = profiler.dump_json(path)
+                debug_info.value = f"{jumlah} entry disimpan di {path}"
+            except Exception as ex:
+                debug_info.value = f"Gagal dump: {ex}"
+            dlg_debug.update()
+
+        def reset_profil(e):
+            profiler.reset()
+            repo.cache.reset_statistik()
+            isi_panel_debug()
+            dlg_debug.update()
+
+        debug_jenis.on_change = on_debug_jenis
+        dlg_debug = ft.AlertDialog(
+            title=ft.Row([ft.Text("Operasi Terlambat", size=16, weight="bold"), debug_jenis], alignment="spaceBetween"),
+            content=ft.Column([debug_info, debug_list], tight=True),
+            actions=[
+                ft.TextButton("Dump JSON", on_click=dump_profil),
+                ft.TextButton("Reset", on_click=reset_profil),
+                ft.TextButton("Tutup", on_click=lambda e: page.close(dlg_debug)),
+            ],
+        )
+
+        def buka_panel_debug(e):
+            isi_panel_debug()
+            page.open(dlg_debug)
 
+        # --- HELPER FUNCTIONS ---
         def get_logo(is_dark_bg=False):
             color = "white" if is_dark_bg else color_primary
-            return ft.Row(
+            logo = ft.Row(
                 [
                     ft.Icon("token", color=color, size=20), 
                     ft.Text("Gita Technology", weight="bold", size=18, color=color, font_family="Roboto")
                 ], 
                 alignment=ft.MainAxisAlignment.CENTER
             )
+            if profiler:
+                return ft.GestureDetector(content=logo, on_long_press_start=buka_panel_debug)
+            return logo
             
-        def get_watermark():
-            return ft.Container(
-                content=ft.Text("Powered by Gita Technology", size=10, italic=True, color="grey"),
-                alignment=ft.alignment.center,
-                padding=ft.padding.only(top=10, bottom=10)
-            )
-
-        # --- NAVIGATION BAR ---
-        nav_bar = ft.NavigationBar(
-            destinations=[
-                NavDest(icon="dashboard", label="Beranda"),
-                NavDest(icon="add_circle", label="Input"),
-                NavDest(icon="insert_chart", label="Laporan"),
-            ]
+        # --- EXPORT / IMPORT CSV (BACKGROUND) ---
+        # Export & import berjalan di executor DB dengan koneksi sendiri, baris di-stream
+        # per batch. Dialog progress bisa membatalkan lewat proses_cancel.
+        proses_progress = ft.ProgressBar(value=0, width=260)
+        proses_info = ft.Text("", size=12)
+        proses_cancel = threading.Event()
+        dlg_proses = ft.AlertDialog(
+            modal=True,
+            title=ft.Text(""),
+            content=ft.Column([proses_progress, proses_info], tight=True),
+            actions=[ft.TextButton("Batal", on_click=lambda e: proses_cancel.set())],
         )
 
-        def save_file_result(e: ft.FilePickerResultEvent):
+        async def mulai_proses(judul, target, *args):
+            proses_cancel.clear()
+            dlg_proses.title.value = judul
+            proses_progress.value = 0
+            proses_info.value = "Menyiapkan..."
+            page.open(dlg_proses)
+            await target(*args)
+
+        async def jalankan_export(path, where_clause, params, sumber):
+            from csv_io import ProsesDibatalkan  # csv_io baru dimuat saat export pertama
+
+            # Dipanggil dari thread executor
+            def on_progress(selesai, total):
+                proses_progress.value = selesai / total if total else 1
+                proses_info.value = f"{selesai:,} / {total:,} baris".replace(",", ".")
+                dlg_proses.update()
+
+            try:
+                jumlah = await db(repo.export_csv, path, where_clause, params, progress=on_progress, cancel_event=proses_cancel, sumber=sumber)
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"{jumlah} baris tersimpan di: {path}"), bgcolor="green"))
+            except ProsesDibatalkan:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text("Export dibatalkan")))
+            except Exception as ex:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Gagal simpan: {str(ex)}"), bgcolor="red"))
+
+        @catat_aksi("import_csv")
+        async def jalankan_import(path):
+            from csv_io import ProsesDibatalkan
+
+            def on_progress(dibaca):
+                # Total baris tidak diketahui saat streaming, progress bar dibuat indeterminate
+                proses_progress.value = None
+                proses_info.value = f"{dibaca:,} baris dibaca".replace(",", ".")
+                dlg_proses.update()
+
+            try:
+                hasil = await db(repo.import_csv, path, dedup=True, progress=on_progress, cancel_event=proses_cancel)
+                page.close(dlg_proses)
+                msg = f"Diimpor {hasil['diimpor']}, duplikat {hasil['duplikat']}, invalid {hasil['invalid']}"
+                page.show_snack_bar(ft.SnackBar(ft.Text(msg), bgcolor="green" if not hasil["invalid"] else "orange"))
+                await refresh_view_aktif()
+            except ProsesDibatalkan:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text("Import dibatalkan, tidak ada data yang diubah")))
+            except Exception as ex:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Gagal import: {str(ex)}"), bgcolor="red"))
+
+        async def save_file_result(e: ft.FilePickerResultEvent):
             if e.path:
-                try:
-                    c.execute("SELECT * FROM transaksi")
-                    rows = c.fetchall()
-                    with open(e.path, 'w', newline='', encoding='utf-8') as f:
-                        writer = csv.writer(f)
-                        writer.writerow(["ID", "Tanggal", "Tipe", "Kategori", "Deskripsi", "Jumlah", "Is Tabungan"])
-                        writer.writerows(rows)
-                    page.show_snack_bar(ft.SnackBar(ft.Text(f"Tersimpan di: {e.path}"), bgcolor="green"))
-                except Exception as ex:
-                    page.show_snack_bar(ft.SnackBar(ft.Text(f"Gagal simpan: {str(ex)}"), bgcolor="red"))
+                if chk_export_filter.value:
+                    where_clause, params = await db(get_filter_laporan)
+                    sumber = await db(repo.sumber_periode, filter_tahun.value)
+                else:
+                    where_clause, params = "", ()
+                    sumber = await db(repo.sumber_periode, "Semua")
+                await mulai_proses("Export CSV", jalankan_export, e.path, where_clause, params, sumber)
+
+        async def pick_file_result(e: ft.FilePickerResultEvent):
+            if e.files:
+                await mulai_proses("Import CSV", jalankan_import, e.files[0].path)
 
         file_picker = ft.FilePicker(on_result=save_file_result)
-        page.overlay.append(file_picker)
+        import_picker = ft.FilePicker(on_result=pick_file_result)
+        page.overlay.extend([file_picker, import_picker])
+
+        # --- BACKUP / RESTORE (BACKGROUND) ---
+        # Backup online lewat SQLite backup API (lihat backup.py); app tetap bisa dipakai selama
+        # proses. Restore memvalidasi zip dulu, baru menukar file database dan membuka koneksi lagi.
+        def on_progress_file(selesai, total):
+            proses_progress.value = selesai / total if total else 1
+            proses_info.value = f"{selesai * 100 // total if total else 100}%"
+            dlg_proses.update()
+
+        async def jalankan_backup(path):
+            from csv_io import ProsesDibatalkan
+            try:
+                await db(repo.backup, path, progress=on_progress_file, cancel_event=proses_cancel)
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Backup tersimpan di: {path}"), bgcolor="green"))
+            except ProsesDibatalkan:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text("Backup dibatalkan")))
+            except Exception as ex:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Gagal backup: {str(ex)}"), bgcolor="red"))
+
+        @catat_aksi("restore")
+        async def jalankan_restore(path):
+            from backup import BackupTidakValid
+            from csv_io import ProsesDibatalkan
+            try:
+                manifest = await db(repo.restore, path, progress=on_progress_file, cancel_event=proses_cancel)
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Data dipulihkan dari backup {manifest['dibuat']}"), bgcolor="green"))
+                # Filter tahun & view dimuat ulang oleh on_perubahan_data (event BULK)
+            except ProsesDibatalkan:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text("Restore dibatalkan, data tidak berubah")))
+            except BackupTidakValid as ex:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"File backup tidak valid: {str(ex)}"), bgcolor="red"))
+            except Exception as ex:
+                page.close(dlg_proses)
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Gagal restore: {str(ex)}"), bgcolor="red"))
+
+        async def backup_result(e: ft.FilePickerResultEvent):
+            if e.path:
+                await mulai_proses("Backup Data", jalankan_backup, e.path)
+
+        async def konfirmasi_restore(e):
+            path = dlg_restore.data
+            page.close(dlg_restore)
+            await mulai_proses("Restore Data", jalankan_restore, path)
+
+        dlg_restore = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Restore Data"),
+            content=ft.Text("Semua data saat ini akan diganti dengan isi backup. Lanjutkan?"),
+            actions=[
+                ft.TextButton("Batal", on_click=lambda e: page.close(dlg_restore)),
+                ft.TextButton("Restore", on_click=konfirmasi_restore),
+            ],
+        )
+
+        def restore_result(e: ft.FilePickerResultEvent):
+            if e.files:
+                dlg_restore.data = e.files[0].path
+                page.open(dlg_restore)
+
+        backup_picker = ft.FilePicker(on_result=backup_result)
+        restore_picker = ft.FilePicker(on_result=restore_result)
+        page.overlay.extend([backup_picker, restore_picker])
 
         # --- UI COMPONENTS ---
         # PERBAIKAN: Menghapus 'height' dari Dropdown dan TextField agar kompatibel
@@ -173,7 +563,8 @@ def main(page: ft.Page):
             hint_text="Cari...", prefix_icon="search", 
             border_radius=10, text_size=12, content_padding=10
         )
-        lv_dashboard = ft.Column(spacing=10)
+        lv_dashboard = ft.ListView(spacing=10, expand=True, on_scroll_interval=100)
+        loading_dashboard = ft.ProgressBar(visible=False, color=color_primary, bgcolor="transparent")
 
         # --- LAPORAN ---
         # PERBAIKAN: Menghapus height=45 dari Dropdown ini
@@ -188,16 +579,77 @@ def main(page: ft.Page):
         )
         chart_pie = ft.PieChart(sections=[], sections_space=2, center_space_radius=40, expand=True)
         txt_chart_info = ft.Text("", size=12, italic=True, text_align="center")
-        lv_laporan = ft.Column(spacing=10)
+        # Tren pemasukan/pengeluaran/tabungan N bulan terakhir, dibaca dari rollup_bulanan
+        seri_tren = [("Pemasukan", "green"), ("Pengeluaran", "red"), ("Tabungan", "orange")]
+        filter_tren = ft.Dropdown(
+            options=[ft.dropdown.Option(n, f"{n} bln") for n in ("6", "12", "24")],
+            value="12", width=100, content_padding=10, text_size=12
+        )
+        chart_tren = ft.LineChart(
+            data_series=[], min_y=0, expand=True,
+            left_axis=ft.ChartAxis(show_labels=False),
+            bottom_axis=ft.ChartAxis(labels_size=24),
+            horizontal_grid_lines=ft.ChartGridLines(color="grey300", width=0.5),
+        )
+        # Saldo kas akhir bulan (mengikuti jendela tren) atau harian jika satu bulan dipilih,
+        # dari checkpoint saldo_bulanan
+        chart_saldo = ft.LineChart(
+            data_series=[], expand=True,
+            left_axis=ft.ChartAxis(show_labels=False),
+            bottom_axis=ft.ChartAxis(labels_size=24),
+            horizontal_grid_lines=ft.ChartGridLines(color="grey300", width=0.5),
+        )
+        txt_saldo_info = ft.Text("", size=12, italic=True, text_align="center")
+        lv_laporan = ft.ListView(spacing=10, expand=True, on_scroll_interval=100)
+        loading_laporan = ft.ProgressBar(visible=False, color=color_primary, bgcolor="transparent")
+        chk_export_filter = ft.Checkbox(label="Sesuai filter", value=True, tooltip="Export hanya periode filter aktif")
+        laporan_header = [
+            ft.Container(height=10),
+            ft.Container(
+                content=chart_pie, height=300, padding=10,
+                border=ft.border.all(1, "grey"), 
+                border_radius=20
+            ),
+            txt_chart_info,
+            ft.Divider(),
+            ft.Row([ft.Text("Tren Bulanan", weight="bold"), filter_tren], alignment="spaceBetween"),
+            ft.Container(
+                content=chart_tren, height=220, padding=ft.padding.only(left=10, right=20, top=20, bottom=10),
+                border=ft.border.all(1, "grey"), 
+                border_radius=20
+            ),
+            ft.Row([
+                ft.Row([ft.Container(width=10, height=10, bgcolor=warna, border_radius=5), ft.Text(nama, size=11)], spacing=4)
+                for nama, warna in seri_tren
+            ], alignment="center"),
+            ft.Divider(),
+            ft.Text("Saldo", weight="bold"),
+            ft.Container(
+                content=chart_saldo, height=200, padding=ft.padding.only(left=10, right=20, top=20, bottom=10),
+                border=ft.border.all(1, "grey"),
+                border_radius=20
+            ),
+            txt_saldo_info,
+            ft.Divider(),
+            ft.Row([
+                ft.Text("Rincian Transaksi", weight="bold"),
+                ft.Row([
+                    chk_export_filter,
+                    ft.IconButton("download", tooltip="Export CSV", on_click=lambda e: file_picker.save_file(file_name="Laporan.csv")),
+                    ft.IconButton("upload", tooltip="Import CSV", on_click=lambda e: import_picker.pick_files(allowed_extensions=["csv"])),
+                    ft.IconButton("backup", tooltip="Backup data", on_click=lambda e: backup_picker.save_file(file_name=f"autofint-{date.today().isoformat()}.zip")),
+                    ft.IconButton("restore", tooltip="Restore data", on_click=lambda e: restore_picker.pick_files(allowed_extensions=["zip"])),
+                ], spacing=0),
+            ], alignment="spaceBetween"),
+        ]
 
         # --- LOGIC ---
-        def load_kategori_options(tipe_transaksi):
-            c.execute("SELECT nama FROM master_kategori WHERE tipe=?", (tipe_transaksi,))
-            rows = c.fetchall()
-            input_kategori.options = [ft.dropdown.Option(r[0]) for r in rows]
+        async def load_kategori_options(tipe_transaksi):
+            nama_kategori = await db(repo.get_nama_kategori, tipe_transaksi)
+            input_kategori.options = [ft.dropdown.Option(nama) for nama in nama_kategori]
             if input_kategori.options and not input_kategori.value: 
                 input_kategori.value = input_kategori.options[0].key
-            page.update()
+            kirim_update("input", input_kategori)
 
         def on_nominal_change(e):
             raw = input_jumlah.value
@@ -210,26 +662,30 @@ def main(page: ft.Page):
             lbl_helper_nominal.update()
         
         input_jumlah.on_change = on_nominal_change
-        input_tipe.on_change = lambda e: load_kategori_options(input_tipe.value)
 
-        def delete_trx(id_trx):
+        async def on_tipe_change(e):
+            await load_kategori_options(input_tipe.value)
+
+        input_tipe.on_change = on_tipe_change
+
+        @catat_aksi("delete_trx")
+        async def delete_trx(id_trx):
             try:
-                c.execute("DELETE FROM transaksi WHERE id=?", (id_trx,))
-                conn.commit()
+                await db(repo.delete_transaksi, id_trx)
                 page.show_snack_bar(ft.SnackBar(ft.Text("Dihapus!")))
-                refresh_data_global()
+                await refresh_view_aktif()
             except Exception as ex:
                 print(ex)
 
-        def prepare_edit(row):
+        async def prepare_edit(row):
             state["edit_id"] = row[0]
             state["edit_date"] = row[1] 
             
             nav_bar.selected_index = 1
-            navigate_to(1)
+            await navigate_to(1)
             
             input_tipe.value = row[2]
-            load_kategori_options(row[2])
+            await load_kategori_options(row[2])
             input_kategori.value = row[3]
             input_deskripsi.value = row[4]
             input_jumlah.value = str(int(row[5]))
@@ -239,7 +695,7 @@ def main(page: ft.Page):
             btn_simpan.icon = "update"
             btn_simpan.style.bgcolor = "orange" 
             btn_batal_edit.visible = True
-            page.update()
+            kirim_update("input", input_tipe, input_kategori, input_deskripsi, input_jumlah, lbl_helper_nominal, btn_simpan, btn_batal_edit)
             page.show_snack_bar(ft.SnackBar(ft.Text("Mode Edit Aktif")))
 
         def batal_edit(e=None):
@@ -252,135 +708,264 @@ def main(page: ft.Page):
             btn_simpan.icon = "save"
             btn_simpan.style.bgcolor = color_primary
             btn_batal_edit.visible = False
-            page.update()
+            kirim_update("input", input_jumlah, input_deskripsi, lbl_helper_nominal, btn_simpan, btn_batal_edit)
         
         btn_batal_edit.on_click = batal_edit
 
-        def simpan_transaksi(e):
+        @catat_aksi("simpan_transaksi")
+        async def simpan_transaksi(e):
             if not input_jumlah.value:
                 input_jumlah.error_text = "Wajib isi"
                 input_jumlah.update()
                 return
             
             try:
-                val = float(input_jumlah.value)
-                c.execute("SELECT is_tabungan FROM master_kategori WHERE nama=?", (input_kategori.value,))
-                res = c.fetchone()
-                is_sav = res[0] if res else 0
+                val = ke_rupiah_bulat(input_jumlah.value)
+                is_sav = await db(repo.get_is_tabungan, input_kategori.value)
                 
                 if state["edit_id"]:
-                    c.execute('''UPDATE transaksi SET tipe=?, kategori=?, deskripsi=?, jumlah=?, is_tabungan=?, tanggal=? WHERE id=?''',
-                              (input_tipe.value, input_kategori.value, input_deskripsi.value, val, is_sav, state["edit_date"], state["edit_id"]))
+                    await db(repo.update_transaksi, state["edit_id"], state["edit_date"], input_tipe.value, input_kategori.value, input_deskripsi.value, val, is_sav)
                     msg = "Data berhasil di-update!"
                 else:
                     tgl = datetime.now().strftime("%Y-%m-%d")
-                    c.execute("INSERT INTO transaksi (tanggal, tipe, kategori, deskripsi, jumlah, is_tabungan) VALUES (?,?,?,?,?,?)",
-                              (tgl, input_tipe.value, input_kategori.value, input_deskripsi.value, val, is_sav))
+                    await db(repo.insert_transaksi, tgl, input_tipe.value, input_kategori.value, input_deskripsi.value, val, is_sav)
                     msg = "Data berhasil disimpan!"
                 
-                conn.commit()
                 batal_edit() 
                 page.show_snack_bar(ft.SnackBar(ft.Text(msg), bgcolor="green"))
                 
                 nav_bar.selected_index = 0
-                navigate_to(0)
+                await navigate_to(0)
                 
             except Exception as ex:
                 page.show_snack_bar(ft.SnackBar(ft.Text(f"Error: {str(ex)}")))
 
         btn_simpan.on_click = simpan_transaksi
 
-        def build_list_transaksi(lv_control, where_clause="", params=(), limit=None, search_keyword=""):
+        # --- DAFTAR TRANSAKSI (LAZY LISTVIEW + KEYSET PAGINATION) ---
+        # ListView hanya me-render tile yang terlihat; data dimuat per halaman saat user
+        # scroll mendekati akhir list. State paging disimpan di lv_control.data.
+        PAGE_SIZE = 50
+
+        # Tile di-cache per list dengan key id transaksi. Refresh memakai ulang object control
+        # yang sama sehingga Flet hanya mengirim diff (mis. satu tile hilang setelah hapus);
+        # tile yang datanya berubah di-patch in-place lewat patch_tile().
+        def build_tile(row):
+            icon = ft.Icon(color="white", size=18)
+            icon_box = ft.Container(content=icon, padding=8, border_radius=8)
+            txt_kategori = ft.Text(weight="bold", size=14)
+            txt_deskripsi = ft.Text(size=11, color="grey", overflow=ft.TextOverflow.ELLIPSIS)
+            txt_jumlah = ft.Text(weight="bold", size=13)
+
+            tile = ft.Container(
+                bgcolor="surface", 
+                padding=10, 
+                border_radius=10, 
+                border=ft.border.all(0.5, "grey"),
+                content=ft.Row([
+                    icon_box,
+                    ft.Column([txt_kategori, txt_deskripsi], expand=True, spacing=2),
+                    ft.Column([
+                        txt_jumlah,
+                        ft.Row([
+                            # Handler membaca row terbaru dari tile.data, bukan row saat tile dibuat
+                            ft.GestureDetector(content=ft.Icon("edit", size=18, color="teal"), on_tap=lambda e: page.run_task(prepare_edit, tile.data["row"])),
+                            ft.GestureDetector(content=ft.Icon("delete", size=18, color="red"), on_tap=lambda e: page.run_task(delete_trx, tile.data["row"][0]))
+                        ])
+                    ], alignment="end", spacing=2)
+                ])
+            )
+            tile.data = {"row": None, "icon": icon, "icon_box": icon_box, "kategori": txt_kategori, "deskripsi": txt_deskripsi, "jumlah": txt_jumlah}
+            patch_tile(tile, row)
+            return tile
+
+        def patch_tile(tile, row):
+            # row = model.Transaksi; ikon & teks jumlah sudah dihitung (memo) di data layer
+            d = tile.data
+            d["icon"].name = row.icon
+            d["icon_box"].bgcolor = color_primary if row.is_in else "red400"
+            d["kategori"].value = row.kategori
+            d["deskripsi"].value = row.deskripsi if row.deskripsi else "-"
+            d["jumlah"].value = row.jumlah_str
+            d["jumlah"].color = "green" if row.is_in else ("orange" if row.is_tabungan == 1 else "red")
+            d["row"] = row
+
+        def ambil_dari_cache(cache, key, buat):
+            # "aktif" = control yang dipakai render sekarang, "lama" = render sebelumnya.
+            # Entry lama yang tidak dipakai lagi ikut terbuang pada reset berikutnya.
+            control = cache["aktif"].get(key)
+            if control is None:
+                control = cache["lama"].pop(key, None) or buat()
+                cache["aktif"][key] = control
+            return control
+
+        def get_tile(cache, row):
+            tile = ambil_dari_cache(cache, ("tile", row[0]), lambda: build_tile(row))
+            if tile.data["row"] != row:
+                patch_tile(tile, row)
+            return tile
+
+        def get_header_tanggal(cache, tgl_str):
+            return ambil_dari_cache(cache, ("header", tgl_str), lambda: ft.Container(padding=ft.padding.only(top=10), content=ft.Text(tgl_str, size=12, weight="bold", color="grey")))
+
+        def build_list_transaksi(lv_control, rows, where_clause="", params=(), search_keyword="", page_size=PAGE_SIZE, prefix=(), sumber=SUMBER_AKTIF):
+            # rows = halaman pertama (page_size + 1 baris) yang sudah di-query lewat db();
+            # where_clause tanpa WHERE; prefix = control tetap di atas list (mis. chart Laporan);
+            # sumber = skema arsip yang ikut dibaca saat halaman berikutnya dimuat
+            prev = lv_control.data or {}
+            cache = prev.get("cache") or {"aktif": {}, "lama": {}}
+            cache["lama"], cache["aktif"] = cache["aktif"], {}
+            lv_control.data = {
+                "where": where_clause, "params": tuple(params), "keyword": search_keyword, "sumber": sumber,
+                "page_size": page_size, "setelah": None, "current_date": None,
+                "habis": False, "loading": False, "cache": cache,
+                "btn_more": prev.get("btn_more") or ft.TextButton("Muat lebih banyak", icon="expand_more", on_click=lambda e: page.run_task(load_more, lv_control)),
+                "txt_kosong": prev.get("txt_kosong") or ft.Text("Tidak ada data.", italic=True, text_align="center"),
+            }
             lv_control.controls.clear()
-            limit_sql = f" LIMIT {limit}" if limit else ""
-            
-            sql_params = list(params)
-            search_filter = ""
-            if search_keyword:
-                search_filter = " AND (deskripsi LIKE ? OR kategori LIKE ?)"
-                sql_params.append(f"%{search_keyword}%")
-                sql_params.append(f"%{search_keyword}%")
-                
-                if not where_clause:
-                    search_filter = " WHERE (deskripsi LIKE ? OR kategori LIKE ?)"
+            lv_control.controls.extend(prefix)
+            load_halaman_berikut(lv_control, rows)
 
-            sql = f"SELECT * FROM transaksi {where_clause} {search_filter} ORDER BY tanggal DESC, id DESC{limit_sql}"
-            
-            c.execute(sql, tuple(sql_params))
-            rows = c.fetchall()
-            
-            if not rows:
-                lv_control.controls.append(ft.Text("Tidak ada data.", italic=True, text_align="center"))
+        def query_halaman(st, setelah=None):
+            # Ambil 1 baris ekstra untuk tahu apakah masih ada halaman berikutnya (jalan di executor)
+            return repo.query_transaksi_halaman(st["where"], st["params"], st["keyword"], setelah, st["page_size"] + 1, st["sumber"])
+
+        def load_halaman_berikut(lv_control, rows):
+            # Hanya menyusun control dari rows, tanpa SQL
+            st = lv_control.data
+            st["habis"] = len(rows) <= st["page_size"]
+            rows = rows[:st["page_size"]]
+
+            if st["btn_more"] in lv_control.controls:
+                lv_control.controls.remove(st["btn_more"])
+
+            if not rows and st["setelah"] is None:
+                lv_control.controls.append(st["txt_kosong"])
                 return
 
-            current_date = None
             for row in rows:
                 try:
-                    tgl_obj = datetime.strptime(row[1], "%Y-%m-%d")
-                    tgl_str = tgl_obj.strftime("%d %B %Y")
-                    
-                    if tgl_str != current_date:
-                        lv_control.controls.append(ft.Container(padding=ft.padding.only(top=10), content=ft.Text(tgl_str, size=12, weight="bold", color="grey")))
-                        current_date = tgl_str
-                    
-                    is_in = row[2] == "Pemasukan"
-                    color_amt = "green" if is_in else ("orange" if row[6] == 1 else "red")
-                    sign = "+" if is_in else "-"
-                    
-                    r_copy = row
-                    
-                    tile = ft.Container(
-                        bgcolor="surface", 
-                        padding=10, 
-                        border_radius=10, 
-                        border=ft.border.all(0.5, "grey"),
-                        content=ft.Row([
-                            ft.Container(
-                                content=ft.Icon(get_icon_for_category(r_copy[3]), color="white", size=18), 
-                                bgcolor=color_primary if is_in else "red400", 
-                                padding=8, 
-                                border_radius=8
-                            ),
-                            ft.Column([
-                                ft.Text(r_copy[3], weight="bold", size=14),
-                                ft.Text(r_copy[4] if r_copy[4] else "-", size=11, color="grey", overflow=ft.TextOverflow.ELLIPSIS)
-                            ], expand=True, spacing=2),
-                            ft.Column([
-                                ft.Text(f"{sign} {format_rupiah(r_copy[5]).replace('Rp ','')}", color=color_amt, weight="bold", size=13),
-                                ft.Row([
-                                    ft.GestureDetector(content=ft.Icon("edit", size=18, color="teal"), on_tap=lambda e, r=r_copy: prepare_edit(r)),
-                                    ft.GestureDetector(content=ft.Icon("delete", size=18, color="red"), on_tap=lambda e, r=r_copy[0]: delete_trx(r))
-                                ])
-                            ], alignment="end", spacing=2)
-                        ])
-                    )
-                    lv_control.controls.append(tile)
+                    tgl_str = row.header_tanggal
+                    # current_date ikut disimpan supaya header tanggal tidak dobel di batas halaman
+                    if tgl_str != st["current_date"]:
+                        lv_control.controls.append(get_header_tanggal(st["cache"], tgl_str))
+                        st["current_date"] = tgl_str
+                    lv_control.controls.append(get_tile(st["cache"], row))
                 except Exception as e:
-                     continue
+                    continue
+
+            if rows:
+                st["setelah"] = (rows[-1][1], rows[-1][0])
+            if not st["habis"]:
+                lv_control.controls.append(st["btn_more"])
+
+        async def load_more(lv_control):
+            st = lv_control.data
+            if not st or st["habis"] or st["loading"]:
+                return
+            st["loading"] = True
+            try:
+                rows = await db(query_halaman, st, st["setelah"])
+                # List sudah di-reset oleh refresh/pencarian baru selama query berjalan
+                if lv_control.data is not st:
+                    return
+                load_halaman_berikut(lv_control, rows)
+                lv_control.update()
+            finally:
+                st["loading"] = False
 
-        def refresh_data_laporan():
+        async def on_scroll_list(e):
+            if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - 300:
+                await load_more(e.control)
+
+        lv_dashboard.on_scroll = on_scroll_list
+        lv_laporan.on_scroll = on_scroll_list
+
+        def get_periode_laporan():
             bulan_nama = filter_bulan.value
-            tahun = filter_tahun.value
-            clauses = []
-            params = []
-            
-            if tahun != "Semua":
-                clauses.append("strftime('%Y', tanggal) = ?")
-                params.append(tahun)
-            
-            if bulan_nama != "Semua":
-                bulan_angka = map_bulan.get(bulan_nama, "01")
-                clauses.append("strftime('%m', tanggal) = ?")
-                params.append(bulan_angka)
-                
-            where_sql = " WHERE " + " AND ".join(clauses) if clauses else ""
-            
-            sql_chart = f"SELECT kategori, SUM(jumlah) FROM transaksi {where_sql} AND tipe='Pengeluaran' GROUP BY kategori"
-            if not where_sql: sql_chart = sql_chart.replace("AND tipe", "WHERE tipe")
-            
-            c.execute(sql_chart, tuple(params))
-            data_chart = c.fetchall()
-            
+            bulan_angka = map_bulan.get(bulan_nama, "01") if bulan_nama != "Semua" else "Semua"
+            return filter_tahun.value, bulan_angka
+
+        def get_filter_laporan():
+            # Range tanggal setengah terbuka agar memakai idx_transaksi_hari (jalan di executor)
+            return repo.periode_clause(*get_periode_laporan())
+
+        def terapkan_tren(data):
+            state["tren_awal"] = f"{data[0][0]:04d}-{data[0][1]:02d}"
+            chart_tren.data_series = [
+                ft.LineChartData(
+                    data_points=[ft.LineChartDataPoint(i, row[2 + s]) for i, row in enumerate(data)],
+                    color=warna, stroke_width=2, curved=True, prevent_curve_over_shooting=True
+                )
+                for s, (nama, warna) in enumerate(seri_tren)
+            ]
+            nama_bulan = list(map_bulan.keys())
+            step = max(1, len(data) // 6)
+            chart_tren.bottom_axis.labels = [
+                ft.ChartAxisLabel(value=i, label=ft.Text(nama_bulan[row[1] - 1][:3], size=10))
+                for i, row in enumerate(data) if i % step == 0
+            ]
+            chart_tren.max_y = max([max(row[2:]) for row in data] + [0]) * 1.1 or 1
+
+        def terapkan_saldo(data, harian):
+            # data: [(tahun, bulan, saldo)] per bulan, atau [(tanggal, saldo)] per hari dengan titik 0 = awal bulan
+            nilai = [row[-1] for row in data]
+            if harian:
+                periode = get_periode_laporan()
+                state["saldo_akhir"] = f"{periode[0]}-{periode[1]}"
+                labels = [(i, str(row[0]) if row[0] else "awal") for i, row in enumerate(data)]
+                txt_saldo_info.value = f"Saldo akhir {filter_bulan.value} {periode[0]}: {format_rupiah(nilai[-1])}"
+            else:
+                state["saldo_akhir"] = f"{data[-1][0]:04d}-{data[-1][1]:02d}"
+                nama_bulan = list(map_bulan.keys())
+                labels = [(i, nama_bulan[row[1] - 1][:3]) for i, row in enumerate(data)]
+                txt_saldo_info.value = f"Saldo akhir bulan ini: {format_rupiah(nilai[-1])}"
+            chart_saldo.data_series = [
+                ft.LineChartData(
+                    data_points=[ft.LineChartDataPoint(i, v) for i, v in enumerate(nilai)],
+                    color=color_primary, stroke_width=2, curved=True, prevent_curve_over_shooting=True,
+                    below_line_bgcolor="teal50",
+                )
+            ]
+            step = max(1, len(labels) // 6)
+            chart_saldo.bottom_axis.labels = [
+                ft.ChartAxisLabel(value=i, label=ft.Text(teks, size=10)) for i, teks in labels if i % step == 0
+            ]
+            # Saldo bisa negatif; sumbu Y mengikuti rentang nilai
+            rentang = (max(nilai) - min(nilai)) or abs(max(nilai)) or 1
+            chart_saldo.min_y = min(nilai) - rentang * 0.1
+            chart_saldo.max_y = max(nilai) + rentang * 0.1
+
+        def ambil_data_saldo(periode, n_tren):
+            # Satu bulan dipilih -> saldo harian bulan itu; selain itu saldo akhir bulan sepanjang jendela tren
+            if periode[0] != "Semua" and periode[1] != "Semua":
+                return repo.saldo_harian(*periode), True
+            return repo.saldo_bulanan(n_tren), False
+
+        @catat_aksi("filter_tren")
+        async def on_filter_tren_change(e):
+            data_tren, data_saldo = await db(
+                lambda n, periode: (repo.tren_bulanan(n), ambil_data_saldo(periode, n)),
+                int(filter_tren.value), get_periode_laporan())
+            terapkan_tren(data_tren)
+            terapkan_saldo(*data_saldo)
+            kirim_update("laporan", chart_tren, chart_saldo, txt_saldo_info)
+
+        filter_tren.on_change = on_filter_tren_change
+
+        def ambil_data_laporan(periode, n_tren):
+            # Semua query Laporan dalam satu kali lompat ke executor.
+            # Chart pie & tren dibaca dari rollup (aktif + arsip), bukan GROUP BY tabel transaksi;
+            # file arsip hanya dibuka untuk list jika filter tahun menyentuh tahun yang diarsipkan
+            clause, params = repo.periode_clause(*periode)
+            sumber = repo.sumber_periode(periode[0])
+            data_chart = repo.total_per_kategori(*periode, "Pengeluaran")
+            data_tren = repo.tren_bulanan(n_tren)
+            data_saldo = ambil_data_saldo(periode, n_tren)
+            rows = repo.query_transaksi_halaman(clause, params, limit=PAGE_SIZE + 1, sumber=sumber)
+            return clause, params, sumber, data_chart, data_tren, data_saldo, rows
+
+        def terapkan_chart_pie(data_chart):
             chart_pie.sections.clear()
             colors = ["blue", "red", "orange", "purple", "green", "teal", "pink"]
             total_filtered = sum([r[1] for r in data_chart])
@@ -401,71 +986,147 @@ def main(page: ft.Page):
                         )
                     )
                 txt_chart_info.value = f"Total Pengeluaran (Filter): {format_rupiah(total_filtered)}"
-            
-            build_list_transaksi(lv_laporan, where_sql, tuple(params), limit=None)
-            page.update()
 
-        filter_bulan.on_change = lambda e: refresh_data_laporan()
-        filter_tahun.on_change = lambda e: refresh_data_laporan()
+        async def refresh_data_laporan():
+            async def kerja():
+                hitung_recompute()
+                view_dirty["laporan"] = False
+                tampil_loading(loading_laporan, "laporan", True)
+                try:
+                    clause, params, sumber, data_chart, data_tren, data_saldo, rows = await db(ambil_data_laporan, get_periode_laporan(), int(filter_tren.value))
+                    terapkan_chart_pie(data_chart)
+                    terapkan_tren(data_tren)
+                    terapkan_saldo(*data_saldo)
+                    build_list_transaksi(lv_laporan, rows, clause, params, prefix=laporan_header, sumber=sumber)
+                    # Chart & info ada di dalam lv_laporan (prefix), cukup update list-nya
+                    kirim_update("laporan", lv_laporan)
+                except asyncio.CancelledError:
+                    view_dirty["laporan"] = True  # dibatalkan, ulangi saat view dibuka lagi
+                    raise
+                finally:
+                    tampil_loading(loading_laporan, "laporan", False)
+            await jalankan_refresh("laporan", kerja)
 
-        def refresh_data_global():
-            try:
-                c.execute("SELECT SUM(jumlah) FROM transaksi WHERE tipe='Pemasukan'")
-                m = c.fetchone()[0] or 0
-                c.execute("SELECT SUM(jumlah) FROM transaksi WHERE tipe='Pengeluaran' AND is_tabungan=0")
-                k = c.fetchone()[0] or 0
-                c.execute("SELECT SUM(jumlah) FROM transaksi WHERE tipe='Pengeluaran' AND is_tabungan=1")
-                inv = c.fetchone()[0] or 0
-                
-                saldo_cash = m - (k + inv)
-                state["total_cash"] = saldo_cash 
-                
-                txt_saldo.value = format_rupiah(saldo_cash)
-                txt_masuk.value = format_rupiah(m)
-                txt_keluar.value = format_rupiah(k)
-                txt_invest.value = format_rupiah(inv)
-                
-                build_list_transaksi(lv_dashboard, limit=20, search_keyword=txt_search.value)
-                page.update()
-            except Exception as e:
-                pass
+        @catat_aksi("filter_laporan")
+        async def on_filter_laporan_change(e):
+            await refresh_data_laporan()
 
-        txt_search.on_change = lambda e: build_list_transaksi(lv_dashboard, limit=20, search_keyword=txt_search.value)
+        filter_bulan.on_change = on_filter_laporan_change
+        filter_tahun.on_change = on_filter_laporan_change
 
-        # --- VIEWS ---
-        def view_login():
-            input_pin = ft.TextField(
-                password=True, can_reveal_password=True, text_align="center", 
-                width=200, max_length=6, keyboard_type=ft.KeyboardType.NUMBER,
-                input_filter=ft.InputFilter(regex_string=r"[0-9]"),
-                hint_text="PIN (Default: 1234)"
-            )
+        def ambil_data_dashboard(keyword, page_size):
+            # Total dijaga trigger di tabel ringkasan_saldo, tidak perlu SUM seluruh tabel
+            return repo.get_ringkasan(), repo.query_transaksi_halaman(search_keyword=keyword, limit=page_size + 1)
+
+        def terapkan_dashboard(ringkasan, rows, keyword):
+            m, k, inv = ringkasan
+            saldo_cash = m - (k + inv)
+            state["total_cash"] = saldo_cash 
             
-            def check_pin(e):
-                if input_pin.value and input_pin.value.strip() == state["user_pin"]:
-                    state["is_logged_in"] = True
-                    input_pin.value = ""
-                    navigate_to(0)
-                else:
-                    input_pin.error_text = "PIN Salah!"
-                    input_pin.update()
+            txt_saldo.value = format_rupiah(saldo_cash)
+            txt_masuk.value = format_rupiah(m)
+            txt_keluar.value = format_rupiah(k)
+            txt_invest.value = format_rupiah(inv)
+            build_list_transaksi(lv_dashboard, rows, search_keyword=keyword, page_size=20)
 
-            return ft.Container(
-                expand=True,
-                bgcolor="white",
-                alignment=ft.alignment.center,
-                padding=30,
-                content=ft.Column([
-                    ft.Icon("lock_outline", size=60, color=color_primary),
-                    ft.Text("Secured Finance", size=24, weight="bold", color=color_primary),
-                    ft.Container(height=30),
-                    input_pin,
-                    ft.ElevatedButton("BUKA KUNCI", on_click=check_pin, bgcolor=color_primary, color="white", width=200),
-                    ft.Container(height=50),
-                    get_watermark()
-                ], horizontal_alignment="center", alignment="center")
-            )
+        async def refresh_data_global():
+            async def kerja():
+                hitung_recompute()
+                view_dirty["dashboard"] = False
+                tampil_loading(loading_dashboard, "dashboard", True)
+                try:
+                    keyword = txt_search.value
+                    ringkasan, rows = await db(ambil_data_dashboard, keyword, 20)
+                    terapkan_dashboard(ringkasan, rows, keyword)
+                    kirim_update("dashboard", txt_saldo, txt_masuk, txt_keluar, txt_invest, lv_dashboard)
+                except asyncio.CancelledError:
+                    view_dirty["dashboard"] = True
+                    raise
+                except Exception as e:
+                    print(e)
+                finally:
+                    tampil_loading(loading_dashboard, "dashboard", False)
+            await jalankan_refresh("dashboard", kerja)
+
+        async def refresh_view_aktif():
+            if state["view_aktif"] == "dashboard" and view_dirty["dashboard"]:
+                await refresh_data_global()
+            elif state["view_aktif"] == "laporan" and view_dirty["laporan"]:
+                await refresh_data_laporan()
+
+        def filter_laporan_kena(ev):
+            # Apakah perubahan menyentuh periode filter Laporan yang sedang dipilih
+            tanggal = tanggal_terkena(ev)
+            if tanggal is None:
+                return True
+            tahun = filter_tahun.value
+            bulan = map_bulan.get(filter_bulan.value) if filter_bulan.value != "Semua" else None
+            for tgl in tanggal:
+                if (tahun == "Semua" or tgl[:4] == tahun) and (bulan is None or tgl[5:7] == bulan):
+                    return True
+                if tgl[:7] >= state.get("tren_awal", ""):
+                    return True
+                # Saldo kumulatif: perubahan di tanggal mana pun sebelum akhir chart saldo ikut menggeser
+                if tgl[:7] <= state.get("saldo_akhir", ""):
+                    return True
+            return False
+
+        # Handler async: Flet menjalankannya di loop sesi ini, bukan di thread penulis.
+        # Sesi yang menulis juga menerimanya; refresh ganda dicegah view_dirty & jalankan_refresh.
+        @catat_aksi("push_data")
+        async def on_perubahan_data(topic, ev):
+            view_dirty["dashboard"] = True
+            if filter_laporan_kena(ev):
+                view_dirty["laporan"] = True
+            if ev.jenis == BULK:
+                # Import/arsip/restore bisa mengubah rentang tahun
+                daftar_tahun = get_list_tahun(await db(repo.get_rentang_tahun))
+                filter_tahun.options = [ft.dropdown.Option(t) for t in daftar_tahun]
+                if filter_tahun.value not in daftar_tahun:
+                    # Tahun terpilih sudah tidak ada (mis. setelah restore): kembali ke "Semua"
+                    filter_tahun.value = "Semua"
+                    view_dirty["laporan"] = True
+                kirim_update("laporan", filter_tahun)
+            await refresh_view_aktif()
+
+        def on_sesi_tutup(e):
+            page.pubsub.unsubscribe_all()
+            layanan.lepas_sesi()
+
+        page.pubsub.subscribe_topic(TOPIK_DATA, on_perubahan_data)
+        layanan.pasang_sesi(page.pubsub)
+        page.on_close = on_sesi_tutup
+
+        # --- PENCARIAN (DEBOUNCE + EXECUTOR) ---
+        # Setiap ketikan menjadi task refresh "dashboard" baru yang membatalkan task sebelumnya
+        # (lihat jalankan_refresh). Task menunggu SEARCH_DEBOUNCE_MS dulu, jadi selama user
+        # masih mengetik tidak ada query yang jalan, dan hasil lama tidak pernah sampai ke lv_dashboard.
+        async def on_search_change(e):
+            keyword = txt_search.value
+            await jalankan_refresh("dashboard", lambda: jalankan_pencarian(keyword))
+
+        @catat_aksi("search")
+        async def jalankan_pencarian(keyword):
+            await asyncio.sleep(SEARCH_DEBOUNCE_MS / 1000)
+            try:
+                t0 = time.perf_counter()
+                rows = await db(repo.query_transaksi_halaman, search_keyword=keyword, limit=21)
+                t_query = time.perf_counter()
+                build_list_transaksi(lv_dashboard, rows, search_keyword=keyword, page_size=20)
+                kirim_update("dashboard", lv_dashboard)
+
+                t_selesai = time.perf_counter()
+                # Keyword tidak ikut dicatat; hanya latency & jumlah baris
+                if profiler:
+                    profiler.catat(HANDLER, "search:hasil", (t_selesai - t0) * 1000,
+                                   query_ms=(t_query - t0) * 1000, rows=len(rows))
+            except Exception as ex:
+                # Pesan error FTS bisa memuat potongan keyword, jadi hanya jenisnya yang dicetak
+                print(f"[search] gagal: {type(ex).__name__}")
 
+        txt_search.on_change = on_search_change
+
+        # --- VIEWS ---
         def view_dashboard():
             return ft.Container(
                 content=ft.Column([
@@ -499,6 +1160,7 @@ def main(page: ft.Page):
                         padding=ft.padding.only(left=20, right=20, top=15),
                         content=txt_search
                     ),
+                    ft.Container(content=loading_dashboard, padding=ft.padding.only(left=20, right=20, top=10)),
                     ft.Container(content=lv_dashboard, padding=20, expand=True),
                 ]),
                 expand=True
@@ -527,6 +1189,7 @@ def main(page: ft.Page):
             )
 
         def view_laporan():
+            # Chart & judul ikut menjadi item awal lv_laporan agar satu layar scroll bersama list
             return ft.Container(
                 padding=20,
                 content=ft.Column([
@@ -534,50 +1197,86 @@ def main(page: ft.Page):
                     ft.Divider(height=10, color="transparent"),
                     ft.Text("Laporan & Analisis", size=20, weight="bold"),
                     ft.Row([ft.Text("Filter:"), filter_bulan, filter_tahun], alignment="center"),
-                    ft.Container(height=10),
-                    ft.Container(
-                        content=chart_pie, height=300, padding=10,
-                        border=ft.border.all(1, "grey"), 
-                        border_radius=20
-                    ),
-                    txt_chart_info,
-                    ft.Divider(),
-                    ft.Row([ft.Text("Rincian Transaksi", weight="bold"), ft.IconButton("download", tooltip="Export CSV", on_click=lambda e: file_picker.save_file(file_name="Laporan.csv"))], alignment="spaceBetween"),
+                    loading_laporan,
                     lv_laporan,
                     get_watermark() 
-                ], spacing=10, scroll=ft.ScrollMode.AUTO),
+                ], spacing=10),
                 expand=True
             )
 
         # --- NAVIGATION SYSTEM ---
-        body = ft.Container(expand=True)
-        
-        def navigate_to(index):
+        @catat_aksi("navigate_to")
+        async def navigate_to(index):
+            # View baru langsung dikirim (dengan data terakhir), lalu data yang dirty dimuat
+            # ulang di executor sambil menampilkan indikator loading. Refresh view lain yang
+            # masih berjalan dibatalkan supaya hasilnya tidak menimpa view yang sedang tampil.
             if not state["is_logged_in"]:
-                body.content = view_login()
+                state["view_aktif"] = "login"
+                body.content = get_view("login", view_login)
                 nav_bar.visible = False
             else:
                 nav_bar.visible = True
                 if index == 0: 
-                    body.content = view_dashboard()
-                    refresh_data_global()
+                    state["view_aktif"] = "dashboard"
+                    body.content = get_view("dashboard", view_dashboard)
                 elif index == 1: 
-                    body.content = view_input()
-                    load_kategori_options(input_tipe.value)
+                    state["view_aktif"] = "input"
+                    body.content = get_view("input", view_input)
                 elif index == 2: 
-                    body.content = view_laporan()
-                    refresh_data_laporan()
+                    state["view_aktif"] = "laporan"
+                    body.content = get_view("laporan", view_laporan)
                 
                 nav_bar.selected_index = index
-            page.update()
+            batalkan_tugas_basi()
+            kirim_update(None, body, nav_bar)
+
+            if state["view_aktif"] == "input":
+                await load_kategori_options(input_tipe.value)
+            else:
+                await refresh_view_aktif()
 
-        nav_bar.on_change = lambda e: navigate_to(e.control.selected_index)
+        async def on_nav_change(e):
+            await navigate_to(e.control.selected_index)
+
+        nav_bar.on_change = on_nav_change
 
         # START APP
-        page.add(body, nav_bar)
-        navigate_to(0)
+        # Data Beranda disiapkan selagi user mengetik PIN, jadi setelah login langsung tampil
+        await refresh_data_global()
+        app_siap.set()
+        catat_startup("interaktif")
+        if profiler:
+            for nama, ms in state["startup_ms"].items():
+                profiler.catat(STARTUP, nama, ms)
+
+        # Tahun di luar TAHUN_AKTIF dipindah ke file arsip setelah app interaktif, sekali per
+        # proses (sesi pertama). Event BULK-nya memuat ulang view di semua sesi.
+        async def arsipkan_otomatis():
+            t0 = time.perf_counter()
+            try:
+                hasil = await db(repo.arsipkan_tahun_lama, TAHUN_AKTIF)
+                if profiler:
+                    profiler.catat(HANDLER, "arsip_otomatis", (time.perf_counter() - t0) * 1000,
+                                   dipindah={str(t): n for t, n in hasil.items()})
+            except Exception as ex:
+                if profiler:
+                    profiler.catat(HANDLER, "arsip_otomatis", (time.perf_counter() - t0) * 1000, gagal=str(ex))
+                page.show_snack_bar(ft.SnackBar(ft.Text(f"Gagal mengarsipkan tahun lama: {str(ex)}"), bgcolor="red"))
+
+        tugas_arsip = asyncio.ensure_future(arsipkan_otomatis()) if ARSIP_OTOMATIS and layanan.klaim_arsip() else None
+
+        # Hook untuk bench.py (jalan tanpa GUI); ft.app mengabaikan nilai return
+        return {
+            "repo": repo, "state": state, "navigate_to": navigate_to, "profiler": profiler,
+            "refresh_data_global": refresh_data_global, "refresh_data_laporan": refresh_data_laporan,
+            "build_list_transaksi": build_list_transaksi, "load_more": load_more,
+            "jalankan_export": jalankan_export, "jalankan_pencarian": jalankan_pencarian,
+            "lv_dashboard": lv_dashboard, "lv_laporan": lv_laporan, "db_executor": db_executor, "layanan": layanan,
+            "filter_tahun": filter_tahun, "filter_bulan": filter_bulan, "tugas_arsip": tugas_arsip,
+        }
 
     except Exception as e:
+        import traceback
         error_trace = traceback.format_exc()
         page.clean()
         page.add(
@@ -601,4 +1300,11 @@ def main(page: ft.Page):
         )
         page.update()
 
-ft.app(target=main)
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # Laporan/export tanpa GUI: python main.py ringkasan|kategori|export|batch ...
+        from cli import PERINTAH, jalankan
+        if sys.argv[1] in PERINTAH:
+            sys.exit(jalankan(sys.argv[1:]))
+    _muat_flet().app(target=main)
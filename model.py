@@ -0,0 +1,84 @@
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+# --- FORMAT & IKON ---
+def format_rupiah(value):
+    if value is None: return "Rp 0"
+    try:
+        val = float(value)
+        return f"Rp {int(val):,}".replace(",", ".")
+    except: return "Rp 0"
+
+
+# Nama kategori & tanggal sangat berulang antar baris, jadi hasil format di-memo
+@lru_cache(maxsize=512)
+def get_icon_for_category(kategori):
+    if not kategori: return "category"
+    kat = kategori.lower()
+    if "makan" in kat: return "fastfood"
+    if "transport" in kat: return "directions_car"
+    if "gaji" in kat: return "attach_money"
+    if "invest" in kat or "tabungan" in kat or "darurat" in kat: return "savings"
+    if "tagihan" in kat or "listrik" in kat: return "receipt_long"
+    if "belanja" in kat: return "shopping_bag"
+    if "kesehatan" in kat: return "medical_services"
+    return "category"
+
+
+@lru_cache(maxsize=4096)
+def format_header_tanggal(tanggal):
+    try:
+        return datetime.strptime(tanggal, "%Y-%m-%d").strftime("%d %B %Y")
+    except (TypeError, ValueError):
+        return tanggal or "-"
+
+
+@lru_cache(maxsize=4096)
+def format_jumlah(jumlah, is_in):
+    sign = "+" if is_in else "-"
+    return f"{sign} {format_rupiah(jumlah).replace('Rp ','')}"
+
+
+# --- FORMAT PENYIMPANAN ---
+# Di DB tanggal disimpan sebagai hari INTEGER YYYYMMDD dan jumlah sebagai rupiah bulat.
+# Ke luar data layer (UI, event, CSV) tanggal tetap string ISO "YYYY-MM-DD".
+SQL_HARI_KE_ISO = "CASE WHEN {t}hari IS NULL THEN NULL ELSE printf('%04d-%02d-%02d', {t}hari / 10000, {t}hari / 100 % 100, {t}hari % 100) END"
+
+
+def iso_ke_hari(tanggal):
+    if not tanggal: return None
+    return int(tanggal[:4]) * 10000 + int(tanggal[5:7]) * 100 + int(tanggal[8:10])
+
+
+def hari_ke_iso(hari):
+    if hari is None: return None
+    return f"{hari // 10000:04d}-{hari // 100 % 100:02d}-{hari % 100:02d}"
+
+
+def ke_rupiah_bulat(jumlah):
+    val = float(jumlah)
+    if val != val or val in (float("inf"), float("-inf")):
+        raise ValueError(f"jumlah tidak valid: {jumlah!r}")
+    return int(round(val))
+
+
+# --- RECORD ---
+# 7 field pertama = urutan kolom tabel transaksi (row[0]..row[6] tetap berlaku),
+# sisanya field tampilan yang dihitung sekali saat baris diambil dari DB.
+Transaksi = namedtuple("Transaksi", [
+    "id", "tanggal", "tipe", "kategori", "deskripsi", "jumlah", "is_tabungan",
+    "is_in", "header_tanggal", "jumlah_str", "icon",
+])
+
+KategoriInfo = namedtuple("KategoriInfo", ["nama", "tipe", "is_tabungan", "icon"])
+
+
+def buat_transaksi(row):
+    is_in = row[2] == "Pemasukan"
+    return Transaksi(
+        *row[:7], is_in,
+        format_header_tanggal(row[1]),
+        format_jumlah(row[5], is_in),
+        get_icon_for_category(row[3]),
+    )
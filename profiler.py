@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# --- PROFILING (OPT-IN) ---
+# AUTOFINT_PROFILE=1 mengaktifkan pencatatan durasi handler UI, setiap statement SQL
+# (durasi, jumlah baris, query plan) dan jumlah control per update. Data disimpan di
+# ring buffer berukuran tetap (AUTOFINT_PROFILE_BUFFER) sehingga memori tidak tumbuh.
+PROFILE_AKTIF = os.environ.get("AUTOFINT_PROFILE", "") not in ("", "0")
+PROFILE_BUFFER = int(os.environ.get("AUTOFINT_PROFILE_BUFFER", "2000"))
+MAX_PLAN_CACHE = 256
+
+HANDLER = "handler"
+SQL = "sql"
+UPDATE = "update"
+STARTUP = "startup"
+
+
+class Profiler:
+    def __init__(self, kapasitas=PROFILE_BUFFER):
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=kapasitas)
+        # Query plan dihitung sekali per teks SQL
+        self._plan_cache = {}
+
+    def catat(self, jenis, nama, ms, **detail):
+        # Return dict entry; pemanggil boleh melengkapi detail setelahnya (mis. jumlah baris)
+        entry = {"jenis": jenis, "nama": nama, "ms": ms, "waktu": time.time(), "thread": threading.current_thread().name}
+        entry.update(detail)
+        with self._lock:
+            self._buffer.append(entry)
+        return entry
+
+    def entries(self, jenis=None):
+        with self._lock:
+            data = list(self._buffer)
+        return [e for e in data if jenis is None or e["jenis"] == jenis]
+
+    def terlambat(self, n=20, jenis=None):
+        return sorted(self.entries(jenis), key=lambda e: e["ms"], reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self._buffer.clear()
+
+    def dump_json(self, path):
+        data = {"dibuat": time.time(), "kapasitas": self._buffer.maxlen, "entries": self.entries()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, default=str)
+        os.replace(tmp_path, path)
+        return len(data["entries"])
+
+    def plan(self, conn, sql, params):
+        if sql in self._plan_cache:
+            return self._plan_cache[sql]
+        try:
+            # Lewat method kelas dasar supaya EXPLAIN tidak ikut tercatat sebagai statement
+            plan = [r[3] for r in sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params)]
+        except sqlite3.Error:
+            plan = None
+        if len(self._plan_cache) < MAX_PLAN_CACHE:
+            self._plan_cache[sql] = plan
+        return plan
+
+
+# --- KONEKSI SQLITE TERINSTRUMENTASI ---
+# Dipakai sebagai factory sqlite3.connect(); cursor mencatat waktu execute + fetch dan
+# jumlah baris ke entry yang sama di Profiler (conn.profiler).
+def _rapikan_sql(sql):
+    return " ".join(sql.split())
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    _entry = None
+
+    def _tambah(self, t0, rows):
+        if self._entry is not None:
+            self._entry["ms"] += (time.perf_counter() - t0) * 1000
+            self._entry["rows"] += rows
+
+    def execute(self, sql, params=()):
+        profiler = self.connection.profiler
+        t0 = time.perf_counter()
+        super().execute(sql, params)
+        ms = (time.perf_counter() - t0) * 1000
+        sql_rapi = _rapikan_sql(sql)
+        plan = None
+        if sql_rapi.split(" ", 1)[0].upper() in ("SELECT", "WITH"):
+            plan = profiler.plan(self.connection, sql, params)
+        self._entry = profiler.catat(SQL, sql_rapi[:60], ms, sql=sql_rapi, rows=0, plan=plan)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        profiler = self.connection.profiler
+        t0 = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        sql_rapi = _rapikan_sql(sql)
+        self._entry = profiler.catat(SQL, sql_rapi[:60], (time.perf_counter() - t0) * 1000,
+                                     sql=sql_rapi, rows=max(self.rowcount, 0), plan=None)
+        return self
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._tambah(t0, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        self._tambah(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._tambah(t0, len(rows))
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        row = super().__next__()
+        self._tambah(t0, 1)
+        return row
+
+
+class ProfilingConnection(sqlite3.Connection):
+    profiler = None
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+# --- JUMLAH CONTROL PER UPDATE ---
+def hitung_control(control):
+    # Jumlah control di subtree yang ikut di-diff saat control.update()
+    # (_get_children() adalah API internal flet; tanpa itu dihitung 1).
+    total, stack = 0, [control]
+    while stack:
+        ctl = stack.pop()
+        total += 1
+        get_children = getattr(ctl, "_get_children", None)
+        if get_children:
+            stack.extend(c for c in get_children() if c is not None)
+    return total
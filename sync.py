@@ -0,0 +1,359 @@
+import gzip
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+
+from database import KOLOM_TABEL, TABEL_SYNC_KATEGORI, TABEL_SYNC_TRANSAKSI, ganti_perangkat
+from events import BULK, PerubahanData
+from model import hari_ke_iso, iso_ke_hari
+
+# --- FORMAT PAKET SYNC ---
+# Dua salinan keuangan.db (mis. HP & desktop) bertukar perubahan lewat satu file JSON di
+# folder bersama / kartu SD. Setiap "tukar" membaca paket dari perangkat lain (jika ada),
+# menerapkannya, lalu menimpa file dengan paket baru berisi perubahan lokal yang belum
+# dikonfirmasi perangkat itu. Isi paket:
+#   dari/untuk  ID perangkat pengirim & tujuan (hex)
+#   sampai      seq changelog pengirim saat paket dibuat
+#   ack         seq changelog tujuan terakhir yang sudah diterapkan pengirim (None = belum pernah)
+#   perubahan   [tabel, kunci, hapus, waktu, asal, data]; kategori lebih dulu
+# Konflik (kunci yang sama diubah di dua perangkat) diselesaikan last-writer-wins pada
+# (waktu ms, ID perangkat asal): dibandingkan apa adanya, sehingga semua perangkat memilih
+# pemenang yang sama. Versi (0, "") = baris lama yang belum pernah diubah sejak changelog ada.
+FORMAT_SYNC = 1
+# Batas jumlah parameter per query IN (...)
+CHUNK_KUNCI = 500
+_TANPA_VERSI = (0, b"")
+
+
+class SyncTidakValid(Exception):
+    # File bukan paket sync Autofint, rusak, atau dibuat salinan DB dengan ID perangkat yang sama
+    pass
+
+
+def perangkat_ini(conn):
+    return conn.execute("SELECT perangkat FROM sync_meta WHERE id = 1").fetchone()[0]
+
+
+def seq_terakhir(conn):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changelog'").fetchone()
+    return row[0] if row else 0
+
+
+def _potong(daftar, n=CHUNK_KUNCI):
+    for i in range(0, len(daftar), n):
+        yield daftar[i:i + n]
+
+
+def status(conn):
+    saya = perangkat_ini(conn)
+    peer = []
+    for perangkat, diterima, dikonfirmasi, terakhir in conn.execute(
+            "SELECT perangkat, diterima, dikonfirmasi, terakhir FROM sync_peer ORDER BY terakhir DESC"):
+        belum = conn.execute("SELECT COUNT(*) FROM changelog WHERE seq > ? AND asal != ?",
+                             (dikonfirmasi or 0, perangkat)).fetchone()[0]
+        peer.append({"perangkat": perangkat.hex(), "diterima": diterima, "dikonfirmasi": dikonfirmasi,
+                     "terakhir": terakhir, "belum_terkirim": belum})
+    return {"perangkat": saya.hex(), "seq": seq_terakhir(conn),
+            "changelog": conn.execute("SELECT COUNT(*) FROM changelog").fetchone()[0], "peer": peer}
+
+
+# --- KIRIM ---
+def _ambil_transaksi(bagian, uuids=None):
+    # {uuid: [tanggal, tipe, kategori, deskripsi, jumlah, is_tabungan]} dari data aktif & arsip;
+    # uuids None = semua baris (paket penuh)
+    hasil = {}
+    for conn, grup in bagian:
+        for skema in grup:
+            sql = (f"SELECT u.uuid, t.hari, t.tipe, t.kategori, t.deskripsi, t.jumlah, t.is_tabungan "
+                   f"FROM {skema}.transaksi t JOIN main.sync_uuid u ON u.id = t.id")
+            if uuids is None:
+                potongan = [()]
+            else:
+                potongan = list(_potong(uuids))
+                sql += " WHERE u.uuid IN ({})"
+            for p in potongan:
+                for uuid, hari, *data in conn.execute(sql.format(",".join("?" * len(p))), p):
+                    hasil[uuid] = [hari_ke_iso(hari)] + data
+    return hasil
+
+
+def buat_paket(repo, untuk=None):
+    # Paket penuh (semua baris + changelog) jika tujuan belum pernah mengonfirmasi apa pun,
+    # selain itu hanya entry changelog sesudah seq yang sudah dikonfirmasi
+    with repo.reader_sumber(repo.sumber_periode("Semua")) as bagian:
+        conn = bagian[0][0]
+        conn.execute("BEGIN")
+        try:
+            saya = perangkat_ini(conn)
+            sampai = seq_terakhir(conn)
+            peer = conn.execute("SELECT diterima, dikonfirmasi FROM sync_peer WHERE perangkat = ?",
+                                (untuk,)).fetchone() if untuk else None
+            ack, dasar = peer if peer else (None, None)
+            penuh = dasar is None
+            log = conn.execute("SELECT tabel, kunci, hapus, waktu, asal FROM changelog WHERE seq > ? AND seq <= ? ORDER BY seq",
+                               (dasar or 0, sampai)).fetchall()
+            kategori = {nama: [tipe, tab or 0] for nama, tipe, tab in
+                        conn.execute("SELECT nama, tipe, is_tabungan FROM master_kategori ORDER BY rowid")}
+            if penuh:
+                transaksi = _ambil_transaksi(bagian)
+            else:
+                transaksi = _ambil_transaksi(bagian, [k for t, k, h, _, _ in log if t == TABEL_SYNC_TRANSAKSI and not h])
+        finally:
+            conn.execute("COMMIT")
+
+    entri = {}
+    if penuh:
+        for nama, data in kategori.items():
+            entri[(TABEL_SYNC_KATEGORI, nama)] = [TABEL_SYNC_KATEGORI, nama, 0, 0, "", data]
+        for uuid, data in transaksi.items():
+            entri[(TABEL_SYNC_TRANSAKSI, uuid)] = [TABEL_SYNC_TRANSAKSI, uuid.hex(), 0, 0, "", data]
+    for tabel, kunci, hapus, waktu, asal in log:
+        data = None
+        if asal == untuk:
+            # Perubahan yang berasal dari tujuan sendiri tidak perlu dikirim balik
+            entri.pop((tabel, kunci), None)
+            continue
+        if not hapus:
+            data = (kategori if tabel == TABEL_SYNC_KATEGORI else transaksi).get(kunci)
+            if data is None:
+                # Dihapus sesudah snapshot; tombstone-nya ikut paket berikutnya
+                entri.pop((tabel, kunci), None)
+                continue
+        entri[(tabel, kunci)] = [tabel, kunci.hex() if tabel == TABEL_SYNC_TRANSAKSI else kunci, hapus, waktu, asal.hex(), data]
+    perubahan = sorted(entri.values(), key=lambda e: e[0] != TABEL_SYNC_KATEGORI)
+    return {
+        "format": FORMAT_SYNC,
+        "id": secrets.token_hex(8),
+        "dibuat": datetime.now().isoformat(timespec="seconds"),
+        "dari": saya.hex(),
+        "untuk": untuk.hex() if untuk else None,
+        "sampai": sampai,
+        "ack": ack,
+        "penuh": penuh,
+        "perubahan": perubahan,
+    }
+
+
+def tulis_paket(paket, path):
+    # Paket penuh (sinkron pertama) dikompres gzip; paket delta cukup JSON polos
+    tmp_path = path + ".tmp"
+    buka = gzip.open if paket["penuh"] else open
+    with buka(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(paket, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# --- TERIMA ---
+def baca_paket(path):
+    try:
+        with open(path, "rb") as f:
+            gz = f.read(2) == b"\x1f\x8b"
+        with (gzip.open if gz else open)(path, "rt", encoding="utf-8") as f:
+            paket = json.load(f)
+        if paket.get("format") != FORMAT_SYNC:
+            raise SyncTidakValid(f"format paket tidak dikenal: {paket.get('format')!r}")
+        paket["dari"] = bytes.fromhex(paket["dari"])
+        paket["untuk"] = bytes.fromhex(paket["untuk"]) if paket.get("untuk") else None
+        perubahan = []
+        for tabel, kunci, hapus, waktu, asal, data in paket["perubahan"]:
+            if tabel == TABEL_SYNC_TRANSAKSI:
+                kunci = bytes.fromhex(kunci)
+                if data is not None:
+                    data = (iso_ke_hari(data[0]),) + tuple(data[1:6])
+            elif tabel == TABEL_SYNC_KATEGORI:
+                data = tuple(data[:2]) if data is not None else None
+            else:
+                raise SyncTidakValid(f"tabel tidak dikenal: {tabel!r}")
+            if not hapus and data is None:
+                raise SyncTidakValid("perubahan tanpa data")
+            perubahan.append((tabel, kunci, 1 if hapus else 0, int(waktu), bytes.fromhex(asal), data))
+        paket["perubahan"] = perubahan
+        return paket
+    except (KeyError, ValueError, TypeError, AttributeError, OSError, EOFError) as ex:
+        raise SyncTidakValid(f"paket tidak terbaca: {ex}")
+
+
+def _catat_versi(conn, tabel, kunci, hapus, waktu, asal):
+    # Versi pengirim menggantikan entry yang baru saja dicatat trigger (versi lokal); asal tetap
+    # perangkat pembuatnya, jadi perubahan ini tidak dikirim balik ke sana
+    conn.execute("INSERT OR REPLACE INTO changelog (tabel, kunci, hapus, waktu, asal) VALUES (?,?,?,?,?)",
+                 (tabel, kunci, hapus, waktu, asal))
+
+
+def _terapkan_transaksi(conn, uuid, baris, tanpa_versi):
+    # Return id lokal jika barisnya ada di arsip (diterapkan terpisah), False jika tidak ada
+    # yang berubah, selain itu True
+    row = conn.execute("SELECT u.id, t.id, t.hari, t.tipe, t.kategori, t.deskripsi, t.jumlah, t.is_tabungan "
+                       "FROM sync_uuid u LEFT JOIN transaksi t ON t.id = u.id WHERE u.uuid = ?", (uuid,)).fetchone()
+    if row is None:
+        if baris is None:
+            return False
+        # id baru diambil dari sequence transaksi (arsip memakai sequence yang sama) supaya
+        # UUID bisa dipasang sebelum trigger insert membuat UUID acak
+        id_baru = conn.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transaksi'), 0) + 1").fetchone()[0]
+        conn.execute("INSERT INTO sync_uuid (id, uuid) VALUES (?,?)", (id_baru, uuid))
+        conn.execute(f"INSERT INTO transaksi ({KOLOM_TABEL}) VALUES (?,?,?,?,?,?,?)", (id_baru,) + baris)
+        return True
+    id_trx, id_aktif, *lama = row
+    if tanpa_versi:
+        # Baris lama yang sama di kedua sisi: yang sudah ada tidak ditimpa
+        return False
+    if id_aktif is None:
+        return id_trx
+    if baris is None:
+        conn.execute("DELETE FROM transaksi WHERE id=?", (id_trx,))
+    elif tuple(lama) != baris:
+        conn.execute("UPDATE transaksi SET hari=?, tipe=?, kategori=?, deskripsi=?, jumlah=?, is_tabungan=? WHERE id=?",
+                     baris + (id_trx,))
+    else:
+        return False
+    return True
+
+
+def _terapkan_kategori(conn, nama, data, tanpa_versi):
+    lama = conn.execute("SELECT tipe, is_tabungan FROM master_kategori WHERE nama=?", (nama,)).fetchone()
+    if data is None:
+        if lama is None:
+            return False
+        conn.execute("DELETE FROM master_kategori WHERE nama=?", (nama,))
+        return True
+    if lama is None:
+        conn.execute("INSERT INTO master_kategori VALUES (?,?,?)", (nama,) + data)
+        return True
+    if tanpa_versi or tuple(lama) == data:
+        return False
+    conn.execute("UPDATE master_kategori SET tipe=?, is_tabungan=? WHERE nama=?", data + (nama,))
+    return True
+
+
+def terapkan_paket(repo, paket):
+    # Satu transaksi untuk semua baris data aktif; baris yang ada di arsip diterapkan sesudahnya
+    # lewat Repository._keluarkan_dari_arsip (perlu ATTACH, di luar transaksi).
+    # Return jumlah {"diterapkan", "sama", "ditolak"}; ditolak = versi lokal lebih baru.
+    hasil = {"diterapkan": 0, "sama": 0, "ditolak": 0}
+    tunda = []
+    with repo.write() as conn:
+        saya = perangkat_ini(conn)
+        for tabel, kunci, hapus, waktu, asal, data in paket["perubahan"]:
+            versi = (waktu, asal)
+            lokal = conn.execute("SELECT waktu, asal FROM changelog WHERE tabel=? AND kunci=?", (tabel, kunci)).fetchone()
+            if lokal is not None and tuple(lokal) >= versi:
+                hasil["sama" if tuple(lokal) == versi else "ditolak"] += 1
+                continue
+            tanpa_versi = versi == _TANPA_VERSI
+            if tabel == TABEL_SYNC_TRANSAKSI:
+                berubah = _terapkan_transaksi(conn, kunci, None if hapus else data, tanpa_versi)
+            else:
+                berubah = _terapkan_kategori(conn, kunci, None if hapus else data, tanpa_versi)
+            if berubah is not True and berubah is not False:
+                tunda.append((berubah, kunci, hapus, waktu, asal, data))
+                continue
+            if not tanpa_versi:
+                _catat_versi(conn, tabel, kunci, hapus, waktu, asal)
+            hasil["diterapkan" if berubah else "sama"] += 1
+
+        # ack hanya berlaku jika paket memang ditujukan ke identitas ini
+        ack = paket.get("ack") if paket.get("untuk") == saya else None
+        if ack is not None:
+            ack = min(int(ack), seq_terakhir(conn))
+        conn.execute("""
+            INSERT INTO sync_peer (perangkat, diterima, dikonfirmasi, terakhir) VALUES (?,?,?,?)
+            ON CONFLICT (perangkat) DO UPDATE SET
+                diterima = MAX(COALESCE(diterima, 0), excluded.diterima),
+                dikonfirmasi = CASE WHEN excluded.dikonfirmasi IS NULL THEN dikonfirmasi
+                                    ELSE MAX(COALESCE(dikonfirmasi, 0), excluded.dikonfirmasi) END,
+                terakhir = excluded.terakhir""",
+                     (paket["dari"], int(paket["sampai"]), ack, datetime.now().isoformat(timespec="seconds")))
+
+    for id_trx, kunci, hapus, waktu, asal, data in tunda:
+        repo._keluarkan_dari_arsip(id_trx, None if hapus else (id_trx,) + data)
+        with repo.write() as conn:
+            _catat_versi(conn, TABEL_SYNC_TRANSAKSI, kunci, hapus, waktu, asal)
+        hasil["diterapkan"] += 1
+    return hasil
+
+
+# --- TUKAR ---
+def tukar(repo, path):
+    # Satu putaran sync lewat file `path`: terima paket perangkat lain (jika ada) lalu tulis
+    # paket balasan. Dijalankan bergantian di kedua perangkat sampai keduanya "diterima 0".
+    t0 = time.perf_counter()
+    hasil = {"diterapkan": 0, "sama": 0, "ditolak": 0}
+    with repo._write_lock:
+        with repo.reader() as conn:
+            saya = perangkat_ini(conn)
+            paket_terakhir = conn.execute("SELECT paket_terakhir FROM sync_meta WHERE id = 1").fetchone()[0]
+            peer_dikenal = [r[0] for r in conn.execute("SELECT perangkat FROM sync_peer")]
+        untuk = None
+        if os.path.exists(path):
+            masuk = baca_paket(path)
+            if masuk["dari"] != saya:
+                hasil = terapkan_paket(repo, masuk)
+                untuk = masuk["dari"]
+            elif masuk.get("id") != paket_terakhir:
+                raise SyncTidakValid("paket dibuat salinan database dengan ID perangkat yang sama; "
+                                     "jalankan 'perangkat-baru' di salah satu perangkat")
+            else:
+                # Paket sendiri yang belum diambil: ditulis ulang dengan perubahan terbaru
+                untuk = masuk["untuk"]
+        elif len(peer_dikenal) == 1:
+            untuk = peer_dikenal[0]
+        if hasil["diterapkan"]:
+            repo.invalidate_kategori()
+        paket = buat_paket(repo, untuk)
+        tulis_paket(paket, path)
+        with repo.write() as conn:
+            conn.execute("UPDATE sync_meta SET paket_terakhir = ? WHERE id = 1", (paket["id"],))
+    if hasil["diterapkan"]:
+        repo.events.publish(PerubahanData(BULK))
+    hasil.update({
+        "dikirim": len(paket["perubahan"]),
+        "penuh": paket["penuh"],
+        "untuk": paket["untuk"],
+        "ukuran": os.path.getsize(path),
+        "durasi_ms": (time.perf_counter() - t0) * 1000,
+    })
+    return hasil
+
+
+if __name__ == "__main__":
+    # python sync.py keuangan.db tukar /sdcard/autofint-sync.json
+    # python sync.py keuangan.db status
+    # python sync.py keuangan.db perangkat-baru   (setelah menyalin file DB ke perangkat lain)
+    import argparse
+    import sys
+    from database import Repository
+
+    parser = argparse.ArgumentParser(description="Sinkronisasi dua database Autofint lewat file")
+    parser.add_argument("db")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_tukar = sub.add_parser("tukar", help="terapkan paket dari perangkat lain lalu tulis paket balasan")
+    p_tukar.add_argument("file")
+    sub.add_parser("status", help="ID perangkat, seq changelog & peer yang dikenal")
+    sub.add_parser("perangkat-baru", help="buat ID perangkat baru untuk salinan file database")
+    args = parser.parse_args()
+
+    repo = Repository(args.db)
+    try:
+        if args.cmd == "tukar":
+            h = tukar(repo, args.file)
+            print(f"Diterapkan {h['diterapkan']}, sudah sama {h['sama']}, ditolak (lokal lebih baru) {h['ditolak']}")
+            jenis = "penuh" if h["penuh"] else "delta"
+            print(f"Paket {jenis}: {h['dikirim']} perubahan, {h['ukuran']:,} byte dalam {h['durasi_ms']:.1f} ms")
+        elif args.cmd == "status":
+            with repo.reader() as conn:
+                st = status(conn)
+            print(f"Perangkat {st['perangkat']}  seq {st['seq']}  changelog {st['changelog']} entry")
+            for p in st["peer"]:
+                print(f"  peer {p['perangkat']}: terakhir {p['terakhir']}, belum terkirim {p['belum_terkirim']}")
+        else:
+            with repo.write() as conn:
+                ganti_perangkat(conn)
+                print(f"ID perangkat baru: {perangkat_ini(conn).hex()}")
+    except SyncTidakValid as ex:
+        print(f"Sync gagal: {ex}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        repo.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul app ada di root repo (bukan package); test meng-import langsung seperti main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
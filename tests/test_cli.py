@@ -0,0 +1,27 @@
+import os
+
+from cli import batch_laporan_bulanan, nama_laporan
+from database import Repository
+
+
+def test_nama_laporan_unik():
+    assert nama_laporan(["x/keuangan.db", "y/lain.db"]) == ["keuangan", "lain"]
+    assert nama_laporan(["a/keuangan.db", "b/keuangan.db"]) == ["a_keuangan", "b_keuangan"]
+    assert nama_laporan(["a/keuangan.db", "a/keuangan.db"]) == ["a_keuangan_1", "a_keuangan_2"]
+
+
+def test_batch_db_senama_tidak_saling_timpa(tmp_path):
+    db_paths = []
+    for folder, jumlah in (("a", 1000), ("b", 2000)):
+        os.makedirs(tmp_path / folder)
+        path = str(tmp_path / folder / "keuangan.db")
+        repo = Repository(path)
+        repo.insert_transaksi("2026-01-02", "Pemasukan", "Gaji", "gaji", jumlah, 0)
+        repo.close()
+        db_paths.append(path)
+    hasil = batch_laporan_bulanan(db_paths + db_paths[:1], "2026", "01", str(tmp_path / "out"), workers=1)
+    assert [error for _, _, error in hasil] == [None] * 3
+    paths = [path for _, path, _ in hasil]
+    assert len(set(paths)) == 3
+    assert "1.000" in open(paths[0], encoding="utf-8").read()
+    assert "2.000" in open(paths[1], encoding="utf-8").read()
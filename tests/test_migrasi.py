@@ -0,0 +1,86 @@
+import csv
+import sqlite3
+
+import pytest
+
+from csv_io import CSV_HEADER, export_transaksi_csv
+from database import SCHEMA_VERSION, explain_query_plan, get_ringkasan, migrate
+from model import format_rupiah
+
+# DB versi awal aplikasi: tanpa user_version, tanggal TEXT, jumlah REAL, tanpa index
+SKEMA_AWAL = [
+    '''CREATE TABLE transaksi
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tanggal TEXT,
+        tipe TEXT,
+        kategori TEXT,
+        deskripsi TEXT,
+        jumlah REAL,
+        is_tabungan INTEGER DEFAULT 0)''',
+    "CREATE TABLE master_kategori (nama TEXT PRIMARY KEY, tipe TEXT, is_tabungan INTEGER)",
+]
+
+BARIS_AWAL = [
+    ("2024-01-05", "Pemasukan", "Gaji", "gaji januari", 7500000.0, 0),
+    ("2024-01-06", "Pengeluaran", "Makan", "nasi padang", 12500.5, 0),
+    ("2024-01-06", "Pengeluaran", "Makan", "kopi", 18000.0, 0),
+    ("2024-02-10", "Pengeluaran", "Dana Darurat", "tabung", 500000.0, 1),
+    (None, "Pengeluaran", "Transport", "tanpa tanggal", 15000.0, 0),
+    ("", "Pemasukan", "Bonus", "tanggal kosong", 250000.75, 0),
+    ("2024-03-01", "Pengeluaran", "Belanja", "diskon, \"promo\"", 99999.99, 0),
+]
+
+
+def total_awal(c):
+    # Sama dengan refresh_data_global versi awal
+    hasil = []
+    for syarat in ("tipe='Pemasukan'", "tipe='Pengeluaran' AND is_tabungan=0", "tipe='Pengeluaran' AND is_tabungan=1"):
+        hasil.append(c.execute(f"SELECT SUM(jumlah) FROM transaksi WHERE {syarat}").fetchone()[0] or 0)
+    return hasil
+
+
+def export_awal(c, path):
+    # Sama dengan export CSV versi awal: SELECT * apa adanya
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(c.execute("SELECT * FROM transaksi"))
+
+
+@pytest.fixture
+def db_awal(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "keuangan.db"))
+    for sql in SKEMA_AWAL:
+        conn.execute(sql)
+    conn.executemany("INSERT INTO transaksi (tanggal, tipe, kategori, deskripsi, jumlah, is_tabungan) VALUES (?,?,?,?,?,?)", BARIS_AWAL)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrasi_dari_skema_awal(db_awal, tmp_path):
+    c = db_awal.cursor()
+    jumlah_baris = c.execute("SELECT COUNT(*) FROM transaksi").fetchone()[0]
+    total = total_awal(c)
+    rupiah = [format_rupiah(j) for (j,) in c.execute("SELECT jumlah FROM transaksi ORDER BY id")]
+    export_awal(c, str(tmp_path / "awal.csv"))
+
+    assert migrate(db_awal) == SCHEMA_VERSION
+
+    assert db_awal.execute("SELECT COUNT(*) FROM transaksi").fetchone()[0] == jumlah_baris
+    assert list(get_ringkasan(db_awal)) == pytest.approx(total)
+    assert [format_rupiah(t) for t in get_ringkasan(db_awal)] == [format_rupiah(t) for t in total]
+    assert [format_rupiah(j) for (j,) in db_awal.execute("SELECT jumlah FROM transaksi ORDER BY id")] == rupiah
+    assert db_awal.execute("SELECT COUNT(*) FROM transaksi WHERE hari IS NULL").fetchone()[0] == 2
+
+    assert export_transaksi_csv(db_awal, str(tmp_path / "baru.csv")) == jumlah_baris
+    assert (tmp_path / "baru.csv").read_bytes() == (tmp_path / "awal.csv").read_bytes()
+
+
+def test_halaman_list_tanpa_sort_tambahan(db_awal):
+    # idx_transaksi_hari = (hari, rowid) sudah urut untuk keyset (hari, id); idx_transaksi_dedup
+    # diawali hari juga tetapi urutan id-nya terpotong jumlah & deskripsi
+    migrate(db_awal)
+    plan = explain_query_plan(db_awal, "SELECT * FROM transaksi WHERE (hari, id) < (?, ?) ORDER BY hari DESC, id DESC LIMIT 50", (20240301, 5))
+    assert any("idx_transaksi_hari" in p for p in plan)
+    assert not any("TEMP B-TREE" in p for p in plan)
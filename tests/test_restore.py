@@ -0,0 +1,31 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database import Repository
+
+
+def test_restore_gagal_buka_writer_tidak_mengunci_reader(tmp_path, monkeypatch):
+    repo = Repository(str(tmp_path / "keuangan.db"))
+    repo.insert_transaksi("2026-01-02", "Pemasukan", "Gaji", "gaji", 1000, 0)
+    repo.backup(str(tmp_path / "backup.zip"))
+
+    def gagal():
+        raise sqlite3.OperationalError("disk penuh")
+
+    monkeypatch.setattr(repo, "_buka_writer", gagal)
+    with pytest.raises(sqlite3.OperationalError, match="disk penuh"):
+        repo.restore(str(tmp_path / "backup.zip"))
+
+    # reader() tidak boleh menunggu pintu yang tertinggal tertutup
+    hasil = []
+
+    def baca():
+        with repo.reader() as conn:
+            hasil.append(conn.execute("SELECT COUNT(*) FROM transaksi").fetchone()[0])
+
+    t = threading.Thread(target=baca, daemon=True)
+    t.start()
+    t.join(timeout=5)
+    assert hasil == [1]
@@ -0,0 +1,152 @@
+import shutil
+import time
+
+import pytest
+
+from database import TABEL_SYNC_TRANSAKSI, Repository
+from sync import baca_paket, terapkan_paket, tukar
+
+TAHUN_LAMA = 2019
+
+
+def isi(repo):
+    # {uuid: (hari, tipe, kategori, deskripsi, jumlah, is_tabungan)} dari data aktif + semua arsip
+    hasil = {}
+    with repo.reader_sumber(repo.sumber_periode("Semua")) as bagian:
+        for conn, grup in bagian:
+            for skema in grup:
+                for uuid, *baris in conn.execute(
+                        f"SELECT u.uuid, t.hari, t.tipe, t.kategori, t.deskripsi, t.jumlah, t.is_tabungan "
+                        f"FROM {skema}.transaksi t JOIN main.sync_uuid u ON u.id = t.id"):
+                    hasil[uuid] = tuple(baris)
+    return hasil
+
+
+def baris(repo, id_trx):
+    with repo.reader() as conn:
+        return conn.execute("SELECT deskripsi, jumlah FROM transaksi WHERE id=?", (id_trx,)).fetchone()
+
+
+def sinkron(*urutan, path):
+    # Beberapa putaran tukar bergantian lewat satu file
+    return [tukar(repo, path) for repo in urutan]
+
+
+@pytest.fixture
+def dua_salinan(tmp_path):
+    # A berisi data (termasuk tahun lama), B = hasil restore backup A (identitas sync baru),
+    # lalu keduanya sinkron pertama kali sehingga putaran berikutnya berupa delta
+    a = Repository(str(tmp_path / "a.db"))
+    for k in range(40):
+        a.insert_transaksi(f"{TAHUN_LAMA if k < 10 else 2026}-03-{1 + k % 28:02d}", "Pengeluaran", "Makan", f"trx {k}", 1000 + k, 0)
+    a.backup(str(tmp_path / "a.zip"))
+    shutil.copy(tmp_path / "a.db", tmp_path / "b.db")
+    b = Repository(str(tmp_path / "b.db"))
+    b.restore(str(tmp_path / "a.zip"))
+    path = str(tmp_path / "sync.json")
+    sinkron(a, b, a, b, path=path)
+    yield a, b, path
+    a.close()
+    b.close()
+
+
+def test_restore_dapat_identitas_baru(dua_salinan):
+    a, b, _ = dua_salinan
+    with a.reader() as ca, b.reader() as cb:
+        assert ca.execute("SELECT perangkat FROM sync_meta").fetchone() != cb.execute("SELECT perangkat FROM sync_meta").fetchone()
+    assert isi(a) == isi(b)
+
+
+def test_edit_di_kedua_sisi_konvergen(dua_salinan):
+    a, b, path = dua_salinan
+    a.insert_transaksi("2026-10-18", "Pengeluaran", "Transport", "ojek", 20000, 0)
+    a.update_transaksi(15, "2026-03-16", "Pengeluaran", "Belanja", "diubah A", 5000, 0)
+    b.update_transaksi(20, "2026-03-21", "Pengeluaran", "Hiburan", "diubah B", 7000, 0)
+    b.delete_transaksi(25)
+    hasil = sinkron(a, b, a, b, path=path)
+    assert not hasil[0]["penuh"]
+    assert isi(a) == isi(b)
+    assert baris(b, 15) == ("diubah A", 5000)
+    assert baris(a, 20) == ("diubah B", 7000)
+    assert baris(a, 25) is None
+    with b.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transaksi WHERE deskripsi='ojek'").fetchone()[0] == 1
+
+
+@pytest.mark.parametrize("pertama", ["a", "b"])
+def test_konflik_edit_pemenang_sama_di_kedua_arah(dua_salinan, pertama):
+    # Edit belakangan menang, tidak peduli sisi mana yang sinkron lebih dulu
+    a, b, path = dua_salinan
+    a.update_transaksi(12, "2026-03-13", "Pengeluaran", "Makan", "versi A", 1, 0)
+    time.sleep(0.01)
+    b.update_transaksi(12, "2026-03-13", "Pengeluaran", "Makan", "versi B", 2, 0)
+    urutan = (a, b, a, b) if pertama == "a" else (b, a, b, a)
+    sinkron(*urutan, path=path)
+    assert baris(a, 12) == baris(b, 12) == ("versi B", 2)
+    assert isi(a) == isi(b)
+
+
+@pytest.mark.parametrize("hapus_belakangan", [True, False])
+def test_hapus_lawan_edit(dua_salinan, hapus_belakangan):
+    a, b, path = dua_salinan
+    if hapus_belakangan:
+        b.update_transaksi(30, "2026-03-03", "Pengeluaran", "Makan", "diedit", 9, 0)
+        time.sleep(0.01)
+        a.delete_transaksi(30)
+    else:
+        a.delete_transaksi(30)
+        time.sleep(0.01)
+        b.update_transaksi(30, "2026-03-03", "Pengeluaran", "Makan", "diedit", 9, 0)
+    sinkron(a, b, a, b, path=path)
+    assert isi(a) == isi(b)
+    ada = [r for r in isi(a).values() if r[3] == "diedit"]
+    assert len(ada) == (0 if hapus_belakangan else 1)
+
+
+def test_paket_diterapkan_ulang_tanpa_efek(dua_salinan, tmp_path):
+    a, b, path = dua_salinan
+    a.update_transaksi(18, "2026-03-19", "Pengeluaran", "Makan", "sekali", 3, 0)
+    a.delete_transaksi(19)
+    a.insert_transaksi("2026-10-18", "Pemasukan", "Gaji", "baru", 100, 0)
+    tukar(a, path)
+    salinan = str(tmp_path / "paket_a.json")
+    shutil.copy(path, salinan)
+    pertama = terapkan_paket(b, baca_paket(salinan))
+    assert pertama["diterapkan"] == 3
+    sebelum = isi(b)
+    with b.reader() as conn:
+        seq_sebelum = conn.execute("SELECT MAX(seq) FROM changelog").fetchone()[0]
+    kedua = terapkan_paket(b, baca_paket(salinan))
+    assert kedua["diterapkan"] == 0 and kedua["ditolak"] == 0
+    assert isi(b) == sebelum
+    with b.reader() as conn:
+        assert conn.execute("SELECT MAX(seq) FROM changelog").fetchone()[0] == seq_sebelum
+
+
+def test_arsip_tidak_tersinkron_sebagai_hapus(dua_salinan):
+    a, b, path = dua_salinan
+    with a.reader() as conn:
+        tombstone_sebelum = conn.execute("SELECT COUNT(*) FROM changelog WHERE hapus=1").fetchone()[0]
+    assert a.arsipkan_tahun_lama() == {TAHUN_LAMA: 10}
+    with a.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM changelog WHERE hapus=1").fetchone()[0] == tombstone_sebelum
+        assert conn.execute("SELECT COUNT(*) FROM transaksi WHERE hari < ?", ((TAHUN_LAMA + 1) * 10000,)).fetchone()[0] == 0
+    hasil = sinkron(a, b, a, b, path=path)
+    assert sum(h["diterapkan"] for h in hasil) == 0
+    with b.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transaksi WHERE hari < ?", ((TAHUN_LAMA + 1) * 10000,)).fetchone()[0] == 10
+    assert isi(a) == isi(b)
+
+
+def test_edit_baris_arsip_tersinkron(dua_salinan):
+    # Baris yang sudah diarsipkan di A tapi masih aktif di B tetap punya UUID yang sama
+    a, b, path = dua_salinan
+    a.arsipkan_tahun_lama()
+    b.update_transaksi(3, f"{TAHUN_LAMA}-03-04", "Pengeluaran", "Makan", "edit lama", 11, 0)
+    a.delete_transaksi(4)
+    sinkron(b, a, b, a, path=path)
+    assert isi(a) == isi(b)
+    deskripsi = {r[3] for r in isi(a).values()}
+    assert "edit lama" in deskripsi and "trx 3" not in deskripsi
+    with b.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM changelog WHERE tabel=? AND hapus=1", (TABEL_SYNC_TRANSAKSI,)).fetchone()[0] == 1